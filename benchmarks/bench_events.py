@@ -0,0 +1,121 @@
+﻿# benchmarks/bench_events.py
+"""
+Восстановление состояния лиги из журнала событий: полное воспроизведение
+против загрузки снимка и воспроизведения хвоста.
+
+Журнал (команды, игроки, матчи с голами) пишется во временную БД пакетно,
+снимки сохраняются каждые --every событий. Печатает время полного
+воспроизведения, время replay() для последнего события и для момента
+в середине журнала, размер снимка.
+
+Запуск:
+    python benchmarks/bench_events.py [--matches 20000] [--teams 40] [--every 1000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team import db
+from sports_team.events import EventStore, LeagueState, replay
+
+
+def make_events(n_matches, n_teams, seed=0):
+    """События лиги: (тип, данные) в порядке записи."""
+    rng = random.Random(seed)
+    names = [f"Команда {i}" for i in range(n_teams)]
+    for name in names:
+        yield "team_created", {"name": name}
+        for n in range(1, 12):
+            yield "player_added", {"team": name, "name": f"Игрок {name}-{n}", "number": n,
+                                   "position": "Нападающий", "kind": "Forward"}
+    day = datetime(2020, 1, 1)
+    for _ in range(n_matches):
+        a, b = rng.sample(names, 2)
+        yield "match_started", {"team_a": a, "team_b": b, "date": day.isoformat()}
+        for minute in sorted(rng.sample(range(1, 91), rng.randint(0, 4))):
+            yield "goal", {"match": None, "side": rng.choice("AB"),
+                           "number": rng.randint(1, 11), "minute": minute}
+        yield "match_finalized", {"match": None}
+        day += timedelta(hours=6)
+
+
+def write_log(events, every):
+    """Пишет журнал одной транзакцией, затем снимки каждые every событий; возвращает число событий."""
+    rows, match = [], None
+    ts = datetime(2020, 1, 1)
+    for seq, (type_, data) in enumerate(events, 1):
+        if type_ == "match_started":
+            match = seq
+        elif data.get("match", 0) is None:
+            data["match"] = match
+        rows.append((seq, (ts + timedelta(seconds=seq)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+                     type_, json.dumps(data, ensure_ascii=False)))
+    conn = db.get_connection()
+    with conn:
+        conn.executemany("INSERT INTO event_log (seq, ts, type, payload) VALUES (?, ?, ?, ?);", rows)
+    conn.close()
+
+    store = EventStore()
+    state = LeagueState()
+    for seq, type_, data in list(store.iter_events()):  # чтение завершается до записи снимков
+        state.apply(seq, type_, data)
+        if seq % every == 0:
+            store.save_snapshot(state)
+    return len(rows)
+
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def full_replay(store, until=None):
+    state = LeagueState()
+    for seq, type_, data in store.iter_events(until=until):
+        state.apply(seq, type_, data)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение журнала событий.")
+    parser.add_argument("--matches", type=int, default=20000)
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--every", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db.init_db()
+        start = time.perf_counter()
+        total = write_log(make_events(args.matches, args.teams), args.every)
+        print(f"Событий: {total}, снимков: {total // args.every} "
+              f"(подготовка {time.perf_counter() - start:.1f} с)")
+
+        store = EventStore()
+        conn = db.get_connection()
+        size = conn.execute("SELECT length(state) FROM event_log_snapshots ORDER BY seq DESC LIMIT 1;").fetchone()[0]
+        conn.close()
+        print(f"Размер снимка: {size / 1024:.0f} КБ")
+
+        for label, until in (("последнее событие", None), ("середина журнала", total // 2)):
+            t_full, full = timed(lambda: full_replay(store, until), repeat=1)
+            t_snap, snap = timed(lambda: replay(store, until))
+            assert snap.seq == full.seq
+            print(f"{label:>18}: полное {t_full * 1000:8.1f} мс   снимок + хвост {t_snap * 1000:7.1f} мс   "
+                  f"(x{t_full / t_snap:.0f})")
+        db.close_match_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+﻿# benchmarks/bench_export.py
+"""
+Колоночная выгрузка против чтения строк из SQLite.
+
+Во временную БД пишется N матчей с голами. Сравнивается задача "голы каждой
+команды": построчно (load_all_matches + цикл Python) и по выгрузке
+(load_export + NumPy). Печатает время выгрузки, её пиковую память (tracemalloc,
+отдельным прогоном) и время открытия выгрузки.
+
+Запуск:
+    python benchmarks/bench_export.py [матчей] [команд]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from sports_team import db
+from sports_team.export import export_columnar, load_export
+
+
+def populate(n_matches, n_teams, seed=0):
+    rng = random.Random(seed)
+    names = [f"Команда {i}" for i in range(n_teams)]
+    start = datetime(2024, 7, 1)
+    matches, events = [], []
+    for i in range(1, n_matches + 1):
+        a, b = rng.sample(names, 2)
+        sa, sb = rng.randint(0, 4), rng.randint(0, 3)
+        date = (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+        matches.append((i, a, b, sa, sb, date))
+        for side, team, goals in (("A", a, sa), ("B", b, sb)):
+            for _ in range(goals):
+                n = rng.randint(1, 11)
+                events.append((i, rng.randint(1, 90), side, f"Игрок {team}-{n}", n))
+    conn = db.get_connection()
+    with conn:
+        conn.executemany("INSERT INTO matches (id, team_a, team_b, score_a, score_b, date) "
+                         "VALUES (?, ?, ?, ?, ?, ?);", matches)
+        conn.executemany("INSERT INTO match_events (match_id, minute, team, player_name, player_number) "
+                         "VALUES (?, ?, ?, ?, ?);", events)
+    conn.close()
+    return len(events)
+
+
+def goals_by_rows():
+    totals = {}
+    for team_a, team_b, score_a, score_b, _ in db.load_all_matches():
+        totals[team_a] = totals.get(team_a, 0) + score_a
+        totals[team_b] = totals.get(team_b, 0) + score_b
+    return totals
+
+
+def goals_by_columns(directory):
+    data = load_export(directory)
+    m = data["matches"]
+    n = len(data.dictionaries["teams"])
+    totals = np.bincount(m["team_a"], weights=m["score_a"], minlength=n) + \
+        np.bincount(m["team_b"], weights=m["score_b"], minlength=n)
+    return dict(zip(data.dictionaries["teams"].tolist(), totals.astype(int).tolist()))
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:>28}: {(time.perf_counter() - start) * 1000:9.1f} мс")
+    return result
+
+
+def main():
+    n_matches = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_teams = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db.init_db()
+        n_events = populate(n_matches, n_teams)
+        print(f"Матчей: {n_matches}, голов: {n_events}, команд: {n_teams}")
+
+        manifest = timed("выгрузка", lambda: export_columnar("export"))
+        tracemalloc.start()  # отдельный прогон: tracemalloc заметно замедляет выгрузку
+        export_columnar("export")
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        size = sum(os.path.getsize(os.path.join("export", f)) for f in os.listdir("export"))
+        print(f"{'пик памяти выгрузки':>28}: {peak / 2 ** 20:9.1f} МБ  (файлы {size / 2 ** 20:.1f} МБ, "
+              f"строк {sum(t['rows'] for t in manifest['tables'].values())})")
+
+        timed("открытие выгрузки (mmap)", lambda: load_export("export"))
+        rows = timed("голы команд: строки SQLite", goals_by_rows)
+        cols = timed("голы команд: столбцы NumPy", lambda: goals_by_columns("export"))
+        assert rows == cols
+        db.close_match_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+﻿# benchmarks/bench_flush.py
+"""
+Сохранение в БД после небольших изменений: 10 000 команд, изменён 1%.
+Прежний путь (save_team для каждой команды) против flush() только изменённого.
+
+Запуск:
+    python benchmarks/bench_flush.py [команд] [доля изменённых]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team import db
+from sports_team.team import Team
+from sports_team.player import Forward
+
+
+def make_teams(n_teams, players=11):
+    teams = []
+    for i in range(n_teams):
+        team = Team(f"Команда {i}")
+        for n in range(1, players + 1):
+            team.add_player(Forward(f"Игрок {i}-{n}", n))
+        teams.append(team)
+    return teams
+
+
+def touch(teams, share, seed=0):
+    rng = random.Random(seed)
+    for team in rng.sample(teams, max(1, int(len(teams) * share))):
+        rng.choice(team.players).add_match_stats(goals=1)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    teams = make_teams(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db.init_db()
+
+        start = time.perf_counter()
+        written = db.flush(teams)
+        print(f"Первое сохранение flush(): {time.perf_counter() - start:.3f} сек, {written}")
+
+        touch(teams, share)
+        start = time.perf_counter()
+        for team in teams:
+            db.save_team(team)
+        per_team = time.perf_counter() - start
+        print(f"save_team для всех {n} команд: {per_team:.3f} сек")
+
+        touch(teams, share, seed=1)
+        start = time.perf_counter()
+        written = db.flush(teams)
+        dirty = time.perf_counter() - start
+        print(f"flush() после изменения {share:.0%} команд: {dirty:.3f} сек, {written}")
+        print(f"Ускорение: ×{per_team / dirty:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+﻿# benchmarks/bench_forecast.py
+"""
+Бенчмарк прогноза сезона: 100 000 симуляций для лиги из 20 команд.
+
+Запуск:
+    python benchmarks/bench_forecast.py [итерации] [процессы]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team.forecast import PoissonModel, remaining_fixtures, simulate_season
+
+
+def make_history(n_teams=20, seed=0):
+    """Первая половина сезона со случайными результатами."""
+    rng = np.random.default_rng(seed)
+    teams = [f"Команда {i + 1}" for i in range(n_teams)]
+    rows = []
+    for i, home in enumerate(teams):
+        for away in teams[i + 1:]:
+            rows.append((home, away, int(rng.poisson(1.5)), int(rng.poisson(1.1)), "2024-01-01 00:00:00"))
+    return teams, rows
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    teams, played = make_history()
+    start = time.perf_counter()
+    model = PoissonModel.fit(played, teams=teams)
+    fixtures = remaining_fixtures(teams, played)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forecast = simulate_season(model, fixtures, played=played, iterations=iterations,
+                               processes=processes, seed=42)
+    sim_time = time.perf_counter() - start
+
+    print(f"Команд: {len(teams)}, оставшихся матчей: {len(fixtures)}")
+    print(f"Подбор модели: {fit_time:.3f} сек")
+    print(f"{iterations} симуляций ({processes} проц.): {sim_time:.3f} сек "
+          f"({iterations / sim_time:,.0f} сезонов/сек)")
+    best = max(forecast.title_odds().items(), key=lambda kv: kv[1])
+    print(f"Фаворит: {best[0]} ({best[1]:.1%})")
+
+
+if __name__ == "__main__":
+    main()
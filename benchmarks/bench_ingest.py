@@ -0,0 +1,84 @@
+﻿# benchmarks/bench_ingest.py
+"""
+Пропускная способность регистрации голов из нескольких потоков.
+
+Сравниваются: однопоточный Match.record_goal, record_goal под общей блокировкой
+и ConcurrentMatchRecorder (буфер на поток + слияние при завершении).
+Запуск:
+    python benchmarks/bench_ingest.py [потоков] [голов на поток]
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.ingest import ConcurrentMatchRecorder
+
+
+def make_match():
+    a, b = Team("A"), Team("B")
+    for team in (a, b):
+        for n in range(1, 19):
+            team.add_player(Forward(f"{team.name}{n}", n))
+    return Match(a, b, datetime(2024, 5, 1))
+
+
+def run_threads(n_threads, goals, record):
+    def worker(k):
+        for i in range(goals):
+            record(k, i)
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(n_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    n_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    goals = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    total = n_threads * goals
+
+    match = make_match()
+    players = match.team_a.players + match.team_b.players
+    start = time.perf_counter()
+    for i in range(total):
+        match.record_goal(players[i % len(players)], i % 90 + 1)
+    single = time.perf_counter() - start
+
+    match = make_match()
+    players = match.team_a.players + match.team_b.players
+    lock = threading.Lock()
+
+    def locked(k, i):
+        with lock:
+            match.record_goal(players[(k + i) % len(players)], i % 90 + 1)
+    locked_time = run_threads(n_threads, goals, locked)
+
+    match = make_match()
+    players = match.team_a.players + match.team_b.players
+    recorder = ConcurrentMatchRecorder(match)
+    buffered = run_threads(n_threads, goals,
+                           lambda k, i: recorder.record_goal(players[(k + i) % len(players)], i % 90 + 1))
+    start = time.perf_counter()
+    recorder.finalize()
+    merge = time.perf_counter() - start
+    assert len(match.events) == total
+
+    print(f"Голов: {total} ({n_threads} потоков × {goals})")
+    print(f"Один поток, record_goal:       {total / single:12,.0f} голов/сек")
+    print(f"Потоки, общая блокировка:      {total / locked_time:12,.0f} голов/сек")
+    print(f"Потоки, буферы + слияние:      {total / (buffered + merge):12,.0f} голов/сек "
+          f"(приём {buffered:.3f} сек, слияние {merge:.3f} сек)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+﻿# benchmarks/bench_live.py
+"""
+Нагрузка на конвейер live.py: тысячи одновременно идущих матчей.
+
+Производитель кладёт в ограниченную очередь события всех матчей вперемешку
+(сначала все start, затем голы в порядке минут, затем все end) — все матчи
+идут одновременно. Завершённые матчи записываются во временную БД;
+с --league события матчей ещё и пишутся пачками в журнал лиги (events.League).
+Печатает событий в секунду, задержки гола и записи, число ожиданий
+из-за заполненных очередей.
+
+Запуск:
+    python benchmarks/bench_live.py [--matches 5000] [--queue-size 64] [--source-size 1024] [--league]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team import db
+from sports_team.events import League
+from sports_team.live import LiveEvent, LivePipeline, queue_source
+from sports_team.player import Forward
+from sports_team.team import Team
+
+
+def make_events(n_matches, seed=0):
+    rng = random.Random(seed)
+    teams = {}
+    for i in range(n_matches * 2):
+        team = Team(f"Команда {i}")
+        for n in range(1, 12):
+            team.add_player(Forward(f"Игрок {i}-{n}", n))
+        teams[team.name] = team
+    starts, goals, ends = [], [], []
+    for m in range(n_matches):
+        a, b = f"Команда {2 * m}", f"Команда {2 * m + 1}"
+        starts.append({"type": "start", "match": m, "team_a": a, "team_b": b})
+        for minute in rng.sample(range(1, 91), rng.randint(0, 6)):
+            goals.append((minute, {"type": "goal", "match": m, "team": rng.choice((a, b)),
+                                   "number": rng.randint(1, 11), "minute": minute}))
+        ends.append({"type": "end", "match": m})
+    goals.sort(key=lambda item: item[0])
+    return teams, starts + [g for _, g in goals] + ends
+
+
+async def run(teams, events, queue_size, source_size, persist, league=None):
+    queue = asyncio.Queue(source_size)
+
+    async def produce():
+        for data in events:
+            # Время поступления — момент постановки в очередь источника
+            await queue.put(LiveEvent.from_dict(data))
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    pipeline = LivePipeline(teams, queue_size=queue_size, persist=persist, league=league)
+    stats = await pipeline.run(queue_source(queue))
+    await producer
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузка на конвейер событий матчей.")
+    parser.add_argument("--matches", type=int, default=5000)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--source-size", type=int, default=1024)
+    parser.add_argument("--no-persist", action="store_true")
+    parser.add_argument("--league", action="store_true", help="писать события матчей в журнал лиги")
+    args = parser.parse_args()
+
+    teams, events = make_events(args.matches)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db.init_db()
+        league = None
+        if args.league:
+            league = League()
+            league.start_batch()
+            league.import_teams(teams.values())
+            league.end_batch()
+            teams = league.teams
+        start = time.perf_counter()
+        stats = asyncio.run(run(teams, events, args.queue_size, args.source_size, not args.no_persist, league))
+        elapsed = time.perf_counter() - start
+        db.close_match_cache()
+
+    summary = stats.summary()
+    print(f"Матчей одновременно: {args.matches}, событий: {stats.events}, голов: {stats.goals}, "
+          f"записано матчей: {stats.persisted}, ошибок: {len(stats.errors)}")
+    print(f"Время: {elapsed:.2f} с, событий в секунду: {summary['Событий в секунду']:.0f}")
+    for key in ("Задержка гола, мс", "Задержка записи, мс"):
+        values = "   ".join(f"{k} {v:.2f}" for k, v in summary[key].items())
+        print(f"{key}: {values}")
+    print(f"Ожиданий из-за заполненной очереди матча: {stats.backpressure}")
+
+
+if __name__ == "__main__":
+    main()
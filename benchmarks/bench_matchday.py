@@ -0,0 +1,77 @@
+﻿# benchmarks/bench_matchday.py
+"""
+Игровой день из 500 матчей: текущий путь (save_match + 2 × save_team на матч)
+против пакетного Matchday.commit().
+
+Запуск:
+    python benchmarks/bench_matchday.py [матчей]
+"""
+import builtins
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team import db
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.matchday import Matchday
+
+
+def make_matchday(n_matches, seed=0):
+    rng = random.Random(seed)
+    matches = []
+    for i in range(n_matches):
+        a, b = Team(f"Хозяева {i}"), Team(f"Гости {i}")
+        for team in (a, b):
+            for n in range(1, 19):
+                team.add_player(Forward(f"{team.name} игрок {n}", n))
+        m = Match(a, b, datetime(2024, 5, 1, 18, 0))
+        for minute in sorted(rng.sample(range(1, 91), rng.randint(0, 5))):
+            m.record_goal(rng.choice(rng.choice((a, b)).players), minute)
+        m.finalize_match()
+        matches.append(m)
+    return matches
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    real_print = builtins.print
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        builtins.print = lambda *_, **__: None  # save_match печатает каждый матч
+        try:
+            db.DB_NAME = "per_match.db"
+            db.init_db()
+            matches = make_matchday(n)
+            start = time.perf_counter()
+            for m in matches:
+                db.save_match(m)
+                db.save_team(m.team_a)
+                db.save_team(m.team_b)
+            per_match = time.perf_counter() - start
+
+            db.DB_NAME = "matchday.db"
+            db.init_db()
+            matches = make_matchday(n)
+            timings = Matchday(matches).commit()
+        finally:
+            builtins.print = real_print
+            db.close_match_cache()
+            os.chdir("/")
+
+    print(f"Матчей: {n}")
+    print(f"По одному матчу (save_match + 2 × save_team): {per_match:.3f} сек")
+    print(f"Matchday.commit(): {timings['всего']:.3f} сек (ускорение ×{per_match / timings['всего']:.1f})")
+    for stage, seconds in timings.items():
+        if stage != "всего":
+            print(f"  {stage:10s} {seconds * 1000:8.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+﻿# benchmarks/bench_ratings.py
+"""
+Пересчёт рейтингов Эло по истории из 1 000 000 матчей:
+построение плана ReplayPlan, векторный run() с разными K и
+последовательный пересчёт в Python (как при применении матчей по одному).
+
+Запуск:
+    python benchmarks/bench_ratings.py [матчей] [команд]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from sports_team.ratings import EloModel, ReplayPlan
+
+
+def make_rows(n_matches, n_teams, seed=0):
+    """Туры кругового вида: в каждый день каждая команда играет не больше одного раза."""
+    rng = random.Random(seed)
+    names = [f"Команда {i}" for i in range(n_teams)]
+    rows = []
+    day = datetime(2000, 1, 1)
+    while len(rows) < n_matches:
+        order = rng.sample(names, n_teams)
+        date = day.strftime("%Y-%m-%d %H:%M:%S")
+        for a, b in zip(order[::2], order[1::2]):
+            rows.append((len(rows) + 1, a, b, rng.randint(0, 4), rng.randint(0, 3), date))
+        day += timedelta(days=1)
+    return rows[:n_matches]
+
+
+def sequential(rows, model):
+    ratings = {}
+    for _, a, b, sa, sb, _ in rows:
+        ra, rb = ratings.get(a, model.initial), ratings.get(b, model.initial)
+        delta = model.delta(ra, rb, sa, sb)
+        ratings[a], ratings[b] = ra + delta, rb - delta
+    return ratings
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    teams = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rows = make_rows(n, teams)
+
+    start = time.perf_counter()
+    plan = ReplayPlan(rows)
+    print(f"План для {n} матчей: {time.perf_counter() - start:.2f} сек, {plan}")
+
+    for k in (10, 20, 30):
+        model = EloModel(k=k)
+        start = time.perf_counter()
+        ratings = plan.run(model)[0]
+        print(f"Векторный пересчёт, K={k}: {time.perf_counter() - start:.2f} сек")
+
+    model = EloModel(k=30)
+    start = time.perf_counter()
+    expected = sequential(rows, model)
+    print(f"Последовательный пересчёт в Python, K=30: {time.perf_counter() - start:.2f} сек")
+    assert np.allclose(ratings, [expected[name] for name in plan.teams])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+﻿# benchmarks/bench_schedule.py
+"""
+Календарь большого турнира: построение двухкругового расписания методом круга,
+проверка ограничений, запись в таблицу fixtures и выборка матчей одной команды.
+
+Запуск:
+    python benchmarks/bench_schedule.py [--teams 1000] [--blackouts 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team import db
+from sports_team.schedule import Constraints, round_robin
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label}: {time.perf_counter() - start:.3f} с")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Построение и запись календаря большого турнира.")
+    parser.add_argument("--teams", type=int, default=1000)
+    parser.add_argument("--blackouts", type=int, default=50,
+                        help="сколько команд получают по одному недоступному дню")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = date(2024, 8, 3)
+    teams = [f"Команда {i}" for i in range(args.teams)]
+    season_days = 2 * args.teams * 7
+    constraints = Constraints(
+        blackout_dates=[date(2024, 12, 31), date(2025, 1, 1)],
+        team_blackouts={rng.choice(teams): [start + timedelta(days=rng.randrange(season_days))]
+                        for _ in range(args.blackouts)})
+
+    schedule = measure(f"Календарь {args.teams} команд", lambda: round_robin(teams, start, constraints, check=False))
+    print(f"  {schedule!r}")
+    problems = measure("Проверка ограничений", lambda: schedule.violations(constraints))
+    print(f"  нарушений: {len(problems)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db.init_db()
+        written = measure("Запись в fixtures", lambda: db.save_fixtures(schedule.rows("2024")))
+        print(f"  матчей: {written}")
+        rows = measure(f"Матчи команды '{teams[5]}'", lambda: db.load_fixtures(teams[5]))
+        print(f"  матчей: {len(rows)}")
+        db.close_match_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+﻿# benchmarks/bench_search.py
+"""
+Поиск игроков по имени в индексе из 1 000 000 игроков:
+время построения и задержка запросов (префикс, точное имя, опечатка)
+в сравнении с перебором всех игроков.
+
+Запуск:
+    python benchmarks/bench_search.py [игроков]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team.player import Forward
+from sports_team.search import PlayerIndex
+
+FIRST = ["Иван", "Пётр", "Алексей", "Сергей", "Дмитрий", "Андрей", "Михаил", "Никита",
+         "Артём", "Егор", "Максим", "Кирилл", "Роман", "Олег", "Павел", "Юрий",
+         "Денис", "Антон", "Илья", "Глеб", "Тимур", "Вадим", "Руслан", "Фёдор"]
+SYLLABLES = ["ка", "ло", "ми", "ра", "но", "ве", "ту", "за", "ша", "бо", "ри", "ле", "го", "ст", "пе", "ди",
+             "жу", "хо", "цы", "фе", "ко", "да", "ны", "сы", "мо", "ру", "бе", "вы", "гу", "ля", "тю", "че"]
+SUFFIXES = ["ов", "ев", "ин", "ский", "енко", "ук", "ян", "ович"]
+
+
+def make_names(n, surnames=50_000, seed=0):
+    """Имена из ограниченного набора фамилий (как в реальной лиге: много однофамильцев)."""
+    rng = random.Random(seed)
+    pool = list({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))) + rng.choice(SUFFIXES)
+                 for _ in range(surnames)})
+    return [f"{rng.choice(FIRST)} {rng.choice(pool).capitalize()}" for _ in range(n)]
+
+
+def typo(name, rng):
+    i = rng.randrange(1, len(name))
+    return name[:i] + rng.choice("абвгдежзик") + name[i + 1:]
+
+
+def measure(index, queries, limit=10):
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, limit)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times) * 1e6, times[int(len(times) * 0.95)] * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(1)
+    names = make_names(n)
+    players = [Forward(name, i % 99 + 1) for i, name in enumerate(names)]
+
+    index = PlayerIndex()
+    start = time.perf_counter()
+    for p in players:
+        index.add(p)
+    index.search("а")  # первая сортировка ключей
+    print(f"Построение индекса для {n} игроков: {time.perf_counter() - start:.2f} сек")
+
+    sample = rng.sample(names, 200)
+    cases = {
+        "префикс фамилии": [s.split()[1][:4] for s in sample],
+        "точное имя": sample,
+        "опечатка": [typo(s, rng) for s in sample],
+    }
+    for title, queries in cases.items():
+        p50, p95 = measure(index, queries)
+        print(f"{title:>16}: p50 {p50:8.1f} мкс   p95 {p95:8.1f} мкс")
+
+    start = time.perf_counter()
+    new = Forward("Новичок Добавленный", 7)
+    index.add(new)
+    assert index.search("новичок")[0].player is new
+    print(f"Добавление игрока + первый запрос: {(time.perf_counter() - start) * 1e3:.2f} мс")
+
+    query = sample[0].lower()
+    start = time.perf_counter()
+    [p for p in players if p.name.lower() == query]
+    print(f"Перебор всех игроков (точное имя): {(time.perf_counter() - start) * 1e3:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+﻿# benchmarks/bench_snapshot.py
+"""
+Сравнение снимка лиги (mmap) с pickle: время загрузки и прирост RSS.
+
+Каждое измерение выполняется в отдельном процессе, чтобы RSS не смешивался.
+Запуск:
+    python benchmarks/bench_snapshot.py [команд] [игроков в команде]
+"""
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.snapshot import write_snapshot
+
+MEASURE = r"""
+import os, resource, sys, time, pickle
+sys.path.insert(0, {root!r})
+from sports_team.snapshot import LeagueSnapshot, load_snapshot
+
+def rss_kb():
+    # Текущий RSS (Linux); иначе — пиковый из getrusage
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+before = rss_kb()
+start = time.perf_counter()
+mode = {mode!r}
+if mode == "pickle":
+    with open({pkl!r}, "rb") as f:
+        teams = pickle.load(f)
+    goals = teams["команда 1"][0].goals
+elif mode == "snapshot-view":
+    snap = LeagueSnapshot({snap!r})
+    goals = snap["команда 1"][0].goals
+else:
+    teams = load_snapshot({snap!r})
+    goals = teams["команда 1"][0].goals
+elapsed = time.perf_counter() - start
+after = rss_kb()
+print(elapsed, (after - before) / 1024)
+"""
+
+
+def make_league(n_teams, n_players):
+    teams = {}
+    for i in range(n_teams):
+        team = Team(f"Команда {i}")
+        for n in range(1, n_players + 1):
+            p = Forward(f"Игрок {i}-{n}", n)
+            p.goals, p.games = n % 7, 10
+            team.add_player(p)
+        teams[team.name.lower()] = team
+    names = list(teams.values())
+    start = datetime(2024, 1, 1)
+    # Пары команд не пересекаются: длинная цепочка ссылок упёрлась бы в рекурсию pickle
+    for i in range(0, len(names) - 1, 2):
+        m = Match(names[i], names[i + 1], start + timedelta(days=i))
+        names[i].add_match(m)
+        names[i + 1].add_match(m)
+    return teams
+
+
+def main():
+    n_teams = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_players = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    teams = make_league(n_teams, n_players)
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl, snap = os.path.join(tmp, "teams.pkl"), os.path.join(tmp, "teams.snap")
+        with open(pkl, "wb") as f:
+            pickle.dump(teams, f)
+        write_snapshot(teams, snap)
+        print(f"Команд: {n_teams}, игроков: {n_teams * n_players}")
+        print(f"Размер: pickle {os.path.getsize(pkl) / 1e6:.1f} МБ, снимок {os.path.getsize(snap) / 1e6:.1f} МБ")
+        for mode in ("pickle", "snapshot-view", "snapshot-full"):
+            code = MEASURE.format(root=ROOT, mode=mode, pkl=pkl, snap=snap)
+            out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+            elapsed, rss = map(float, out.stdout.split())
+            print(f"{mode:15s} загрузка {elapsed * 1000:8.1f} мс, прирост RSS {rss:7.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
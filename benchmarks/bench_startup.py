@@ -0,0 +1,90 @@
+﻿# benchmarks/bench_startup.py
+"""
+Время запуска CLI до первого приглашения меню.
+
+Запускает `python -X importtime run.py` в пустом каталоге, ждёт строку
+"Выберите пункт меню" и выходит (пункт 0). Печатает медиану времени до меню
+и самые тяжёлые импорты (по накопленному времени из -X importtime).
+Возвращает код 1, если медиана больше --max-ms или при запуске
+импортированы тяжёлые модули (python-docx, lxml, numpy).
+
+Запуск:
+    python benchmarks/bench_startup.py [--runs 5] [--max-ms 250] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROMPT = "Выберите пункт меню".encode("utf-8")
+HEAVY = ("docx", "lxml", "numpy")
+
+
+def start_once():
+    """Время до приглашения меню (сек) и вывод -X importtime."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONPATH=ROOT)
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-X", "importtime", os.path.join(ROOT, "run.py")],
+                                cwd=tmp, env=env, stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out = b""
+        while PROMPT not in out:
+            chunk = os.read(proc.stdout.fileno(), 4096)
+            if not chunk:
+                raise RuntimeError("Программа завершилась до вывода меню:\n" + out.decode("utf-8", "replace"))
+            out += chunk
+        elapsed = time.perf_counter() - start
+        _, err = proc.communicate(b"0\n", timeout=30)
+    return elapsed, err.decode("utf-8", "replace")
+
+
+def parse_importtime(log):
+    """[(накопленное время, мкс, модуль), ...] по строкам "import time: self | cumulative | name"."""
+    rows = []
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name[1:].rstrip()))  # вложенные импорты — с отступом
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска run.py до меню.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=250.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    times = []
+    log = ""
+    for _ in range(args.runs):
+        elapsed, log = start_once()
+        times.append(elapsed)
+    median_ms = statistics.median(times) * 1000
+
+    imports = parse_importtime(log)
+    top_level = [(us, name) for us, name in imports if not name.startswith(" ")]
+    print(f"До меню: медиана {median_ms:.1f} мс (мин {min(times) * 1000:.1f}, макс {max(times) * 1000:.1f})")
+    print("Самые тяжёлые импорты верхнего уровня:")
+    for us, name in sorted(top_level, reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} мс  {name}")
+
+    heavy = sorted({name.strip().split(".")[0] for _, name in imports} & set(HEAVY))
+    failed = False
+    if heavy:
+        print("Ошибка: при запуске импортированы", ", ".join(heavy))
+        failed = True
+    if median_ms > args.max_ms:
+        print(f"Ошибка: запуск дольше {args.max_ms:.0f} мс")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
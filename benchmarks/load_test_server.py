@@ -0,0 +1,144 @@
+﻿# benchmarks/load_test_server.py
+"""
+Нагрузочный тест HTTP-сервиса: запросов в секунду и перцентили задержки.
+
+Без --url поднимает сервис на временной БД (команды и матчи генерируются)
+и прогоняет смесь запросов: таблица, статистика и матчи команд, лидеры.
+Режимы: cold — кэш ответов сбрасывается перед каждым запросом,
+warm — ответы из кэша, etag — клиент присылает If-None-Match и получает 304.
+
+Запуск:
+    python benchmarks/load_test_server.py [--requests 2000] [--clients 8] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.client import HTTPConnection
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sports_team import db
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.matchday import Matchday
+from sports_team.server import ThreadPoolHTTPServer
+
+
+def populate(n_teams=40, rounds=10, seed=0):
+    rng = random.Random(seed)
+    teams = []
+    for i in range(n_teams):
+        team = Team(f"Команда {i}")
+        for n in range(1, 12):
+            team.add_player(Forward(f"Игрок {i}-{n}", n))
+        teams.append(team)
+    start = datetime.now() - timedelta(days=rounds)
+    matches = []
+    for r in range(rounds):
+        order = rng.sample(teams, len(teams))
+        for a, b in zip(order[::2], order[1::2]):
+            m = Match(a, b, start + timedelta(days=r))
+            for minute in sorted(rng.sample(range(1, 91), rng.randint(0, 4))):
+                m.record_goal(rng.choice(rng.choice((a, b)).players), minute)
+            m.finalize_match()
+            matches.append(m)
+    Matchday(matches).commit()
+    return [t.name for t in teams]
+
+
+def make_paths(team_names, count, seed=1):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        team = quote(rng.choice(team_names))
+        paths.append(rng.choice([
+            "/standings",
+            f"/teams/{team}/stats",
+            f"/teams/{team}/matches?limit=5",
+            "/leaders?limit=10",
+        ]))
+    return paths
+
+
+def run(host, port, paths, clients, mode, server=None):
+    latencies = []
+    lock = threading.Lock()
+    chunks = [paths[i::clients] for i in range(clients)]
+
+    def client(chunk):
+        conn = HTTPConnection(host, port, timeout=30)
+        etags = {}
+        local = []
+        for path in chunk:
+            if mode == "cold" and server is not None:
+                server.responses.clear()
+            headers = {"If-None-Match": etags[path]} if mode == "etag" and path in etags else {}
+            start = time.perf_counter()
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            local.append(time.perf_counter() - start)
+            if response.status not in (200, 304):
+                raise RuntimeError(f"{path}: HTTP {response.status}")
+            etags[path] = response.getheader("ETag")
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in chunks]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    print(f"{mode:>5}: {len(latencies) / elapsed:8.0f} запр/с   "
+          f"p50 {pct(50):6.2f} мс   p95 {pct(95):6.2f} мс   p99 {pct(99):6.2f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP-сервиса.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--url", help="адрес уже запущенного сервиса (иначе поднимается свой)")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        names = [row["Команда"] for row in db.get_standings()] or ["Команда 0"]
+        paths = make_paths(names, args.requests)
+        for mode in ("warm", "etag"):
+            run(url.hostname, url.port or 80, paths, args.clients, mode)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db.init_db()
+        paths = make_paths(populate(), args.requests)
+        server = ThreadPoolHTTPServer(("127.0.0.1", 0), workers=args.clients)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            for mode in ("cold", "warm", "etag"):
+                run("127.0.0.1", server.server_port, paths, args.clients, mode, server)
+            print("Кэш ответов:", server.responses.info())
+        finally:
+            server.shutdown()
+            server.server_close()
+            db.close_match_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,16 @@
 ﻿import sys
 import os
-import pickle
-import subprocess
-import platform
 
-from sports_team.player import Forward, Defender, Goalkeeper
-from sports_team.team import Team
-from sports_team.match import Match
-from sports_team.report import save_team_report_docx
-from sports_team.db import init_db, save_team, save_match
+from sports_team.db import init_db, save_team, save_match, close_match_cache, flush, remove_season_partitions
+from sports_team.snapshot import write_snapshot, load_snapshot, convert_pickle
+from sports_team.search import PlayerIndex, normalize
+from sports_team.events import League
+from sports_team.profiling import profiled, enable_from_argv, enable_from_env, is_enabled
 
-SAVE_FILE = "teams.pkl"
+SAVE_FILE = "teams.snap"
+LEGACY_SAVE_FILE = "teams.pkl"  # старый формат (pickle), конвертируется при первом запуске
 teams = {}
+league = None  # журнал событий лиги: источник состояния команд
 
 # === Инициализация базы ===
 init_db()
@@ -20,27 +19,38 @@ init_db()
 # === Сохранение и загрузка состояния ===
 def save_state():
     try:
-        with open(SAVE_FILE, "wb") as f:
-            pickle.dump(teams, f)
+        write_snapshot(teams, SAVE_FILE)
     except Exception as e:
         print("Ошибка при сохранении состояния:", e)
 
 
+@profiled
 def load_state():
-    global teams
+    global teams, league
+    if not os.path.exists(SAVE_FILE) and os.path.exists(LEGACY_SAVE_FILE):
+        try:
+            convert_pickle(LEGACY_SAVE_FILE, SAVE_FILE)
+            print(f"Файл {LEGACY_SAVE_FILE} переведён в формат {SAVE_FILE}.")
+        except Exception as e:
+            print("Ошибка при конвертации старого состояния:", e)
     if os.path.exists(SAVE_FILE):
         try:
-            with open(SAVE_FILE, "rb") as f:
-                loaded = pickle.load(f)
-                if isinstance(loaded, dict):
-                    teams.update(loaded)
+            teams.update(load_snapshot(SAVE_FILE))
         except Exception:
             teams = {}
     else:
         teams = {}
+    # Состояние — воспроизведение журнала событий (снимок + хвост); игроки попадают в индекс поиска лиги
+    league = League.open()
+    if not league.teams and teams:
+        # Первый запуск с журналом: переносим команды из файла состояния
+        league.import_teams(teams.values())
+        print(f"Команды из {SAVE_FILE} перенесены в журнал событий.")
+    teams = {name.lower(): team for name, team in league.teams.items()}
 
 
 # === Работа с командами ===
+@profiled
 def create_team():
     """Создание новой команды."""
     name = input("Введите название команды: ").strip()
@@ -53,11 +63,12 @@ def create_team():
         print(f"Команда '{name}' уже существует.")
         return
 
-    teams[key] = Team(name)
+    teams[key] = league.create_team(name)
     save_state()
     print(f"Команда '{name}' успешно создана.")
 
 
+@profiled
 def add_player_to_team():
     """Добавление игрока в команду."""
     if not teams:
@@ -101,20 +112,21 @@ def add_player_to_team():
 
     # === Создаём игрока нужного подкласса ===
     if "напад" in position:
-        player = Forward(player_name, number)
+        kind = "Forward"
     elif "защит" in position:
-        player = Defender(player_name, number)
+        kind = "Defender"
     elif "врат" in position:
-        player = Goalkeeper(player_name, number)
+        kind = "Goalkeeper"
     else:
         print("Неизвестная позиция. Используйте: Нападающий, Защитник или Вратарь.")
         return
 
-    team.add_player(player)
+    player = league.add_player(team.name, player_name, number, kind=kind)
     save_state()
     print(f"✅ Игрок {player_name} ({player.role()}) добавлен в команду {team.name}.")
 
 
+@profiled
 def show_team_info():
     """Вывод информации о команде."""
     if not teams:
@@ -160,6 +172,7 @@ def list_all_teams():
 
 
 # === Матчи ===
+@profiled
 def record_match():
     """Проведение матча между двумя командами."""
     if len(teams) < 2:
@@ -179,7 +192,8 @@ def record_match():
         print("Нельзя провести матч между одной и той же командой.")
         return
 
-    match = Match(team_a, team_b)
+    match = league.start_match(team_a.name, team_b.name)
+    scorers = PlayerIndex.from_teams([team_a, team_b])
     print(f"\nМатч {team_a.name} vs {team_b.name} начался!")
 
     while True:
@@ -196,30 +210,34 @@ def record_match():
             print("Введите число для минуты.")
             continue
 
-        # --- Поиск игрока ---
-        found_player = None
-        for team in [team_a, team_b]:
-            for p in team.players:
-                if p.name.lower() == goal.lower():
-                    found_player = p
-                    break
-            if found_player:
-                break
-
-        if not found_player:
+        # --- Поиск игрока: точное имя, начало имени или имя с опечаткой ---
+        results = scorers.search(goal, limit=5)
+        if not results:
             print("Игрок не найден в обеих командах.")
             continue
+        if len(results) > 1 and results[0].score == results[1].score:
+            print("Найдено несколько игроков, уточните имя:")
+            for r in results:
+                print(f"  {r.player.name} ({r.team.name}, №{r.player.number})")
+            continue
+        best = results[0]
+        # Без подтверждения засчитывается только точное имя: опечатка не должна отдать гол другому
+        if normalize(best.player.name) != normalize(goal):
+            answer = input(f"Имелся в виду {best.player.name} ({best.team.name}, №{best.player.number})? "
+                           f"(да/нет): ").strip().lower()
+            if not answer.startswith("д"):
+                print("Гол не засчитан. Введите имя игрока точнее.")
+                continue
+        found_player = best.player
 
-        match.record_goal(found_player, minute)
+        league.record_goal(match, found_player, minute)
         print(f"⚽ Гол! {found_player.name} ({found_player.role()}) на {minute}-й минуте!")
 
     print("\n" + match.summary())
     winner = match.winner()
     print(f"🏆 Победитель: {winner.name if winner else 'Ничья'}")
 
-    match.finalize_match()
-    match.team_a.matches = getattr(match.team_a, "matches", []) + [match]
-    match.team_b.matches = getattr(match.team_b, "matches", []) + [match]
+    league.finalize_match(match)
 
     save_match(match)
     save_team(match.team_a)
@@ -227,6 +245,7 @@ def record_match():
     save_state()
 
 
+@profiled
 def save_report():
     """Создание .docx отчёта о команде."""
     if not teams:
@@ -243,14 +262,18 @@ def save_report():
         print(f"Команда '{name}' не найдена.")
         return
 
-    filename = f"report_{team.name.replace(' ', '_')}.docx"
     try:
-        save_team_report_docx(team, filename)
-        print(f"📄 Отчёт сохранён: {filename}")
+        from sports_team.report import save_team_report_docx, report_filename
+        filename = report_filename(team)
+        if save_team_report_docx(team, filename):
+            print(f"📄 Отчёт сохранён: {filename}")
+        else:
+            print(f"📄 Данные команды не изменились, отчёт {filename} актуален.")
     except Exception as e:
         print("Ошибка при сохранении отчёта:", e)
 
 
+@profiled
 def save_all_to_db():
     """Сохранение всех данных в базу."""
     if not teams:
@@ -259,23 +282,32 @@ def save_all_to_db():
 
     try:
         init_db()
-        for team in teams.values():
-            save_team(team)
-        print("Все данные сохранены в базу данных.")
+        written = flush(teams.values())
+        if not written["Команды"]:
+            print("Изменений нет — база данных актуальна.")
+        else:
+            print(f"Все данные сохранены в базу данных "
+                  f"(команд: {written['Команды']}, игроков: {written['Игроки']}).")
     except Exception as e:
         print("Ошибка при сохранении:", e)
  
+@profiled
 def clear_state():
-    """Полностью очищает сохранённые данные (файл teams.pkl и базу данных)."""
-    global teams
+    """Полностью очищает сохранённые данные (файл состояния и базу данных)."""
+    global teams, league
     teams = {}
-    if os.path.exists(SAVE_FILE):
-        os.remove(SAVE_FILE)
-        print("Файл состояния teams.pkl удалён.")
+    for path in (SAVE_FILE, LEGACY_SAVE_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"Файл состояния {path} удалён.")
+    close_match_cache()
     if os.path.exists("sports.db"):
         os.remove("sports.db")
         print("База данных sports.db удалена.")
+    for path in remove_season_partitions():
+        print(f"Архив {path} удалён.")
     init_db()
+    league = League.open()
     print("Всё очищено, можно начать заново!")
  
 def open_database():
@@ -286,6 +318,7 @@ def open_database():
         return
 
     try:
+        import platform  # тянет subprocess — не нужен до открытия БД
         system = platform.system()
         os.startfile(db_path)
         print(f"Открыта база данных: {db_path}")
@@ -340,6 +373,10 @@ def menu():
 
 # === Точка входа ===
 if __name__ == "__main__":
+    enable_from_env()
+    enable_from_argv(sys.argv[1:])
     print("Добро пожаловать в систему управления спортивной командой!")
+    if is_enabled():
+        print("Режим профилирования: профиль каждого действия сохраняется в файлы.")
     load_state()
     menu()
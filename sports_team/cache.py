@@ -0,0 +1,78 @@
+﻿# sports_team/cache.py
+"""Ограниченный LRU-кэш со счётчиками попаданий/промахов и необязательным TTL."""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    LRU-кэш фиксированного размера.
+    Если задан ttl (в секундах), записи старше ttl считаются устаревшими.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = None):
+        if maxsize <= 0:
+            raise ValueError("Размер кэша должен быть положительным.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (время записи, значение)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Возвращает значение по ключу (и помечает его как недавно использованное)."""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and self.ttl is not None \
+                    and time.monotonic() - item[0] > self.ttl:
+                del self._data[key]
+                item = _MISSING
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        """Кладёт значение в кэш, вытесняя самую старую запись при переполнении."""
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, predicate):
+        """Удаляет все записи, ключ которых удовлетворяет predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        """Очищает кэш (счётчики сохраняются)."""
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> dict:
+        """Статистика кэша."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __repr__(self):
+        return f"LRUCache(size={len(self._data)}, maxsize={self.maxsize}, ttl={self.ttl})"
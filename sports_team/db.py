@@ -1,9 +1,34 @@
 ﻿# sports_team/db.py
 import sqlite3
 import os
+import re
+import glob
+import stat
+import threading
+import pathlib
 from datetime import datetime
+from typing import NamedTuple
+
+from sports_team import ratings
+from sports_team.cache import LRUCache
+from sports_team.ledger import MatchRecord
+from sports_team.profiling import profiled
 
 DB_NAME = "sports.db"
+# Месяц, с которого начинается сезон (7 — сезон "2024-2025" идёт с июля по июнь)
+SEASON_START_MONTH = 7
+
+# Кэш матчей/статистики команд. Ключ: (путь к БД, вид запроса, команда).
+_match_cache = LRUCache(maxsize=256)
+# Отдельное долгоживущее подключение, по которому отслеживается PRAGMA data_version:
+# значение меняется, когда БД изменяет любое другое подключение (в т.ч. другой процесс).
+_watch = {"path": None, "conn": None, "version": None, "changes": None}
+_watch_lock = threading.Lock()
+
+# Версия схемы (PRAGMA user_version). Увеличивается при каждом изменении DDL в _create_schema.
+SCHEMA_VERSION = 5
+# Пути к БД, схема которых уже проверена в этом процессе
+_schema_ready = set()
 
 
 def get_connection():
@@ -11,11 +36,458 @@ def get_connection():
     return sqlite3.connect(DB_NAME)
 
 
+# === Сезоны ===
+# Основной файл DB_NAME хранит команды, игроков и матчи текущего сезона (цель записи).
+# Закрытые сезоны переносятся archive_season() в отдельные файлы <имя>_<сезон>.db,
+# которые только читаются. Чтение идёт через временное представление all_matches:
+# архивы подключаются через ATTACH, таблицы объединяются UNION ALL.
+def season_of(date) -> str:
+    """Название сезона, к которому относится дата ("2024-2025" или "2024", если сезон = год)."""
+    year = date.year if date.month >= SEASON_START_MONTH else date.year - 1
+    return f"{year}-{year + 1}" if SEASON_START_MONTH > 1 else str(year)
+
+
+def current_season() -> str:
+    """Текущий сезон — в него пишутся новые матчи."""
+    return season_of(datetime.now())
+
+
+def _season_bounds(season):
+    """Границы сезона [начало, конец) в формате столбца date."""
+    year = int(season.split("-")[0])
+    start = f"{year:04d}-{SEASON_START_MONTH:02d}-01 00:00:00"
+    end = f"{year + 1:04d}-{SEASON_START_MONTH:02d}-01 00:00:00"
+    return start, end
+
+
+def season_db_path(season) -> str:
+    """Путь к файлу архива сезона."""
+    stem, ext = os.path.splitext(DB_NAME)
+    return f"{stem}_{season}{ext or '.db'}"
+
+
+def old_seasons_db_path() -> str:
+    """Путь к сводному архиву самых старых сезонов (если архивов больше лимита ATTACH)."""
+    stem, ext = os.path.splitext(DB_NAME)
+    return f"{stem}_old{ext or '.db'}"
+
+
+def list_season_partitions():
+    """Список архивных сезонов [(сезон, путь), ...] по возрастанию."""
+    stem, ext = os.path.splitext(DB_NAME)
+    ext = ext or ".db"
+    pattern = re.compile(re.escape(os.path.basename(stem)) + r"_(\d{4}(?:-\d{4})?)" + re.escape(ext) + "$")
+    found = []
+    for path in glob.glob(f"{glob.escape(stem)}_*{ext}"):
+        m = pattern.search(os.path.basename(path))
+        if m:
+            found.append((m.group(1), path))
+    return sorted(found)
+
+
+_MATCH_COLUMNS = "id, team_a, team_b, score_a, score_b, date, pair_key"
+_EVENT_COLUMNS = "id, match_id, minute, team, player_name, player_number"
+
+
+def _attach_limit(conn) -> int:
+    """Сколько баз можно подключить через ATTACH (SQLITE_MAX_ATTACHED, обычно 10)."""
+    return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+
+def _read_only_uri(path) -> str:
+    return pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+
+
+def _old_seasons(partitions, limit):
+    """Архивы, которые читаются из сводного файла: все, кроме limit - 1 самых новых."""
+    return partitions[:len(partitions) - limit + 1] if len(partitions) > limit else []
+
+
+def _ensure_old_seasons(partitions) -> str:
+    """
+    Сводный архив сезонов partitions (только матчи и события, с индексами).
+    Собирается один раз и пересобирается, только когда меняется список сезонов.
+    """
+    path = old_seasons_db_path()
+    expected = [season for season, _ in partitions]
+    if os.path.exists(path):
+        conn = sqlite3.connect(_read_only_uri(path), uri=True)
+        try:
+            stored = [row[0] for row in conn.execute("SELECT season FROM seasons ORDER BY season;")]
+        except sqlite3.DatabaseError:
+            stored = None
+        finally:
+            conn.close()
+        if stored == expected:
+            return path
+
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    _remove_file(tmp_path)
+    try:
+        conn = sqlite3.connect(tmp_path, uri=True)
+        try:
+            cur = conn.cursor()
+            cur.execute("CREATE TABLE seasons (season TEXT PRIMARY KEY);")
+            for i, (season, part) in enumerate(partitions):
+                cur.execute("ATTACH DATABASE ? AS part;", (_read_only_uri(part),))
+                if i == 0:
+                    cur.execute(f"CREATE TABLE matches AS SELECT {_MATCH_COLUMNS} FROM part.matches WHERE 0;")
+                    cur.execute(f"CREATE TABLE match_events AS SELECT {_EVENT_COLUMNS} FROM part.match_events WHERE 0;")
+                cur.execute(f"INSERT INTO matches SELECT {_MATCH_COLUMNS} FROM part.matches;")
+                cur.execute(f"INSERT INTO match_events SELECT {_EVENT_COLUMNS} FROM part.match_events;")
+                cur.execute("INSERT INTO seasons VALUES (?);", (season,))
+                conn.commit()
+                cur.execute("DETACH DATABASE part;")
+            _create_match_indexes(cur)
+            _create_events_table(cur)
+            cur.execute("ANALYZE;")
+            conn.commit()
+        finally:
+            conn.close()
+        os.chmod(tmp_path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+    except BaseException:
+        _remove_file(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_connection(since=None, until=None):
+    """
+    Подключение для чтения матчей: к основной БД read-only подключаются архивы,
+    чьи сезоны пересекаются с [since, until], и создаются представления
+    all_matches и all_match_events.
+    SQLite подключает не больше _attach_limit() баз: если архивов больше, самые
+    старые читаются из сводного архива (см. _ensure_old_seasons).
+    """
+    conn = sqlite3.connect(DB_NAME, uri=True)
+    partitions = list_season_partitions()
+    selected = []
+    for season, path in partitions:
+        start, end = _season_bounds(season)
+        if (since is not None and end <= since) or (until is not None and start > until):
+            continue
+        selected.append((season, path))
+
+    arms = [f"SELECT {_MATCH_COLUMNS} FROM main.matches"]
+    event_arms = [f"SELECT {_EVENT_COLUMNS} FROM main.match_events"]
+    limit = _attach_limit(conn)
+    if len(selected) > limit:
+        old = _old_seasons(partitions, limit)
+        conn.execute("ATTACH DATABASE ? AS old_seasons;", (_read_only_uri(_ensure_old_seasons(old)),))
+        arms.append(f"SELECT {_MATCH_COLUMNS} FROM old_seasons.matches")
+        event_arms.append(f"SELECT {_EVENT_COLUMNS} FROM old_seasons.match_events")
+        consolidated = {season for season, _ in old}
+        selected = [(season, path) for season, path in selected if season not in consolidated]
+    for i, (_, path) in enumerate(selected):
+        alias = f"season_{i}"
+        conn.execute(f"ATTACH DATABASE ? AS {alias};", (_read_only_uri(path),))
+        arms.append(f"SELECT {_MATCH_COLUMNS} FROM {alias}.matches")
+        event_arms.append(f"SELECT {_EVENT_COLUMNS} FROM {alias}.match_events")
+    conn.execute("CREATE TEMP VIEW all_matches AS " + " UNION ALL ".join(arms) + ";")
+    conn.execute("CREATE TEMP VIEW all_match_events AS " + " UNION ALL ".join(event_arms) + ";")
+    return conn
+
+
+def _remove_file(path):
+    """Удаляет файл, в т.ч. уже помеченный только для чтения."""
+    if os.path.exists(path):
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+
+def remove_season_partitions():
+    """Удаляет архивы сезонов и сводный архив; возвращает список удалённых файлов."""
+    paths = [path for _, path in list_season_partitions()]
+    if os.path.exists(old_seasons_db_path()):
+        paths.append(old_seasons_db_path())
+    for path in paths:
+        _remove_file(path)
+    return paths
+
+
+@profiled
+def archive_season(season):
+    """
+    Переносит матчи закрытого сезона в отдельный файл, оптимизирует его (ANALYZE, VACUUM)
+    и делает доступным только для чтения.
+    Архив собирается во временном файле и получает своё имя только готовым; из основной БД
+    удаляются ровно скопированные строки. При ошибке временный файл удаляется, основная БД
+    не меняется — перенос можно повторить. Если процесс прервался после появления архива,
+    повторный вызов (или init_db) удаляет из основной БД строки, которые уже есть в архиве.
+    Возвращает количество перенесённых матчей.
+    """
+    if season >= current_season():
+        raise ValueError("Текущий сезон нельзя перенести в архив.")
+    path = season_db_path(season)
+    if os.path.exists(path):
+        return _drop_archived_rows(path)
+    start, end = _season_bounds(season)
+    tmp_path = path + ".tmp"
+    _remove_file(tmp_path)  # остаток прерванного переноса: основная БД его строки ещё хранит
+
+    try:
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("ATTACH DATABASE ? AS archive;", (tmp_path,))
+            cur.execute("""
+                CREATE TABLE archive.match_events (
+                    id INTEGER PRIMARY KEY,
+                    match_id INTEGER NOT NULL,
+                    minute INTEGER,
+                    team TEXT,
+                    player_name TEXT,
+                    player_number INTEGER
+                );
+            """)
+            cur.execute("""
+                CREATE TABLE archive.player_match_stats (
+                    id INTEGER PRIMARY KEY,
+                    match_id INTEGER NOT NULL,
+                    team TEXT NOT NULL,
+                    player_name TEXT,
+                    player_number INTEGER NOT NULL,
+                    goals INTEGER DEFAULT 0,
+                    assists INTEGER DEFAULT 0,
+                    date TEXT,
+                    season TEXT,
+                    month TEXT
+                );
+            """)
+            cur.execute("""
+                CREATE TABLE archive.matches (
+                    id INTEGER PRIMARY KEY,
+                    team_a TEXT NOT NULL,
+                    team_b TEXT NOT NULL,
+                    score_a INTEGER DEFAULT 0,
+                    score_b INTEGER DEFAULT 0,
+                    date TEXT,
+                    pair_key TEXT
+                );
+            """)
+            # Копия одной транзакцией; основная БД пока не меняется
+            cur.execute("BEGIN;")
+            cur.execute("""
+                INSERT INTO archive.matches (id, team_a, team_b, score_a, score_b, date, pair_key)
+                SELECT id, team_a, team_b, score_a, score_b, date, pair_key
+                FROM main.matches WHERE date >= ? AND date < ?;
+            """, (start, end))
+            moved = cur.rowcount
+            cur.execute("""
+                INSERT INTO archive.match_events (id, match_id, minute, team, player_name, player_number)
+                SELECT id, match_id, minute, team, player_name, player_number
+                FROM main.match_events
+                WHERE match_id IN (SELECT id FROM archive.matches);
+            """)
+            cur.execute("""
+                INSERT INTO archive.player_match_stats
+                SELECT id, match_id, team, player_name, player_number, goals, assists, date, season, month
+                FROM main.player_match_stats WHERE season = ?;
+            """, (season,))
+            conn.commit()
+            cur.execute("DETACH DATABASE archive;")
+        finally:
+            conn.close()
+
+        # Архив больше не меняется: индексы, статистика планировщика, сжатие файла
+        conn = sqlite3.connect(tmp_path)
+        try:
+            _create_match_indexes(conn.cursor())
+            _create_events_table(conn.cursor())
+            conn.execute("ANALYZE;")
+            conn.execute("PRAGMA optimize;")
+            conn.commit()
+            conn.execute("VACUUM;")
+        finally:
+            conn.close()
+        os.chmod(tmp_path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+    except BaseException:
+        _remove_file(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+    # Готовый архив на месте — удаляем из основной БД те же строки
+    try:
+        _drop_archived_rows(path)
+    except Exception:
+        # Удаление откатилось, строки остались в основной БД — архив убираем
+        _remove_file(path)
+        raise
+    partitions = list_season_partitions()
+    conn = get_connection()
+    limit = _attach_limit(conn)
+    conn.close()
+    if len(partitions) > limit:
+        _ensure_old_seasons(_old_seasons(partitions, limit))
+    return moved
+
+
+def _drop_archived_rows(path) -> int:
+    """Удаляет из основной БД матчи, события и статистику, которые уже есть в архиве path."""
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("ATTACH DATABASE ? AS archive;", (path,))
+        cur.execute("BEGIN IMMEDIATE;")
+        cur.execute("DELETE FROM main.match_events WHERE match_id IN (SELECT id FROM archive.matches);")
+        cur.execute("DELETE FROM main.player_match_stats WHERE id IN (SELECT id FROM archive.player_match_stats);")
+        cur.execute("DELETE FROM main.matches WHERE id IN (SELECT id FROM archive.matches);")
+        dropped = cur.rowcount
+        conn.commit()
+        return dropped
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _interrupted_archives(cur):
+    """Архивы прерванных переносов: в основной БД ещё есть матчи их сезонов."""
+    pending = []
+    for season, path in list_season_partitions():
+        start, end = _season_bounds(season)
+        if cur.execute("SELECT 1 FROM matches WHERE date >= ? AND date < ? LIMIT 1;",
+                       (start, end)).fetchone():
+            pending.append(path)
+    return pending
+
+
+# === Кэш ===
+def _db_path():
+    return os.path.abspath(DB_NAME)
+
+
+def _read_data_version(path):
+    """Читает data_version через следящее подключение (переоткрывает его при смене файла БД)."""
+    if _watch["path"] != path:
+        if _watch["conn"] is not None:
+            _watch["conn"].close()
+        _watch["conn"] = sqlite3.connect(path, check_same_thread=False)
+        _watch["path"] = path
+        _watch["version"] = None
+        _watch["changes"] = None
+    return _watch["conn"].execute("PRAGMA data_version;").fetchone()[0]
+
+
+def _match_changes(cur):
+    """Значение счётчика изменений матчей (его увеличивают триггеры на matches)."""
+    try:
+        return cur.execute("SELECT value FROM match_changes WHERE id = 1;").fetchone()[0]
+    except (sqlite3.OperationalError, TypeError):
+        return None  # схема ещё не обновлена — считаем, что изменилось всё
+
+
+def _validate_cache():
+    """
+    Сбрасывает кэш, если матчи в БД изменились в обход этого процесса.
+    Возвращает значение счётчика изменений, которому соответствует кэш (None в режиме TTL).
+    """
+    if _match_cache.ttl is not None:
+        return None  # в режиме TTL записи устаревают по времени, БД не опрашивается
+    path = _db_path()
+    with _watch_lock:
+        version = _read_data_version(path)
+        if version != _watch["version"]:
+            # data_version говорит лишь «что-то изменилось»; сколько изменений было — по счётчику
+            changes = _match_changes(_watch["conn"])
+            if changes is None or changes != _watch["changes"]:
+                _match_cache.invalidate(lambda key: key[0] == path)
+            _watch["version"] = version
+            _watch["changes"] = changes
+        return _watch["changes"]
+
+
+def _invalidate_teams(*team_names, changes=None):
+    """
+    Удаляет из кэша записи указанных команд.
+    changes — пара (до, после) значений счётчика изменений в транзакции записи:
+    «до» возвращает _validate_cache() под блокировкой записи (после BEGIN IMMEDIATE),
+    «после» читается перед COMMIT. Если кэш всё ещё соответствует «до», своё изменение
+    учтено точечно и кэш считается соответствующим «после».
+    """
+    path = _db_path()
+    names = set(team_names)
+    _match_cache.invalidate(lambda key: key[0] == path and key[2] in names)
+    if _match_cache.ttl is None and changes is not None:
+        before, after = changes
+        with _watch_lock:
+            # Чужая фиксация после нашей снова увеличит счётчик, и следующая проверка
+            # сбросит кэш целиком: data_version здесь не перечитывается.
+            if _watch["path"] == path and before is not None and _watch["changes"] == before:
+                _watch["changes"] = after
+
+
+def data_version():
+    """
+    Счётчик изменений БД (PRAGMA data_version следящего подключения):
+    меняется после каждой фиксации из любого другого подключения или процесса.
+    """
+    path = _db_path()
+    with _watch_lock:
+        return _read_data_version(path)
+
+
+def configure_match_cache(maxsize: int = 256, ttl: float = None):
+    """
+    Перенастраивает кэш матчей.
+    ttl=None — записи живут, пока не изменится БД (проверка через PRAGMA data_version);
+    ttl=N — явный режим TTL: записи устаревают через N секунд, БД не опрашивается.
+    """
+    global _match_cache
+    _match_cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+def match_cache_info() -> dict:
+    """Счётчики попаданий/промахов кэша матчей."""
+    return _match_cache.info()
+
+
+def close_match_cache():
+    """Очищает кэш и закрывает следящее подключение (нужно перед удалением файла БД)."""
+    _match_cache.clear()
+    _schema_ready.clear()
+    with _watch_lock:
+        if _watch["conn"] is not None:
+            _watch["conn"].close()
+        _watch.update(path=None, conn=None, version=None, changes=None)
+
+
 def init_db():
-    """Создаёт все таблицы, если их нет."""
+    """
+    Создаёт или обновляет схему БД, если её версия (PRAGMA user_version) устарела.
+    Для актуальной БД это один PRAGMA, без DDL (и проверка прерванных переносов в архив).
+    """
     conn = get_connection()
-    cur = conn.cursor()
+    backfill = False
+    try:
+        if conn.execute("PRAGMA user_version;").fetchone()[0] < SCHEMA_VERSION:
+            cur = conn.cursor()
+            _create_schema(cur)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+            conn.commit()
+            # В БД до появления рейтингов матчи уже есть, а рейтингов нет — считаем по истории
+            backfill = (cur.execute("SELECT 1 FROM matches LIMIT 1;").fetchone() is not None
+                        and cur.execute("SELECT 1 FROM ratings LIMIT 1;").fetchone() is None)
+        interrupted = _interrupted_archives(conn.cursor())
+    finally:
+        conn.close()
+    for path in interrupted:
+        _drop_archived_rows(path)
+    _schema_ready.add(_db_path())
+    if backfill:
+        recompute_ratings()
+
+
+def _ensure_schema():
+    """Проверяет схему один раз на файл БД за время работы процесса."""
+    if _db_path() not in _schema_ready:
+        init_db()
 
+
+def _create_schema(cur):
+    """Создаёт все таблицы и индексы (идемпотентно: старые БД дополняются)."""
     # Таблица команд
     cur.execute("""
         CREATE TABLE IF NOT EXISTS teams (
@@ -38,6 +510,7 @@ def init_db():
             FOREIGN KEY (team_id) REFERENCES teams (id)
         );
     """)
+    _prepare_players_table(cur)
 
     # Таблица матчей
     cur.execute("""
@@ -47,15 +520,298 @@ def init_db():
             team_b TEXT NOT NULL,
             score_a INTEGER DEFAULT 0,
             score_b INTEGER DEFAULT 0,
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            pair_key TEXT
         );
     """)
+    _prepare_matches_table(cur)
+    _create_change_counter(cur)
+    _create_events_table(cur)
+    _create_player_stats_tables(cur)
+    ratings.create_tables(cur)
+    _create_event_log_tables(cur)
+    _create_fixtures_table(cur)
 
-    conn.commit()
+
+def _prepare_players_table(cur):
+    """Один игрок с данным номером в команде: убирает старые дубли и создаёт уникальный индекс."""
+    cur.execute("""
+        DELETE FROM players
+        WHERE id NOT IN (SELECT MAX(id) FROM players GROUP BY team_id, number);
+    """)
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_players_team_number ON players (team_id, number);")
+
+
+def _create_events_table(cur):
+    """Таблица голевых событий матчей."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS match_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            minute INTEGER,
+            team TEXT,
+            player_name TEXT,
+            player_number INTEGER,
+            FOREIGN KEY (match_id) REFERENCES matches (id)
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_match_events_match ON match_events (match_id);")
+
+
+def _create_event_log_tables(cur):
+    """Журнал событий лиги (только добавление) и его периодические снимки (см. events.py)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS event_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT NOT NULL,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_event_log_ts ON event_log (ts);")
+    # Изменять и удалять события нельзя
+    for action in ("UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS event_log_no_{action.lower()}
+            BEFORE {action} ON event_log
+            BEGIN
+                SELECT RAISE(ABORT, 'Журнал событий только дополняется.');
+            END;
+        """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS event_log_snapshots (
+            seq INTEGER PRIMARY KEY,
+            ts TEXT NOT NULL,
+            state BLOB NOT NULL
+        );
+    """)
+
+
+_FIXTURE_INDEXES = {
+    "idx_fixtures_date": "fixtures (date)",
+    "idx_fixtures_team_a": "fixtures (team_a, date)",
+    "idx_fixtures_team_b": "fixtures (team_b, date)",
+}
+
+
+def _create_fixtures_table(cur):
+    """Календарь запланированных матчей (см. schedule.py): team_a — хозяева."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS fixtures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            season TEXT,
+            division TEXT NOT NULL DEFAULT '',
+            round INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            team_a TEXT NOT NULL,
+            team_b TEXT NOT NULL
+        );
+    """)
+    for name, target in _FIXTURE_INDEXES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target};")
+
+
+def _event_rows(match, match_id):
+    """Строки match_events для событий матча."""
+    rows = []
+    for e in match.events:
+        player = e.get("player")
+        rows.append((match_id, e.get("minute"), e["team"] if e["team"] in ("A", "B") else None,
+                     getattr(player, "name", None), getattr(player, "number", None)))
+    return rows
+
+
+# === Статистика игроков по матчам ===
+# player_match_stats — факты (игрок × матч); player_season_stats и player_month_stats —
+# агрегаты, которые обновляются в той же транзакции, что и запись матча.
+# Запросы карьеры и лидеров читают только агрегаты.
+_PERIODS = {"season": ("player_season_stats", "season"), "month": ("player_month_stats", "month")}
+_STATS = {"goals", "assists", "games"}
+
+
+def _create_player_stats_tables(cur):
+    """Таблица фактов по игрокам и агрегаты по сезонам и месяцам."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS player_match_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            team TEXT NOT NULL,
+            player_name TEXT,
+            player_number INTEGER NOT NULL,
+            goals INTEGER DEFAULT 0,
+            assists INTEGER DEFAULT 0,
+            date TEXT,
+            season TEXT,
+            month TEXT,
+            FOREIGN KEY (match_id) REFERENCES matches (id)
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_player_match_stats_player
+        ON player_match_stats (team, player_number, date);
+    """)
+    for table, column in _PERIODS.values():
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {column} TEXT NOT NULL,
+                team TEXT NOT NULL,
+                player_number INTEGER NOT NULL,
+                player_name TEXT,
+                games INTEGER DEFAULT 0,
+                goals INTEGER DEFAULT 0,
+                assists INTEGER DEFAULT 0,
+                PRIMARY KEY ({column}, team, player_number)
+            );
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_goals ON {table} ({column}, goals);")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_player ON {table} (team, player_number);")
+
+
+def _player_stat_rows(match, match_id):
+    """
+    Строки player_match_stats для матча. Участниками считаются все игроки
+    обеих команд на момент сохранения; голы берутся из событий матча.
+    """
+    goals = {}
+    for e in match.events:
+        player = e.get("player")
+        if player is not None:
+            goals[id(player)] = goals.get(id(player), 0) + 1
+    date_str = match.date.strftime("%Y-%m-%d %H:%M:%S")
+    season, month = season_of(match.date), match.date.strftime("%Y-%m")
+    rows = []
+    for team in (match.team_a, match.team_b):
+        for p in team.players:
+            rows.append((match_id, team.name, p.name, p.number, goals.get(id(p), 0), 0,
+                         date_str, season, month))
+    return rows
+
+
+def _apply_player_stats(cur, rows):
+    """Записывает факты и добавляет их к агрегатам по сезонам и месяцам."""
+    cur.executemany("""
+        INSERT INTO player_match_stats
+            (match_id, team, player_name, player_number, goals, assists, date, season, month)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+    """, rows)
+    for (table, column), period_index in ((_PERIODS["season"], 7), (_PERIODS["month"], 8)):
+        # Сначала суммируем в памяти — одна строка агрегата на игрока и период
+        totals = {}
+        for row in rows:
+            key = (row[period_index], row[1], row[3])
+            t = totals.get(key)
+            if t is None:
+                totals[key] = [row[2], 1, row[4], row[5]]
+            else:
+                t[0] = row[2]
+                t[1] += 1
+                t[2] += row[4]
+                t[3] += row[5]
+        cur.executemany(f"""
+            INSERT INTO {table} ({column}, team, player_number, player_name, games, goals, assists)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT ({column}, team, player_number) DO UPDATE SET
+                player_name = excluded.player_name,
+                games = {table}.games + excluded.games,
+                goals = {table}.goals + excluded.goals,
+                assists = {table}.assists + excluded.assists;
+        """, [(k[0], k[1], k[2], *v) for k, v in totals.items()])
+
+
+def get_player_career(team_name, number, period="season"):
+    """Карьерная кривая игрока: статистика по сезонам (period="season") или месяцам ("month")."""
+    if period not in _PERIODS:
+        raise ValueError("Период должен быть 'season' или 'month'.")
+    table, column = _PERIODS[period]
+    conn = get_connection()
+    rows = conn.execute(f"""
+        SELECT {column}, games, goals, assists
+        FROM {table}
+        WHERE team = ? AND player_number = ?
+        ORDER BY {column};
+    """, (team_name, number)).fetchall()
+    conn.close()
+    return [{"Период": r[0], "Матчи": r[1], "Голы": r[2], "Передачи": r[3]} for r in rows]
+
+
+def get_period_leaders(value, stat="goals", period="season", limit=10):
+    """Лидеры периода (например, сезона "2024-2025" или месяца "2024-05") по goals/assists/games."""
+    if period not in _PERIODS:
+        raise ValueError("Период должен быть 'season' или 'month'.")
+    if stat not in _STATS:
+        raise ValueError("Показатель должен быть goals, assists или games.")
+    table, column = _PERIODS[period]
+    conn = get_connection()
+    rows = conn.execute(f"""
+        SELECT player_name, team, player_number, games, goals, assists
+        FROM {table}
+        WHERE {column} = ?
+        ORDER BY {stat} DESC, player_name
+        LIMIT ?;
+    """, (value, limit)).fetchall()
     conn.close()
+    return [{"Имя": r[0], "Команда": r[1], "Номер": r[2], "Матчи": r[3], "Голы": r[4], "Передачи": r[5]}
+            for r in rows]
+
+
+# Разделитель в ключе пары команд (символ, которого не бывает в названиях)
+_PAIR_SEP = "\x1f"
+
+
+def _pair_key(team_x, team_y):
+    """Ключ пары команд, не зависящий от того, кто играл дома."""
+    first, second = sorted((team_x, team_y))
+    return f"{first}{_PAIR_SEP}{second}"
+
+
+def _create_change_counter(cur):
+    """
+    Счётчик изменений матчей: триггеры увеличивают его в той же транзакции, что и изменение,
+    поэтому по нему видно, были ли чужие фиксации помимо своей (см. _invalidate_teams).
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS match_changes (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value INTEGER NOT NULL
+        );
+    """)
+    cur.execute("INSERT OR IGNORE INTO match_changes (id, value) VALUES (1, 0);")
+    for action in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS matches_{action.lower()}_counted AFTER {action} ON matches
+            BEGIN
+                UPDATE match_changes SET value = value + 1 WHERE id = 1;
+            END;
+        """)
+
+
+def _prepare_matches_table(cur):
+    """Дополняет таблицу matches столбцом pair_key (для старых БД) и создаёт индексы."""
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(matches);")}
+    if "pair_key" not in columns:
+        cur.execute("ALTER TABLE matches ADD COLUMN pair_key TEXT;")
+    cur.execute("""
+        UPDATE matches SET pair_key = CASE
+            WHEN team_a <= team_b THEN team_a || char(31) || team_b
+            ELSE team_b || char(31) || team_a
+        END
+        WHERE pair_key IS NULL;
+    """)
+    _create_match_indexes(cur)
+
+
+def _create_match_indexes(cur):
+    """Индексы таблицы matches."""
+    # Очные встречи: одна индексная выборка по паре независимо от того, кто хозяин
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_matches_pair_date ON matches (pair_key, date);")
+    # Выборки матчей команды по диапазону дат
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (date);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_matches_team_a_date ON matches (team_a, date);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_matches_team_b_date ON matches (team_b, date);")
 
 
 # === Сохранение данных ===
+@profiled
 def save_team(team):
     """Сохраняет команду и её игроков."""
     conn = get_connection()
@@ -80,24 +836,74 @@ def save_team(team):
 
     conn.commit()
     conn.close()
+    team.mark_clean()
+
+
+@profiled
+def flush(teams):
+    """
+    Записывает в БД только изменённые команды и игроков — одной транзакцией.
+    Новые строки вставляются, существующие обновляются по (team_id, number).
+    Возвращает {"Команды": ..., "Игроки": ...} — сколько записано.
+    """
+    dirty = []
+    for team in teams:
+        players = team.dirty_players()
+        if team._dirty or players:
+            dirty.append((team, players))
+    if not dirty:
+        return {"Команды": 0, "Игроки": 0}
+
+    names = [team.name for team, _ in dirty]
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE;")
+        cur.executemany("INSERT OR IGNORE INTO teams (name) VALUES (?);", [(n,) for n in names])
+        team_ids = {}
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            cur.execute(f"SELECT name, id FROM teams WHERE name IN ({','.join('?' * len(chunk))});", chunk)
+            team_ids.update(cur.fetchall())
+        rows = [(p.name, p.number, p.position, p.goals, p.assists, p.games, team_ids[team.name])
+                for team, players in dirty for p in players]
+        cur.executemany("""
+            INSERT INTO players (name, number, position, goals, assists, games, team_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (team_id, number) DO UPDATE SET
+                name = excluded.name,
+                position = excluded.position,
+                goals = excluded.goals,
+                assists = excluded.assists,
+                games = excluded.games;
+        """, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    # Флаги снимаются только после успешной фиксации
+    for team, players in dirty:
+        team._dirty = False
+        for p in players:
+            p._dirty = False
+    return {"Команды": len(dirty), "Игроки": len(rows)}
 
 
+@profiled
 def save_match(match):
     """Сохраняет результат матча в базу данных."""
+    _ensure_schema()
     conn = get_connection()
     cur = conn.cursor()
 
-    # Проверяем, что таблица существует
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS matches (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            team_a TEXT NOT NULL,
-            team_b TEXT NOT NULL,
-            score_a INTEGER DEFAULT 0,
-            score_b INTEGER DEFAULT 0,
-            date TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
+    # Архивные сезоны открыты только для чтения
+    season = season_of(match.date)
+    if any(s == season for s, _ in list_season_partitions()):
+        conn.close()
+        raise ValueError(f"Сезон {season} перенесён в архив и закрыт для записи.")
 
     # Считаем голы для обеих команд
     goals_a = sum(1 for e in match.events if e["team"] == "A")
@@ -106,42 +912,238 @@ def save_match(match):
     # Преобразуем дату в текст, чтобы SQLite точно сохранил
     date_str = match.date.strftime("%Y-%m-%d %H:%M:%S")
 
-    # Записываем матч
-    cur.execute("""
-        INSERT INTO matches (team_a, team_b, score_a, score_b, date)
-        VALUES (?, ?, ?, ?, ?);
-    """, (match.team_a.name, match.team_b.name, goals_a, goals_b, date_str))
+    # Записываем матч; пока держим блокировку записи, сверяем кэш с чужими изменениями
+    try:
+        cur.execute("BEGIN IMMEDIATE;")
+        changes_before = _validate_cache()
+        cur.execute("""
+            INSERT INTO matches (team_a, team_b, score_a, score_b, date, pair_key)
+            VALUES (?, ?, ?, ?, ?, ?);
+        """, (match.team_a.name, match.team_b.name, goals_a, goals_b, date_str,
+              _pair_key(match.team_a.name, match.team_b.name)))
+        match_id = cur.lastrowid
+        cur.executemany("""
+            INSERT INTO match_events (match_id, minute, team, player_name, player_number)
+            VALUES (?, ?, ?, ?, ?);
+        """, _event_rows(match, match_id))
+        _apply_player_stats(cur, _player_stat_rows(match, match_id))
+        replayed_from = ratings.apply_matches(
+            cur, [(match_id, match.team_a.name, match.team_b.name, goals_a, goals_b, date_str)],
+            archived_until=_archived_until())
+        changes_after = _match_changes(cur)
 
-    conn.commit()
-    conn.close()
+        conn.commit()
+    except BaseException:
+        # Без отката незакрытое подключение продолжало бы держать блокировку записи
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    _finish_ratings_replay(replayed_from)
+    _invalidate_teams(match.team_a.name, match.team_b.name, changes=(changes_before, changes_after))
     print(f"✅ Матч сохранён: {match.team_a.name} {goals_a}:{goals_b} {match.team_b.name}")
 
 
 
 # === Загрузка данных ===
-def load_team_matches(team_name):
-    """Загружает все матчи команды из БД."""
-    conn = get_connection()
-    cur = conn.cursor()
+# Сколько строк читать из курсора за раз в потоковых итераторах (fetchmany)
+FETCH_CHUNK = 500
 
-    cur.execute("""
+
+class MatchRow(NamedTuple):
+    """Строка матча (тот же порядок полей, что у кортежей load_team_matches)."""
+    team_a: str
+    team_b: str
+    score_a: int
+    score_b: int
+    date: str
+
+
+def as_match_record(team_name):
+    """
+    Фабрика строк: превращает строку матча в MatchRecord с точки зрения team_name
+    (соперник, забито, пропущено, дома ли, дата) — как записи журнала Team.matches.
+    """
+    def factory(row):
+        team_a, team_b, score_a, score_b, date = row
+        when = datetime.fromisoformat(date) if date else None
+        if team_a == team_name:
+            return MatchRecord(team_b, score_a or 0, score_b or 0, True, when)
+        return MatchRecord(team_a, score_b or 0, score_a or 0, False, when)
+    return factory
+
+
+def _iter_rows(sql, params=(), chunk_size=FETCH_CHUNK, row_factory=None):
+    """
+    Генератор строк запроса к all_matches, читающий их пачками по chunk_size.
+    Подключение открывается при первой строке и закрывается по окончании перебора.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Размер пачки должен быть положительным.")
+
+    def rows():
+        conn = _read_connection()
+        try:
+            cur = conn.execute(sql, params)
+            while True:
+                chunk = cur.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                if row_factory is None:
+                    yield from chunk
+                else:
+                    yield from map(row_factory, chunk)
+        finally:
+            conn.close()
+    return rows()
+
+
+def iter_team_matches(team_name, chunk_size=FETCH_CHUNK, row_factory=None):
+    """
+    Лениво перебирает матчи команды в порядке дат, читая их пачками (минуя кэш).
+    row_factory — функция над строкой-кортежем, например MatchRow._make или as_match_record(team).
+    Память не зависит от количества матчей.
+    """
+    return _iter_rows("""
         SELECT team_a, team_b, score_a, score_b, date
-        FROM matches
+        FROM all_matches
         WHERE team_a = ? OR team_b = ?
         ORDER BY date;
-    """, (team_name, team_name))
+    """, (team_name, team_name), chunk_size, row_factory)
+
+
+def iter_all_matches(chunk_size=FETCH_CHUNK, row_factory=None):
+    """Лениво перебирает все матчи в хронологическом порядке (пачками по chunk_size)."""
+    return _iter_rows("""
+        SELECT team_a, team_b, score_a, score_b, date
+        FROM all_matches
+        ORDER BY date;
+    """, (), chunk_size, row_factory)
+
+
+def load_team_matches(team_name):
+    """Загружает все матчи команды из БД (через LRU-кэш)."""
+    _validate_cache()
+    key = (_db_path(), "matches", team_name)
+    rows = _match_cache.get(key)
+    if rows is None:
+        rows = tuple(iter_team_matches(team_name))
+        _match_cache.set(key, rows)
+    return list(rows)
+
+
+def _date_bound(value, end_of_day=False):
+    """Приводит границу диапазона (datetime, date или строку) к формату столбца date."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    # datetime.date: граница until включает весь день
+    return value.strftime("%Y-%m-%d") + (" 23:59:59" if end_of_day else "")
+
+
+def load_team_matches_range(team_name, since=None, until=None, limit=None):
+    """
+    Загружает матчи команды за период [since, until], начиная с самых свежих.
+    limit — максимальное количество матчей (например, 5 последних).
+    Запрос идёт по индексам (team_a, date) и (team_b, date), без полного чтения истории.
+    """
+    conditions = ""
+    params = []
+    since, until = _date_bound(since), _date_bound(until, end_of_day=True)
+    if since is not None:
+        conditions += " AND date >= ?"
+        params.append(since)
+    if until is not None:
+        conditions += " AND date <= ?"
+        params.append(until)
+
+    conn = _read_connection(since, until)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT team_a, team_b, score_a, score_b, date
+        FROM all_matches WHERE team_a = ?{conditions}
+        UNION ALL
+        SELECT team_a, team_b, score_a, score_b, date
+        FROM all_matches WHERE team_b = ? AND team_a != ?{conditions}
+        ORDER BY date DESC
+        LIMIT ?;
+    """, [team_name, *params, team_name, team_name, *params, -1 if limit is None else limit])
 
     rows = cur.fetchall()
     conn.close()
     return rows
 
 
+def load_all_matches():
+    """Загружает все матчи из БД в хронологическом порядке (формат как у load_team_matches)."""
+    return list(iter_all_matches())
+
+
+def get_head_to_head(team_x, team_y, include_matches=False):
+    """
+    Возвращает итог очных встреч двух команд с точки зрения team_x.
+    Считается в SQL одной выборкой по индексу (pair_key, date).
+    include_matches=True — в результат добавляется ленивый итератор самих матчей.
+    """
+    if team_x == team_y:
+        raise ValueError("Команды не могут быть одинаковыми.")
+    conn = _read_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT
+            COUNT(*),
+            SUM(CASE WHEN score_a = score_b THEN 0
+                     WHEN (team_a = ?) = (score_a > score_b) THEN 1 ELSE 0 END),
+            SUM(CASE WHEN score_a = score_b THEN 1 ELSE 0 END),
+            SUM(CASE WHEN team_a = ? THEN score_a ELSE score_b END),
+            SUM(CASE WHEN team_a = ? THEN score_b ELSE score_a END)
+        FROM all_matches
+        WHERE pair_key = ?;
+    """, (team_x, team_x, team_x, _pair_key(team_x, team_y)))
+    total, wins, draws, scored, conceded = cur.fetchone()
+    conn.close()
+
+    result = {
+        "Матчи": total,
+        "Победы": wins or 0,
+        "Поражения": total - (wins or 0) - (draws or 0),
+        "Ничьи": draws or 0,
+        "Забито": scored or 0,
+        "Пропущено": conceded or 0,
+    }
+    if include_matches:
+        result["Список матчей"] = iter_head_to_head(team_x, team_y)
+    return result
+
+
+def iter_head_to_head(team_x, team_y, chunk_size=FETCH_CHUNK, row_factory=None):
+    """Лениво перебирает очные матчи двух команд в порядке дат (строки как у load_team_matches)."""
+    return _iter_rows("""
+        SELECT team_a, team_b, score_a, score_b, date
+        FROM all_matches
+        WHERE pair_key = ?
+        ORDER BY date;
+    """, (_pair_key(team_x, team_y),), chunk_size, row_factory)
+
+
 def get_team_match_stats(team_name):
-    """Возвращает статистику по матчам команды."""
-    matches = load_team_matches(team_name)
+    """Возвращает статистику по матчам команды (через LRU-кэш)."""
+    _validate_cache()
+    key = (_db_path(), "stats", team_name)
+    stats = _match_cache.get(key)
+    if stats is None:
+        stats = _compute_team_match_stats(team_name)
+        _match_cache.set(key, stats)
+    return dict(stats)
+
+
+def _compute_team_match_stats(team_name):
+    """Считает статистику по матчам команды (строки читаются потоком, память постоянна)."""
     total = wins = losses = draws = 0
 
-    for team_a, team_b, score_a, score_b, _ in matches:
+    for team_a, team_b, score_a, score_b, _ in iter_team_matches(team_name):
         total += 1
         if team_name == team_a:
             if score_a > score_b:
@@ -164,3 +1166,185 @@ def get_team_match_stats(team_name):
         "Поражения": losses,
         "Ничьи": draws
     }
+
+
+@profiled
+def get_standings(season=None):
+    """
+    Турнирная таблица по всем матчам (или по матчам сезона season, например "2024-2025").
+    Порядок: очки, разница мячей, забитые, название.
+    """
+    since = until = None
+    condition = ""
+    params = []
+    if season is not None:
+        since, until = _season_bounds(season)
+        condition = " WHERE date >= ? AND date < ?"
+        params = [since, until]
+
+    conn = _read_connection(since, until)
+    rows = conn.execute(f"""
+        SELECT team, COUNT(*), SUM(gf > ga), SUM(gf = ga), SUM(gf < ga), SUM(gf), SUM(ga)
+        FROM (
+            SELECT team_a AS team, COALESCE(score_a, 0) AS gf, COALESCE(score_b, 0) AS ga
+            FROM all_matches{condition}
+            UNION ALL
+            SELECT team_b, COALESCE(score_b, 0), COALESCE(score_a, 0)
+            FROM all_matches{condition}
+        )
+        GROUP BY team;
+    """, params * 2).fetchall()
+    conn.close()
+
+    table = [{"Команда": team, "Матчи": played, "Победы": wins, "Ничьи": draws,
+              "Поражения": losses, "Забито": scored, "Пропущено": conceded,
+              "Разница": scored - conceded, "Очки": wins * 3 + draws}
+             for team, played, wins, draws, losses, scored, conceded in rows]
+    table.sort(key=lambda r: (-r["Очки"], -r["Разница"], -r["Забито"], r["Команда"]))
+    for place, row in enumerate(table, 1):
+        row["Место"] = place
+    return table
+
+
+# === Рейтинги Эло ===
+def get_ratings(limit=None):
+    """Текущие рейтинги команд по убыванию."""
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT team, rating, matches FROM ratings
+        ORDER BY rating DESC, team
+        LIMIT ?;
+    """, (-1 if limit is None else limit,)).fetchall()
+    conn.close()
+    return [{"Место": i, "Команда": team, "Рейтинг": round(rating, 1), "Матчи": matches}
+            for i, (team, rating, matches) in enumerate(rows, 1)]
+
+
+def get_rating_history(team_name):
+    """История рейтинга команды по матчам в порядке дат."""
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT match_id, date, rating_before, rating_after FROM rating_history
+        WHERE team = ?
+        ORDER BY date, id;
+    """, (team_name,)).fetchall()
+    conn.close()
+    return [{"Матч": match_id, "Дата": date, "До": before, "После": after}
+            for match_id, date, before, after in rows]
+
+
+def load_replay_plan(chunk_size=FETCH_CHUNK):
+    """План пересчёта рейтингов по всем матчам (включая архивы) в порядке (date, id)."""
+    return ratings.ReplayPlan(_iter_rows("""
+        SELECT id, team_a, team_b, score_a, score_b, date
+        FROM all_matches
+        ORDER BY date, id;
+    """, (), chunk_size))
+
+
+def _archived_until():
+    """Конец последнего архивного сезона (в формате столбца date) или None."""
+    partitions = list_season_partitions()
+    return _season_bounds(partitions[-1][0])[1] if partitions else None
+
+
+def _finish_ratings_replay(since):
+    """
+    Запись задним числом с даты since, которую нельзя пересчитать по rating_history
+    (история неполная или матчи после since есть в архиве): пересчитывается вся история.
+    """
+    if since is not None:
+        recompute_ratings()
+
+
+@profiled
+def recompute_ratings(model=None, history=True):
+    """
+    Пересчитывает рейтинги по всей истории матчей и заменяет таблицы ratings/rating_history.
+    Возвращает количество учтённых матчей.
+    """
+    _ensure_schema()
+    plan = load_replay_plan()
+    result = plan.run(model)
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE;")
+        ratings.write_replay(cur, plan, result, history=history)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(plan)
+
+
+# === Календарь ===
+@profiled
+def save_fixtures(rows, replace=True):
+    """
+    Записывает календарь одной транзакцией: строки (сезон, дивизион, тур, дата, хозяева, гости),
+    например Schedule.rows(season). replace=True — прежний календарь сезонов, встречающихся
+    в строках, удаляется. Возвращает количество записанных матчей.
+    """
+    rows = list(rows)
+    _ensure_schema()
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE;")
+        if replace:
+            cur.executemany("DELETE FROM fixtures WHERE season IS ?;",
+                            [(season,) for season in {row[0] for row in rows}])
+        existing = cur.execute("SELECT COUNT(*) FROM fixtures;").fetchone()[0]
+        # Большой календарь быстрее вставить без индексов и построить их один раз после вставки
+        bulk = len(rows) >= existing
+        if bulk:
+            for name in _FIXTURE_INDEXES:
+                cur.execute(f"DROP INDEX IF EXISTS {name};")
+        cur.executemany("""
+            INSERT INTO fixtures (season, division, round, date, team_a, team_b)
+            VALUES (?, ?, ?, ?, ?, ?);
+        """, rows)
+        written = cur.rowcount
+        if bulk:
+            _create_fixtures_table(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return written
+
+
+def load_fixtures(team_name=None, since=None, until=None, season=None):
+    """
+    Запланированные матчи (сезон, дивизион, тур, дата, хозяева, гости) в порядке дат.
+    Фильтры: команда, период [since, until] (как в load_team_matches_range), сезон.
+    """
+    _ensure_schema()
+    where, params = [], []
+    if team_name is not None:
+        where.append("(team_a = ? OR team_b = ?)")
+        params += [team_name, team_name]
+    if since is not None:
+        where.append("date >= ?")
+        params.append(_date_bound(since))
+    if until is not None:
+        where.append("date <= ?")
+        params.append(_date_bound(until, end_of_day=True))
+    if season is not None:
+        where.append("season = ?")
+        params.append(season)
+    conn = get_connection()
+    try:
+        return conn.execute(f"""
+            SELECT season, division, round, date, team_a, team_b
+            FROM fixtures
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY date, id;
+        """, params).fetchall()
+    finally:
+        conn.close()
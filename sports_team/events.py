@@ -0,0 +1,431 @@
+﻿# sports_team/events.py
+"""
+Журнал событий лиги и состояние, выводимое из него.
+
+Создание команды, добавление игрока, начало матча, гол и завершение матча
+записываются событиями в таблицу event_log (только добавление). Команды,
+игроки и матчи (Team/Player/Match) получаются воспроизведением событий.
+Каждые snapshot_every событий состояние сохраняется снимком (JSON + zlib),
+поэтому состояние на любой момент = ближайший более ранний снимок + хвост событий.
+
+    league = League.open()
+    league.create_team("Спартак")
+    past = replay(until=datetime(2024, 5, 1))   # лига на 1 мая
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from sports_team import db
+from sports_team.match import Match
+from sports_team.player import Forward, Defender, Goalkeeper
+from sports_team.search import PlayerIndex
+from sports_team.team import Team
+
+# Типы игроков в событиях и снимках
+_KINDS = {"Forward": Forward, "Defender": Defender, "Goalkeeper": Goalkeeper}
+# Каждые столько событий League сохраняет снимок состояния
+SNAPSHOT_EVERY = 1000
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+_MAX_SEQ = 2 ** 63 - 1
+
+
+def _kind_for_position(position: str) -> str:
+    """Тип игрока по названию позиции (как в Team.create_player)."""
+    position = position.lower()
+    if "напад" in position:
+        return "Forward"
+    if "защит" in position:
+        return "Defender"
+    if "врат" in position:
+        return "Goalkeeper"
+    raise ValueError("Неизвестная позиция игрока")
+
+
+# === Хранилище ===
+class EventStore:
+    """Таблицы event_log и event_log_snapshots в БД db.DB_NAME."""
+
+    def append(self, type_: str, data: dict, ts: datetime = None) -> int:
+        """Добавляет событие; возвращает его порядковый номер (seq)."""
+        db._ensure_schema()
+        conn = db.get_connection()
+        try:
+            cur = conn.execute("INSERT INTO event_log (ts, type, payload) VALUES (?, ?, ?);",
+                               ((ts or datetime.now()).strftime(_TS_FORMAT), type_,
+                                json.dumps(data, ensure_ascii=False)))
+            conn.commit()
+            return cur.lastrowid
+        finally:
+            conn.close()
+
+    def append_many(self, events) -> int:
+        """
+        Записывает пачку событий (seq, тип, данные, время) одной транзакцией.
+        Номера seq назначает вызывающий (League в режиме пачек); занятый номер — IntegrityError,
+        пачка не записывается. Возвращает количество событий.
+        """
+        rows = [(seq, (ts or datetime.now()).strftime(_TS_FORMAT), type_, json.dumps(data, ensure_ascii=False))
+                for seq, type_, data, ts in events]
+        if not rows:
+            return 0
+        db._ensure_schema()
+        conn = db.get_connection()
+        try:
+            conn.executemany("INSERT INTO event_log (seq, ts, type, payload) VALUES (?, ?, ?, ?);", rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(rows)
+
+    def last_seq(self) -> int:
+        db._ensure_schema()
+        conn = db.get_connection()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM event_log;").fetchone()[0]
+        finally:
+            conn.close()
+
+    def seq_at(self, moment: datetime) -> int:
+        """Номер последнего события, записанного не позже moment."""
+        db._ensure_schema()
+        conn = db.get_connection()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM event_log WHERE ts <= ?;",
+                                (moment.strftime(_TS_FORMAT),)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def iter_events(self, after: int = 0, until: Optional[int] = None,
+                    chunk_size: int = db.FETCH_CHUNK) -> Iterator[Tuple[int, str, dict]]:
+        """События (seq, тип, данные) с after < seq ≤ until, пачками по chunk_size."""
+        db._ensure_schema()
+        conn = db.get_connection()
+        try:
+            cur = conn.execute("""
+                SELECT seq, type, payload FROM event_log
+                WHERE seq > ? AND seq <= ?
+                ORDER BY seq;
+            """, (after, _MAX_SEQ if until is None else until))
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for seq, type_, payload in rows:
+                    yield seq, type_, json.loads(payload)
+        finally:
+            conn.close()
+
+    def save_snapshot(self, state: "LeagueState"):
+        """Сохраняет снимок состояния после события state.seq."""
+        conn = db.get_connection()
+        try:
+            conn.execute("INSERT OR REPLACE INTO event_log_snapshots (seq, ts, state) VALUES (?, ?, ?);",
+                         (state.seq, datetime.now().strftime(_TS_FORMAT), state.dump()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def latest_snapshot(self, until: Optional[int] = None,
+                        index: PlayerIndex = None) -> Optional["LeagueState"]:
+        """Самый поздний снимок, сделанный не позже события until."""
+        db._ensure_schema()
+        conn = db.get_connection()
+        try:
+            row = conn.execute("""
+                SELECT state FROM event_log_snapshots
+                WHERE seq <= ?
+                ORDER BY seq DESC LIMIT 1;
+            """, (_MAX_SEQ if until is None else until,)).fetchone()
+        finally:
+            conn.close()
+        return LeagueState.load(row[0], index) if row else None
+
+
+# === Состояние ===
+class LeagueState:
+    """
+    Команды, игроки и незавершённые матчи после применения событий 1..seq.
+    Результаты завершённых матчей хранятся в журналах команд (Team.ledger).
+    """
+
+    def __init__(self, index: PlayerIndex = None):
+        self.teams: Dict[str, Team] = {}
+        self.matches: Dict[int, Match] = {}  # незавершённые матчи по seq события match_started
+        self.seq = 0
+        # Индекс поиска игроков (только у "живого" состояния лиги)
+        self.index = index
+
+    def apply(self, seq: int, type_: str, data: dict):
+        """Применяет событие; при недопустимом событии — ValueError, состояние не меняется."""
+        handler = getattr(self, f"_on_{type_}", None)
+        if handler is None:
+            raise ValueError(f"Неизвестный тип события: {type_}")
+        handler(seq, data)
+        self.seq = seq
+
+    def _team(self, name) -> Team:
+        team = self.teams.get(name)
+        if team is None:
+            raise ValueError(f"Команда '{name}' не найдена.")
+        return team
+
+    def _match(self, match_id) -> Match:
+        match = self.matches.get(match_id)
+        if match is None:
+            raise ValueError(f"Матч {match_id} не найден или уже завершён.")
+        return match
+
+    def _on_team_created(self, seq, data):
+        if data["name"] in self.teams:
+            raise ValueError(f"Команда '{data['name']}' уже существует.")
+        self.teams[data["name"]] = Team(data["name"])
+
+    def _on_player_added(self, seq, data):
+        team = self._team(data["team"])
+        player = _KINDS[data["kind"]](data["name"], data["number"], data["position"])
+        team.add_player(player, index=self.index)
+        # Перенос накопленной статистики (при импорте старого состояния)
+        player._games = data.get("games", 0)
+        player._goals = data.get("goals", 0)
+        player._assists = data.get("assists", 0)
+
+    def _on_result_imported(self, seq, data):
+        date = datetime.fromisoformat(data["date"]) if data.get("date") else None
+        self._team(data["team"]).ledger.append(data["opponent"], data["goals_for"],
+                                               data["goals_against"], data["home"], date)
+
+    def _on_match_started(self, seq, data):
+        match = Match(self._team(data["team_a"]), self._team(data["team_b"]),
+                      datetime.fromisoformat(data["date"]))
+        match.event_id = seq
+        self.matches[seq] = match
+
+    def _on_goal(self, seq, data):
+        match = self._match(data["match"])
+        team = match.team_a if data["side"] == "A" else match.team_b
+        player = next((p for p in team.players if p.number == data["number"]), None)
+        if player is None:
+            raise ValueError(f"В команде {team.name} нет игрока с номером {data['number']}.")
+        match.record_goal(player, data["minute"])
+
+    def _on_match_finalized(self, seq, data):
+        match = self._match(data["match"])
+        match.finalize_match()
+        match.team_a.add_match(match)
+        match.team_b.add_match(match)
+        del self.matches[data["match"]]
+
+    # --- снимки ---
+    def dump(self) -> bytes:
+        """Снимок состояния: JSON, сжатый zlib."""
+        teams = []
+        for team in self.teams.values():
+            teams.append({
+                "name": team.name,
+                "players": [[type(p).__name__, p.name, p.number, p.position, p.games, p.goals, p.assists]
+                            for p in team.players],
+                "ledger": [[r.opponent, r.goals_for, r.goals_against, r.home,
+                            r.date.isoformat() if r.date else None] for r in team.ledger],
+            })
+        matches = [{
+            "id": match_id,
+            "team_a": m.team_a.name,
+            "team_b": m.team_b.name,
+            "date": m.date.isoformat(),
+            "goals": [[e["minute"], e["team"], e["player"].number] for e in m.events],
+        } for match_id, m in self.matches.items()]
+        state = {"seq": self.seq, "teams": teams, "matches": matches}
+        return zlib.compress(json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def load(cls, blob: bytes, index: PlayerIndex = None) -> "LeagueState":
+        """Восстанавливает состояние из снимка dump()."""
+        state = json.loads(zlib.decompress(blob).decode("utf-8"))
+        league = cls(index)
+        league.seq = state["seq"]
+        for t in state["teams"]:
+            team = league.teams[t["name"]] = Team(t["name"])
+            for kind, name, number, position, games, goals, assists in t["players"]:
+                player = _KINDS[kind](name, number, position)
+                team.add_player(player, index=index)
+                player._games, player._goals, player._assists = games, goals, assists
+            for opponent, goals_for, goals_against, home, date in t["ledger"]:
+                team.ledger.append(opponent, goals_for, goals_against, home,
+                                   datetime.fromisoformat(date) if date else None)
+        for m in state["matches"]:
+            match = Match(league.teams[m["team_a"]], league.teams[m["team_b"]],
+                          datetime.fromisoformat(m["date"]))
+            # Статистика игроков уже в снимке — голы восстанавливаются без record_goal
+            for minute, side, number in m["goals"]:
+                team = match.team_a if side == "A" else match.team_b
+                player = next(p for p in team.players if p.number == number)
+                match.events.append({"minute": minute, "player": player, "team": side})
+            match.event_id = m["id"]
+            league.matches[m["id"]] = match
+        return league
+
+
+def replay(store: EventStore = None, until: Union[int, datetime, None] = None,
+           index: PlayerIndex = None) -> LeagueState:
+    """
+    Состояние лиги после события until (номер seq или момент времени; None — последнее).
+    Загружается ближайший предшествующий снимок, затем применяется хвост событий.
+    index — индекс поиска, в который попадут игроки состояния.
+    """
+    store = store or EventStore()
+    target = store.seq_at(until) if isinstance(until, datetime) else until
+    state = store.latest_snapshot(target, index) or LeagueState(index)
+    for seq, type_, data in store.iter_events(after=state.seq, until=target):
+        state.apply(seq, type_, data)
+    return state
+
+
+# === Команды ===
+class League:
+    """
+    Живая лига: каждое действие проверяется на текущем состоянии, записывается
+    событием и применяется. Каждые snapshot_every событий сохраняется снимок.
+    В режиме пачек (start_batch) события применяются сразу, а в журнал пишутся
+    пачками (take_batch + write_batch или flush): одна транзакция на пачку.
+    Номера событий тогда назначает лига, поэтому в журнал не должен писать никто другой.
+    """
+
+    def __init__(self, store: EventStore = None, state: LeagueState = None,
+                 snapshot_every: int = SNAPSHOT_EVERY):
+        self.store = store or EventStore()
+        self.state = state or LeagueState(PlayerIndex())
+        self.snapshot_every = snapshot_every
+        self._snapshot_seq = self.state.seq
+        self._pending: Optional[list] = None  # события, ещё не записанные в журнал (режим пачек)
+
+    @classmethod
+    def open(cls, store: EventStore = None, snapshot_every: int = SNAPSHOT_EVERY) -> "League":
+        """Лига в текущем состоянии: снимок + хвост журнала."""
+        store = store or EventStore()
+        return cls(store, replay(store, index=PlayerIndex()), snapshot_every)
+
+    @property
+    def teams(self) -> Dict[str, Team]:
+        return self.state.teams
+
+    @property
+    def index(self) -> PlayerIndex:
+        """Индекс поиска игроков лиги (свой у каждой лиги)."""
+        return self.state.index
+
+    def _emit(self, type_: str, data: dict, ts: datetime = None) -> int:
+        # Команды проверяют событие до записи: в журнал попадают только применимые события
+        if self._pending is not None:
+            seq = self.state.seq + 1
+            self.state.apply(seq, type_, data)
+            self._pending.append((seq, type_, data, ts or datetime.now()))
+            return seq
+        seq = self.store.append(type_, data, ts)
+        self.state.apply(seq, type_, data)
+        self.snapshot_if_due()
+        return seq
+
+    def start_batch(self):
+        """Включает режим пачек: события копятся до flush()/take_batch()."""
+        if self._pending is None:
+            self._pending = []
+
+    def take_batch(self) -> list:
+        """Забирает накопленные события для write_batch (порядок пачек при записи сохраняется)."""
+        if not self._pending:
+            return []
+        batch, self._pending = self._pending, []
+        return batch
+
+    def write_batch(self, batch: list) -> int:
+        """Записывает пачку одной транзакцией; не трогает состояние, можно вызывать из другого потока."""
+        return self.store.append_many(batch)
+
+    def flush(self) -> int:
+        """Записывает накопленные события и, если пора, сохраняет снимок."""
+        written = self.write_batch(self.take_batch())
+        self.snapshot_if_due()
+        return written
+
+    def end_batch(self) -> int:
+        """Записывает накопленные события и выключает режим пачек."""
+        written = self.flush()
+        self._pending = None
+        return written
+
+    def snapshot_if_due(self):
+        """Сохраняет снимок, если с прошлого прошло snapshot_every событий и все они уже в журнале."""
+        if not self._pending and self.state.seq - self._snapshot_seq >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Сохраняет снимок текущего состояния."""
+        self.store.save_snapshot(self.state)
+        self._snapshot_seq = self.state.seq
+
+    def create_team(self, name: str) -> Team:
+        if name in self.state.teams:
+            raise ValueError(f"Команда '{name}' уже существует.")
+        self._emit("team_created", {"name": name})
+        return self.state.teams[name]
+
+    def add_player(self, team_name: str, name: str, number: int, position: str = None,
+                   kind: str = None, games: int = 0, goals: int = 0, assists: int = 0):
+        """Добавляет игрока; тип определяется по kind или по позиции."""
+        team = self.state._team(team_name)
+        kind = kind or _kind_for_position(position)
+        if kind not in _KINDS:
+            raise ValueError(f"Неизвестный тип игрока: {kind}")
+        if any(p.number == number for p in team.players):
+            raise ValueError(f"Игрок с номером {number} уже есть в команде")
+        position = position or _KINDS[kind](name, number).position
+        data = {"team": team_name, "name": name, "number": number, "position": position, "kind": kind}
+        if games or goals or assists:
+            data.update(games=games, goals=goals, assists=assists)
+        self._emit("player_added", data)
+        return team.players[-1]
+
+    def start_match(self, team_a: str, team_b: str, date: datetime = None) -> Match:
+        """Начинает матч; match_id (для record_goal/finalize_match) — в атрибуте match.event_id."""
+        self.state._team(team_a)
+        self.state._team(team_b)
+        if team_a == team_b:
+            raise ValueError("Команды не могут быть одинаковыми.")
+        seq = self._emit("match_started", {"team_a": team_a, "team_b": team_b,
+                                           "date": (date or datetime.now()).isoformat()})
+        return self.state.matches[seq]
+
+    def record_goal(self, match: Match, player, minute: int):
+        if minute < 0 or minute > 120:
+            raise ValueError("Минута должна быть в диапазоне 0–120.")
+        self.state._match(match.event_id)
+        if any(p is player for p in match.team_a.players):
+            side = "A"
+        elif any(p is player for p in match.team_b.players):
+            side = "B"
+        else:
+            raise ValueError("Игрок не найден ни в одной из команд.")
+        self._emit("goal", {"match": match.event_id, "side": side, "number": player.number, "minute": minute})
+
+    def finalize_match(self, match: Match) -> Match:
+        self.state._match(match.event_id)
+        self._emit("match_finalized", {"match": match.event_id})
+        return match
+
+    def import_teams(self, teams):
+        """Переносит в журнал существующие команды (например, из teams.snap): составы, статистику и результаты."""
+        for team in teams:
+            self.create_team(team.name)
+            for p in team.players:
+                self.add_player(team.name, p.name, p.number, p.position, kind=type(p).__name__,
+                                games=p.games, goals=p.goals, assists=p.assists)
+            for r in team.ledger:
+                self._emit("result_imported", {
+                    "team": team.name, "opponent": r.opponent, "goals_for": r.goals_for,
+                    "goals_against": r.goals_against, "home": r.home,
+                    "date": r.date.isoformat() if r.date else None})
@@ -0,0 +1,216 @@
+﻿# sports_team/export.py
+"""
+Колоночная выгрузка БД для аналитики (NumPy).
+
+Таблицы players, matches (включая архивы сезонов, в порядке дат) и голы
+из match_events (в порядке записи) записываются в каталог: по файлу .npy на столбец, имена команд, игроков и
+позиций закодированы номерами в словарях (dict_*.npy), описание — в manifest.json.
+Строки читаются из SQLite пачками и сразу пишутся в файлы, открытые через
+open_memmap, поэтому память не зависит от размера БД (кроме словарей имён).
+load_export() открывает столбцы через mmap: данные не разбираются заново и
+подгружаются с диска по мере обращения.
+
+    export_columnar("export/")
+    data = load_export("export/")
+    goals = data["matches"]["score_a"] + data["matches"]["score_b"]
+    teams = data.decode("matches", "team_a")
+"""
+import json
+import os
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, List, Optional
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from sports_team import db
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+# Строк за одно чтение из курсора
+EXPORT_CHUNK = 50_000
+
+_SIDES = {"A": 0, "B": 1}  # match_events.team; -1 — неизвестно
+
+# Таблица -> (запрос подсчёта, запрос строк, [(столбец, dtype, словарь или None)])
+_TABLES = {
+    "players": (
+        "SELECT COUNT(*) FROM main.players;",
+        """
+        SELECT p.id, p.name, p.number, p.position, p.goals, p.assists, p.games, t.name
+        FROM main.players p LEFT JOIN main.teams t ON t.id = p.team_id
+        ORDER BY p.id;
+        """,
+        [("id", "int64", None), ("name", "int32", "players"), ("number", "int32", None),
+         ("position", "int32", "positions"), ("goals", "int32", None), ("assists", "int32", None),
+         ("games", "int32", None), ("team", "int32", "teams")],
+    ),
+    "matches": (
+        "SELECT COUNT(*) FROM all_matches;",
+        """
+        SELECT id, team_a, team_b, score_a, score_b, date
+        FROM all_matches
+        ORDER BY date, id;
+        """,
+        [("id", "int64", None), ("team_a", "int32", "teams"), ("team_b", "int32", "teams"),
+         ("score_a", "int16", None), ("score_b", "int16", None), ("date", "datetime64[s]", None)],
+    ),
+    "goals": (
+        "SELECT COUNT(*) FROM all_match_events;",
+        """
+        SELECT match_id, minute, team, player_name, player_number
+        FROM all_match_events;
+        """,
+        [("match_id", "int64", None), ("minute", "int16", None), ("side", "int8", None),
+         ("player", "int32", "players"), ("player_number", "int32", None)],
+    ),
+}
+
+
+class _Dictionary:
+    """Кодирование строк номерами в порядке первого появления; None -> -1."""
+
+    def __init__(self):
+        self.codes: Dict[Optional[str], int] = {None: -1}
+
+    def encode(self, values, dtype) -> np.ndarray:
+        codes = list(map(self.codes.get, values))
+        if None in codes:  # в пачке есть новые значения (обычно только в первых пачках)
+            add = self.codes.setdefault
+            codes = [add(v, len(self.codes) - 1) for v in values]
+        return np.array(codes, dtype=dtype)
+
+    @property
+    def values(self) -> List[str]:
+        return [v for v in self.codes if v is not None]
+
+
+def _convert(values, dtype, dictionary):
+    """Столбец пачки строк SQLite -> массив NumPy."""
+    if dictionary is not None:
+        return dictionary.encode(values, dtype)
+    if dtype.startswith("datetime64"):
+        # "2024-05-01 18:30:00" (секунды без долей); NULL -> NaT
+        return np.array([v[:19] if v else "NaT" for v in values], dtype=dtype)
+    try:
+        return np.array(values, dtype=dtype)
+    except TypeError:  # NULL в числовом столбце -> -1
+        return np.array([-1 if v is None else v for v in values], dtype=dtype)
+
+
+def _export_table(conn, directory, table, dictionaries, chunk_size):
+    count_sql, sql, columns = _TABLES[table]
+    rows = conn.execute(count_sql).fetchone()[0]
+    files = {name: open_memmap(os.path.join(directory, f"{table}.{name}.npy"), mode="w+",
+                               dtype=dtype, shape=(rows,))
+             for name, dtype, _ in columns}
+    cur = conn.execute(sql)
+    pos = 0
+    while True:
+        chunk = cur.fetchmany(chunk_size)
+        if not chunk:
+            break
+        end = pos + len(chunk)
+        for (name, dtype, dict_name), values in zip(columns, zip(*chunk)):
+            if table == "goals" and name == "side":
+                values = list(map(_SIDES.get, values, repeat(-1)))
+            files[name][pos:end] = _convert(values, dtype,
+                                            dictionaries[dict_name] if dict_name else None)
+        pos = end
+    for array in files.values():
+        array.flush()
+    return {
+        "rows": rows,
+        "columns": {name: {"file": f"{table}.{name}.npy", "dtype": dtype, "dictionary": dict_name}
+                    for name, dtype, dict_name in columns},
+    }
+
+
+def export_columnar(directory: str, chunk_size: int = EXPORT_CHUNK) -> dict:
+    """
+    Выгружает players, matches и goals в каталог directory. Возвращает manifest.
+    Все таблицы читаются в одной транзакции — выгрузка согласована.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Размер пачки должен быть положительным.")
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    # Без манифеста каталог считается неполным — прерванная выгрузка не загрузится
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    db._ensure_schema()
+    dictionaries = {name: _Dictionary() for name in ("teams", "players", "positions")}
+    conn = db._read_connection()
+    try:
+        conn.execute("BEGIN;")
+        tables = {table: _export_table(conn, directory, table, dictionaries, chunk_size)
+                  for table in _TABLES}
+        version = db.data_version()
+        conn.rollback()
+    finally:
+        conn.close()
+
+    for name, dictionary in dictionaries.items():
+        np.save(os.path.join(directory, f"dict_{name}.npy"), np.array(dictionary.values, dtype=str))
+    manifest = {
+        "format": FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "source": os.path.abspath(db.DB_NAME),
+        "data_version": version,
+        "dictionaries": {name: f"dict_{name}.npy" for name in dictionaries},
+        "tables": tables,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+class ColumnarExport:
+    """Выгрузка, открытая через mmap: export["matches"]["score_a"] — массив NumPy (только чтение)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия выгрузки: {self.manifest.get('format')}")
+        self.dictionaries = {name: self._open(file)
+                             for name, file in self.manifest["dictionaries"].items()}
+        self.tables: Dict[str, Dict[str, np.ndarray]] = {
+            table: {name: self._open(column["file"]) for name, column in info["columns"].items()}
+            for table, info in self.manifest["tables"].items()
+        }
+
+    def _open(self, file):
+        return np.load(os.path.join(self.directory, file), mmap_mode="r", allow_pickle=False)
+
+    def __getitem__(self, table: str) -> Dict[str, np.ndarray]:
+        return self.tables[table]
+
+    def decode(self, table: str, column: str) -> np.ndarray:
+        """Столбец-словарь в виде строк (код -1 -> пустая строка)."""
+        dictionary = self.manifest["tables"][table]["columns"][column]["dictionary"]
+        if dictionary is None:
+            raise ValueError(f"Столбец {table}.{column} не закодирован словарём.")
+        codes = self.tables[table][column]
+        values = np.append(np.asarray(self.dictionaries[dictionary]), "")  # индекс -1 -> ""
+        return values[codes]
+
+    def code(self, dictionary: str, value: str) -> int:
+        """Код значения в словаре (-1, если его нет) — для фильтров без декодирования."""
+        found = np.flatnonzero(self.dictionaries[dictionary] == value)
+        return int(found[0]) if len(found) else -1
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __repr__(self):
+        sizes = ", ".join(f"{t}={info['rows']}" for t, info in self.manifest["tables"].items())
+        return f"ColumnarExport({self.directory!r}, {sizes})"
+
+
+def load_export(directory: str) -> ColumnarExport:
+    """Открывает выгрузку export_columnar() без чтения данных в память."""
+    return ColumnarExport(directory)
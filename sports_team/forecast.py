@@ -0,0 +1,303 @@
+﻿# sports_team/forecast.py
+"""
+Прогноз итоговой таблицы сезона методом Монте-Карло.
+
+По истории матчей (строки в формате load_team_matches) подбирается
+пуассоновская модель: у каждой команды есть сила атаки и "дырявость" обороны.
+Оставшиеся матчи разыгрываются сразу для всех итераций массивами NumPy —
+без цикла Python по отдельным матчам.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sports_team.db import load_all_matches, load_fixtures, season_of
+
+# Очки за победу и ничью
+WIN_POINTS = 3
+DRAW_POINTS = 1
+
+
+class PoissonModel:
+    """Пуассоновская модель силы команд (атака / оборона + преимущество своего поля)."""
+
+    def __init__(self, teams: Sequence[str], attack, defense, home_rate: float, away_rate: float):
+        self.teams = list(teams)
+        self.index = {name: i for i, name in enumerate(self.teams)}
+        self.attack = np.asarray(attack, dtype=float)
+        self.defense = np.asarray(defense, dtype=float)
+        self.home_rate = float(home_rate)
+        self.away_rate = float(away_rate)
+
+    @classmethod
+    def fit(cls, matches: Iterable[tuple], teams: Optional[Sequence[str]] = None,
+            smoothing: float = 1.0, iterations: int = 50):
+        """
+        Подбирает параметры по списку матчей (team_a, team_b, score_a, score_b, date).
+        smoothing — псевдо-голы, чтобы команды с короткой историей не получали нулевую силу.
+        """
+        rows = list(matches)
+        names = list(teams) if teams is not None else []
+        known = set(names)
+        for team_a, team_b, *_ in rows:
+            for name in (team_a, team_b):
+                if name not in known:
+                    known.add(name)
+                    names.append(name)
+
+        n = len(names)
+        if not rows:
+            return cls(names, np.ones(n), np.ones(n), 1.0, 1.0)
+
+        index = {name: i for i, name in enumerate(names)}
+        home = np.array([index[r[0]] for r in rows], dtype=np.intp)
+        away = np.array([index[r[1]] for r in rows], dtype=np.intp)
+        goals_h = np.array([r[2] or 0 for r in rows], dtype=float)
+        goals_a = np.array([r[3] or 0 for r in rows], dtype=float)
+
+        home_rate = max(goals_h.mean(), 1e-6)
+        away_rate = max(goals_a.mean(), 1e-6)
+
+        # Забитые и пропущенные голы каждой команды
+        scored = np.bincount(home, goals_h, n) + np.bincount(away, goals_a, n)
+        conceded = np.bincount(home, goals_a, n) + np.bincount(away, goals_h, n)
+
+        attack = np.ones(n)
+        defense = np.ones(n)
+        for _ in range(iterations):
+            # Ожидаемые голы при атаке = 1 — знаменатель для силы атаки
+            exp_scored = (np.bincount(home, home_rate * defense[away], n)
+                          + np.bincount(away, away_rate * defense[home], n))
+            attack = (scored + smoothing) / (exp_scored + smoothing)
+            attack /= attack.mean()
+
+            exp_conceded = (np.bincount(home, away_rate * attack[away], n)
+                            + np.bincount(away, home_rate * attack[home], n))
+            defense = (conceded + smoothing) / (exp_conceded + smoothing)
+
+        return cls(names, attack, defense, home_rate, away_rate)
+
+    @classmethod
+    def from_db(cls, teams: Optional[Sequence[str]] = None, **kwargs):
+        """Подбирает модель по всем матчам из таблицы matches."""
+        return cls.fit(load_all_matches(), teams=teams, **kwargs)
+
+    def subset(self, teams: Sequence[str]) -> "PoissonModel":
+        """Модель только для команд teams (сила каждой — как в полной модели)."""
+        idx = [self.index[name] for name in teams]
+        return PoissonModel(teams, self.attack[idx], self.defense[idx], self.home_rate, self.away_rate)
+
+    def expected_goals(self, home_idx, away_idx):
+        """Ожидаемые голы хозяев и гостей (работает и с массивами индексов)."""
+        lam_home = self.home_rate * self.attack[home_idx] * self.defense[away_idx]
+        lam_away = self.away_rate * self.attack[away_idx] * self.defense[home_idx]
+        return lam_home, lam_away
+
+
+class SeasonForecast:
+    """Результат моделирования: сколько раз каждая команда заняла каждое место."""
+
+    def __init__(self, teams: Sequence[str], position_counts, iterations: int):
+        self.teams = list(teams)
+        self.position_counts = np.asarray(position_counts)
+        self.iterations = iterations
+
+    @property
+    def position_probabilities(self):
+        """Матрица вероятностей: строка — команда, столбец — место (0 — первое)."""
+        return self.position_counts / max(self.iterations, 1)
+
+    def title_odds(self) -> Dict[str, float]:
+        """Вероятность чемпионства для каждой команды."""
+        probs = self.position_probabilities[:, 0]
+        return {name: float(p) for name, p in zip(self.teams, probs)}
+
+    def table(self) -> Dict[str, List[float]]:
+        """Таблица вероятностей мест в виде {команда: [P(1 место), P(2 место), ...]}."""
+        probs = self.position_probabilities
+        return {name: probs[i].tolist() for i, name in enumerate(self.teams)}
+
+    def expected_positions(self) -> Dict[str, float]:
+        """Среднее итоговое место (1 — первое)."""
+        places = np.arange(1, len(self.teams) + 1)
+        avg = self.position_probabilities @ places
+        return {name: float(v) for name, v in zip(self.teams, avg)}
+
+    def __repr__(self):
+        return f"SeasonForecast(teams={len(self.teams)}, iterations={self.iterations})"
+
+
+def current_table(model: PoissonModel, played: Iterable[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+    """Очки и разница мячей по уже сыгранным матчам (в порядке model.teams)."""
+    n = len(model.teams)
+    points = np.zeros(n, dtype=np.int64)
+    goal_diff = np.zeros(n, dtype=np.int64)
+    for team_a, team_b, score_a, score_b, *_ in played:
+        a, b = model.index[team_a], model.index[team_b]
+        score_a, score_b = score_a or 0, score_b or 0
+        if score_a > score_b:
+            points[a] += WIN_POINTS
+        elif score_a < score_b:
+            points[b] += WIN_POINTS
+        else:
+            points[a] += DRAW_POINTS
+            points[b] += DRAW_POINTS
+        goal_diff[a] += score_a - score_b
+        goal_diff[b] += score_b - score_a
+    return points, goal_diff
+
+
+def remaining_fixtures(teams: Sequence[str], played: Iterable[tuple],
+                       rounds: int = 2) -> List[Tuple[str, str]]:
+    """
+    Оставшиеся матчи кругового турнира: каждая пара играет rounds раз,
+    поровну дома и в гостях (при нечётном rounds лишний матч — дома у команды,
+    стоящей раньше в teams). Уже сыгранные встречи вычитаются.
+    """
+    played_count: Dict[Tuple[str, str], int] = {}
+    for team_a, team_b, *_ in played:
+        played_count[(team_a, team_b)] = played_count.get((team_a, team_b), 0) + 1
+
+    first_leg, second_leg = (rounds + 1) // 2, rounds // 2
+    fixtures = []
+    for i, home in enumerate(teams):
+        for j, away in enumerate(teams):
+            if i == j:
+                continue
+            left = (first_leg if i < j else second_leg) - played_count.get((home, away), 0)
+            fixtures.extend([(home, away)] * max(left, 0))
+    return fixtures
+
+
+def unplayed_fixtures(scheduled: Iterable[Tuple[str, str]], played: Iterable[tuple]) -> List[Tuple[str, str]]:
+    """
+    Матчи календаря (пары (хозяева, гости)), которые ещё не сыграны:
+    каждая сыгранная встреча вычёркивает одну такую же пару календаря.
+    """
+    played_count: Dict[Tuple[str, str], int] = {}
+    for team_a, team_b, *_ in played:
+        played_count[(team_a, team_b)] = played_count.get((team_a, team_b), 0) + 1
+    fixtures = []
+    for pair in scheduled:
+        if played_count.get(pair, 0) > 0:
+            played_count[pair] -= 1
+        else:
+            fixtures.append(pair)
+    return fixtures
+
+
+def _simulate_chunk(args):
+    """Разыгрывает часть итераций; возвращает матрицу счётчиков мест (команда × место)."""
+    (lam_home, lam_away, home_idx, away_idx, base_points, base_diff,
+     iterations, chunk_size, seed) = args
+    n_teams = len(base_points)
+    n_fix = len(home_idx)
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(n_teams * n_teams, dtype=np.int64)
+
+    # Матрицы инцидентности "матч → команда": очки и голы раскладываются умножением матриц
+    home_m = np.zeros((n_fix, n_teams), dtype=np.float32)
+    away_m = np.zeros((n_fix, n_teams), dtype=np.float32)
+    home_m[np.arange(n_fix), home_idx] = 1
+    away_m[np.arange(n_fix), away_idx] = 1
+    diff_m = home_m - away_m
+
+    done = 0
+    while done < iterations:
+        size = min(chunk_size, iterations - done)
+        goals_h = rng.poisson(lam_home, size=(size, n_fix))
+        goals_a = rng.poisson(lam_away, size=(size, n_fix))
+
+        home_pts = np.where(goals_h > goals_a, WIN_POINTS, np.where(goals_h == goals_a, DRAW_POINTS, 0))
+        away_pts = np.where(goals_a > goals_h, WIN_POINTS, np.where(goals_h == goals_a, DRAW_POINTS, 0))
+        points = (home_pts.astype(np.float32) @ home_m
+                  + away_pts.astype(np.float32) @ away_m + base_points)
+        diff = (goals_h - goals_a).astype(np.float32) @ diff_m + base_diff
+
+        # Сортировка: очки, затем разница мячей, затем случайный жребий
+        key = points * 1e6 + diff * 1e2 + rng.random((size, n_teams))
+        order = np.argsort(-key, axis=1)
+        cells = order * n_teams + np.arange(n_teams)
+        counts += np.bincount(cells.ravel(), minlength=n_teams * n_teams)
+        done += size
+
+    return counts.reshape(n_teams, n_teams)
+
+
+def simulate_season(model: PoissonModel, fixtures: Sequence[Tuple[str, str]],
+                    played: Iterable[tuple] = (), iterations: int = 10000,
+                    processes: Optional[int] = None, seed=None,
+                    chunk_size: int = 10000) -> SeasonForecast:
+    """
+    Разыгрывает оставшиеся матчи fixtures (пары (хозяева, гости)) iterations раз.
+    processes > 1 — итерации делятся между процессами (у каждого своё зерно ГСЧ).
+    """
+    if iterations <= 0:
+        raise ValueError("Количество итераций должно быть положительным.")
+    base_points, base_diff = current_table(model, played)
+
+    home_idx = np.array([model.index[h] for h, _ in fixtures], dtype=np.intp)
+    away_idx = np.array([model.index[a] for _, a in fixtures], dtype=np.intp)
+    lam_home, lam_away = model.expected_goals(home_idx, away_idx)
+
+    workers = processes or 1
+    if workers == -1:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, iterations))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [iterations // workers + (1 if i < iterations % workers else 0) for i in range(workers)]
+    tasks = [(lam_home, lam_away, home_idx, away_idx, base_points, base_diff, share, chunk_size, s)
+             for share, s in zip(shares, seeds)]
+
+    if workers == 1:
+        counts = _simulate_chunk(tasks[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = sum(pool.map(_simulate_chunk, tasks))
+    return SeasonForecast(model.teams, counts, iterations)
+
+
+def forecast_season(teams: Optional[Sequence[str]] = None, iterations: int = 10000,
+                    rounds: int = 2, season: Optional[str] = None, **kwargs) -> SeasonForecast:
+    """
+    Полный прогноз по базе: подбор модели, список оставшихся матчей и моделирование.
+    Если в таблице fixtures есть календарь сезона season (без season — сезона, чей календарь
+    начинается позже всех), оставшиеся матчи берутся из него, а сыгранными считаются матчи
+    от первого тура этого сезона до первого тура следующего. Иначе каждая пара играет
+    rounds раз, а сыгранные — матчи сезона season (по умолчанию — сезона последнего матча).
+    Без teams в прогнозе участвуют команды календаря или команды, игравшие в этом сезоне.
+    Сила команд подбирается по всей истории.
+    """
+    played = load_all_matches()
+    starts: Dict[str, str] = {}
+    calendar = load_fixtures()
+    for row in calendar:  # строки идут по датам: первая строка сезона — его начало
+        starts.setdefault(row[0], row[3])
+    if season is None and starts:
+        season = max(starts, key=starts.get)
+
+    if season in starts:
+        start = starts[season]
+        end = min((s for s in starts.values() if s > start), default=None)
+        scheduled = [(home, away) for row_season, *_, home, away in calendar if row_season == season]
+        teams = teams or sorted({name for pair in scheduled for name in pair})
+        known = set(teams)
+        current = [m for m in played if m[4] >= start and (end is None or m[4] < end)
+                   and m[0] in known and m[1] in known]
+        fixtures = [pair for pair in unplayed_fixtures(scheduled, current)
+                    if pair[0] in known and pair[1] in known]
+    else:
+        if season is None and played:
+            season = season_of(datetime.fromisoformat(played[-1][4]))
+        current = [m for m in played if season_of(datetime.fromisoformat(m[4])) == season]
+        if teams is None:
+            teams = list(dict.fromkeys(name for m in current for name in m[:2]))
+        known = set(teams)
+        current = [m for m in current if m[0] in known and m[1] in known]
+        fixtures = remaining_fixtures(teams, current, rounds=rounds)
+    # Сила — по всей истории, таблица и оставшиеся матчи — только команды сезона
+    model = PoissonModel.fit(played, teams=teams).subset(teams)
+    return simulate_season(model, fixtures, played=current, iterations=iterations, **kwargs)
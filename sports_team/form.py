@@ -0,0 +1,83 @@
+﻿# sports_team/form.py
+"""Текущая форма команд: очки за последние N матчей."""
+from collections import deque
+from typing import Dict, List, Tuple
+
+from sports_team.db import iter_all_matches
+
+# Очки и обозначения результатов
+_RESULTS = {"В": 3, "Н": 1, "П": 0}
+
+
+class RollingForm:
+    """
+    Скользящее окно результатов для всех команд.
+    Каждый новый матч обновляет сумму очков за O(1): результат, выпавший из окна,
+    вычитается, новый — прибавляется. История заново не пересчитывается.
+    """
+
+    def __init__(self, window: int = 5):
+        if window <= 0:
+            raise ValueError("Размер окна должен быть положительным.")
+        self.window = window
+        self._results: Dict[str, deque] = {}
+        self._points: Dict[str, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows, window: int = 5):
+        """Строит форму по строкам (team_a, team_b, score_a, score_b, date) в порядке дат."""
+        form = cls(window)
+        for team_a, team_b, score_a, score_b, *_ in rows:
+            form.add_result(team_a, team_b, score_a, score_b)
+        return form
+
+    @classmethod
+    def from_db(cls, window: int = 5):
+        """Строит форму по всем матчам из БД (матчи читаются потоком)."""
+        return cls.from_rows(iter_all_matches(), window)
+
+    def _push(self, team: str, result: str):
+        results = self._results.get(team)
+        if results is None:
+            results = self._results[team] = deque(maxlen=self.window)
+            self._points[team] = 0
+        if len(results) == self.window:
+            self._points[team] -= _RESULTS[results[0]]
+        results.append(result)
+        self._points[team] += _RESULTS[result]
+
+    def add_result(self, team_a: str, team_b: str, score_a: int, score_b: int):
+        """Учитывает результат очередного матча."""
+        score_a, score_b = score_a or 0, score_b or 0
+        if score_a > score_b:
+            self._push(team_a, "В")
+            self._push(team_b, "П")
+        elif score_a < score_b:
+            self._push(team_a, "П")
+            self._push(team_b, "В")
+        else:
+            self._push(team_a, "Н")
+            self._push(team_b, "Н")
+
+    def add_match(self, match):
+        """Учитывает завершённый объект Match."""
+        goals_a, goals_b = match.score()
+        self.add_result(match.team_a.name, match.team_b.name, goals_a, goals_b)
+
+    def points(self, team: str) -> int:
+        """Очки команды за последние window матчей."""
+        return self._points.get(team, 0)
+
+    def form(self, team: str) -> str:
+        """Строка результатов от старых к новым, например 'ВНПВВ'."""
+        return "".join(self._results.get(team, ()))
+
+    def table(self) -> List[Tuple[str, int]]:
+        """Очки за последние матчи для всех команд, по убыванию."""
+        return sorted(self._points.items(), key=lambda item: (-item[1], item[0]))
+
+    def __len__(self):
+        return len(self._points)
+
+    def __repr__(self):
+        return f"RollingForm(window={self.window}, teams={len(self._points)})"
@@ -0,0 +1,115 @@
+﻿# sports_team/ingest.py
+"""
+Потокобезопасная регистрация голов из нескольких потоков.
+
+Match.record_goal и Player.add_match_stats не синхронизированы: при записи
+из нескольких потоков приращения `+=` и события могут теряться. Здесь каждый
+поток пишет голы в собственный буфер (без блокировок на горячем пути), а
+буферы сливаются в Match одним потоком при merge()/finalize().
+Однопоточный путь (Match.record_goal) при этом не меняется.
+"""
+import itertools
+import threading
+from typing import Dict, List
+
+from sports_team.match import Match
+from sports_team.player import Player
+
+
+class ConcurrentMatchRecorder:
+    """Приём голов одного матча из нескольких потоков."""
+
+    def __init__(self, match: Match):
+        self.match = match
+        self._local = threading.local()
+        self._buffers: List[list] = []
+        self._lock = threading.Lock()
+        self._seq = itertools.count()  # общий порядок поступления для голов одной минуты
+        # Принадлежность игроков командам — один раз, без перебора составов на каждый гол
+        self._sides: Dict[int, str] = {id(p): "A" for p in match.team_a.players}
+        self._sides.update({id(p): "B" for p in match.team_b.players})
+
+    def _buffer(self) -> list:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = []
+            with self._lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def record_goal(self, player: Player, minute: int):
+        """Регистрирует гол (можно вызывать из любого потока)."""
+        if minute < 0 or minute > 120:
+            raise ValueError("Минута должна быть в диапазоне 0–120.")
+        side = self._sides.get(id(player))
+        if side is None:
+            raise ValueError("Игрок не найден ни в одной из команд.")
+        self._buffer().append((minute, next(self._seq), player, side))
+
+    def pending(self) -> int:
+        """Количество голов, ещё не перенесённых в матч."""
+        with self._lock:
+            return sum(len(b) for b in self._buffers)
+
+    def merge(self) -> int:
+        """
+        Переносит накопленные голы в матч (в порядке минут) и обновляет статистику игроков.
+        Возвращает количество перенесённых голов.
+        """
+        with self._lock:
+            collected = []
+            for buffer in self._buffers:
+                taken = buffer[:]
+                # Голы, добавленные после копирования, остаются до следующего merge()
+                del buffer[:len(taken)]
+                collected.extend(taken)
+            collected.sort(key=lambda item: (item[0], item[1]))
+            for minute, _, player, side in collected:
+                player.add_match_stats(goals=1)
+                self.match.events.append({"minute": minute, "player": player, "team": side})
+        return len(collected)
+
+    def finalize(self):
+        """Сливает буферы и завершает матч (finalize_match)."""
+        self.merge()
+        self.match.finalize_match()
+        return self.match
+
+
+class ConcurrentIngest:
+    """Реестр приёмников для нескольких одновременно идущих матчей."""
+
+    def __init__(self):
+        self._recorders: Dict[int, ConcurrentMatchRecorder] = {}
+        self._lock = threading.Lock()
+
+    def recorder(self, match: Match) -> ConcurrentMatchRecorder:
+        """Приёмник голов для матча (создаётся при первом обращении)."""
+        recorder = self._recorders.get(id(match))
+        if recorder is None:
+            with self._lock:
+                recorder = self._recorders.get(id(match))
+                if recorder is None:
+                    recorder = self._recorders[id(match)] = ConcurrentMatchRecorder(match)
+        return recorder
+
+    def record_goal(self, match: Match, player: Player, minute: int):
+        self.recorder(match).record_goal(player, minute)
+
+    def finalize(self, match: Match) -> Match:
+        """Завершает матч и убирает его из реестра."""
+        with self._lock:
+            recorder = self._recorders.pop(id(match), None)
+        if recorder is None:
+            match.finalize_match()
+            return match
+        return recorder.finalize()
+
+    def finalize_all(self) -> List[Match]:
+        with self._lock:
+            recorders = list(self._recorders.values())
+            self._recorders.clear()
+        return [r.finalize() for r in recorders]
+
+    def __len__(self):
+        return len(self._recorders)
@@ -0,0 +1,82 @@
+﻿# sports_team/ledger.py
+"""Журнал результатов команды: компактные записи матчей и накопленные итоги."""
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, NamedTuple, Optional
+
+
+class MatchRecord(NamedTuple):
+    """Результат одного матча с точки зрения команды."""
+    opponent: str
+    goals_for: int
+    goals_against: int
+    home: bool
+    date: Optional[datetime]
+
+    @property
+    def result(self) -> str:
+        """'В' — победа, 'Н' — ничья, 'П' — поражение."""
+        if self.goals_for > self.goals_against:
+            return "В"
+        if self.goals_for < self.goals_against:
+            return "П"
+        return "Н"
+
+
+class MatchLedger:
+    """
+    Журнал матчей команды только на добавление.
+    Записи хранятся в параллельных массивах (array), добавление — O(1),
+    итоги (победы/ничьи/поражения, голы) поддерживаются на лету, поэтому stats() — O(1).
+    """
+
+    def __init__(self):
+        self._opponents = []
+        self._goals_for = array("I")
+        self._goals_against = array("I")
+        self._home = array("b")
+        self._dates = array("d")  # timestamp, nan — дата неизвестна
+        self.wins = self.draws = self.losses = 0
+        self.scored = self.conceded = 0
+
+    def append(self, opponent: str, goals_for: int, goals_against: int,
+               home: bool = True, date: Optional[datetime] = None):
+        """Добавляет результат матча."""
+        if goals_for < 0 or goals_against < 0:
+            raise ValueError("Количество голов не может быть отрицательным.")
+        self._opponents.append(opponent)
+        self._goals_for.append(goals_for)
+        self._goals_against.append(goals_against)
+        self._home.append(1 if home else 0)
+        self._dates.append(date.timestamp() if date is not None else float("nan"))
+        if goals_for > goals_against:
+            self.wins += 1
+        elif goals_for < goals_against:
+            self.losses += 1
+        else:
+            self.draws += 1
+        self.scored += goals_for
+        self.conceded += goals_against
+
+    def stats(self) -> Dict[str, int]:
+        """Итоги в формате Team.match_stats()."""
+        return {
+            "Матчи": len(self._opponents),
+            "Победы": self.wins,
+            "Поражения": self.losses,
+            "Ничьи": self.draws,
+        }
+
+    def __getitem__(self, index: int) -> MatchRecord:
+        ts = self._dates[index]
+        return MatchRecord(self._opponents[index], self._goals_for[index], self._goals_against[index],
+                           bool(self._home[index]), None if ts != ts else datetime.fromtimestamp(ts))
+
+    def __iter__(self) -> Iterator[MatchRecord]:
+        return (self[i] for i in range(len(self._opponents)))
+
+    def __len__(self):
+        return len(self._opponents)
+
+    def __repr__(self):
+        return f"MatchLedger(matches={len(self)}, wins={self.wins}, draws={self.draws}, losses={self.losses})"
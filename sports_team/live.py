@@ -0,0 +1,453 @@
+﻿# sports_team/live.py
+"""
+Приём событий одновременно идущих матчей (asyncio).
+
+Источник (очередь в процессе, дописываемый файл или TCP-сокет) выдаёт события
+start / goal / end. Диспетчер раскладывает их по ограниченным очередям матчей:
+если очередь матча заполнена, диспетчер ждёт, перестаёт читать источник,
+и давление передаётся дальше: производителю очереди, писателю файла или клиенту сокета.
+Обработчик матча применяет голы к Match. По событию end матч завершается и
+передаётся на запись, а записывающая задача сохраняет завершённые матчи пачками
+(Matchday.commit в отдельном потоке через asyncio.to_thread).
+
+Формат строк файла и сокета — JSON, по событию на строку:
+    {"type": "start", "match": "m1", "team_a": "Альфа", "team_b": "Бета"}
+    {"type": "goal", "match": "m1", "team": "Альфа", "number": 9, "minute": 23}
+    {"type": "end", "match": "m1"}
+Ошибочная строка (не JSON, неизвестный тип события) попадает в stats.errors,
+чтение источника продолжается.
+
+Если конвейеру передана лига (League), начало матча, голы и завершение проходят через
+её команды в режиме пачек: состояние меняется сразу, а события пишутся в журнал
+раз в JOURNAL_INTERVAL одной транзакцией, и следующий replay() видит сыгранные матчи.
+Запуск (лига — текущее состояние из журнала событий, матчи пишутся в него же):
+    python -m sports_team.live --file events.jsonl [--follow]
+    python -m sports_team.live --port 8765
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+from sports_team.events import League
+from sports_team.match import Match
+from sports_team.matchday import Matchday
+from sports_team.profiling import enable_from_env
+from sports_team.team import Team
+
+# Размер очереди событий одного матча
+QUEUE_SIZE = 64
+# Сколько завершённых матчей записывать одной транзакцией (не больше)
+PERSIST_BATCH = 500
+# Как часто (секунды) события лиги пишутся в журнал — одной транзакцией за раз
+JOURNAL_INTERVAL = 0.05
+_STOP = object()
+
+
+class LiveEvent(NamedTuple):
+    """Событие матча. received — время поступления (time.perf_counter) для расчёта задержки."""
+    type: str
+    match: str
+    data: dict
+    received: float
+
+    @classmethod
+    def from_dict(cls, data: dict, received: float = None) -> "LiveEvent":
+        if data.get("type") not in ("start", "goal", "end"):
+            raise ValueError(f"Неизвестный тип события: {data.get('type')}")
+        if "match" not in data:
+            raise ValueError("В событии нет идентификатора матча.")
+        return cls(data["type"], str(data["match"]), data,
+                   time.perf_counter() if received is None else received)
+
+
+def _line_event(line, where: str) -> LiveEvent:
+    """
+    Событие из JSON-строки. Ошибочная строка не прерывает источник: она становится
+    событием invalid, которое конвейер записывает в stats.errors. where — место строки.
+    """
+    received = time.perf_counter()
+    try:
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("Событие должно быть JSON-объектом.")
+        if data.get("type") == "eof":
+            return LiveEvent("eof", where, data, received)
+        return LiveEvent.from_dict(data, received)
+    except ValueError as e:
+        return LiveEvent("invalid", where, {"error": str(e)}, received)
+
+
+# === Источники ===
+async def queue_source(queue: asyncio.Queue) -> AsyncIterator[LiveEvent]:
+    """События из asyncio.Queue (словари или LiveEvent); None завершает поток."""
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        yield item if isinstance(item, LiveEvent) else LiveEvent.from_dict(item)
+
+
+async def file_source(path: str, follow: bool = False, poll: float = 0.2) -> AsyncIterator[LiveEvent]:
+    """
+    События из файла JSON-строк. follow=True — как `tail -f`: ждать новых строк,
+    пока не встретится событие {"type": "eof"}.
+    """
+    with open(path, encoding="utf-8") as f:
+        partial = ""
+        number = 0
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                await asyncio.sleep(poll)
+                continue
+            partial += line
+            if not partial.endswith("\n"):  # строка ещё дописывается
+                continue
+            line, partial = partial.strip(), ""
+            number += 1
+            if not line:
+                continue
+            event = _line_event(line, f"строка {number}")
+            if event.type == "eof":
+                break
+            yield event
+        if partial.strip():
+            event = _line_event(partial, f"строка {number + 1}")
+            if event.type != "eof":
+                yield event
+
+
+class SocketSource:
+    """
+    TCP-сервер, принимающий JSON-строки событий от любого числа клиентов.
+    Очередь между клиентами и конвейером ограничена: пока она заполнена,
+    сервер не читает сокеты и клиенты упираются в окно TCP.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, queue_size: int = 1024):
+        self.host, self.port = host, port
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> int:
+        """Запускает сервер; возвращает фактический порт."""
+        self._server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        where = f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else "клиент"
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                event = _line_event(line, where)
+                if event.type == "eof":  # клиент закончил передачу
+                    break
+                await self._queue.put(event)
+        finally:
+            writer.close()
+
+    async def close(self):
+        """Останавливает приём; события, уже попавшие в очередь, будут выданы."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self._queue.put(_STOP)
+
+    async def __aiter__(self):
+        if self._server is None:
+            await self.start()
+        while True:
+            event = await self._queue.get()
+            if event is _STOP:
+                return
+            yield event
+
+
+# === Метрики ===
+class LiveStats:
+    """Счётчики конвейера и задержки от поступления события до его применения (гол) или записи (end)."""
+
+    def __init__(self):
+        self.events = 0
+        self.goals = 0
+        self.finished = 0
+        self.persisted = 0
+        self.errors: List[str] = []
+        self.backpressure = 0  # сколько раз диспетчер ждал места в очереди матча
+        self.goal_latencies: List[float] = []
+        self.end_latencies: List[float] = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @staticmethod
+    def _percentiles(values: List[float]) -> Dict[str, float]:
+        if not values:
+            return {}
+        ordered = sorted(values)
+        result = {f"p{p}": ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000
+                  for p in (50, 95, 99)}
+        result["max"] = ordered[-1] * 1000
+        return result
+
+    def summary(self) -> dict:
+        """Итоги: события в секунду и задержки в миллисекундах."""
+        elapsed = self.elapsed or (time.perf_counter() - self.started)
+        return {
+            "События": self.events,
+            "Голы": self.goals,
+            "Завершено матчей": self.finished,
+            "Записано матчей": self.persisted,
+            "Ошибки": len(self.errors),
+            "Ожиданий очереди": self.backpressure,
+            "Событий в секунду": self.events / elapsed if elapsed else 0.0,
+            "Задержка гола, мс": self._percentiles(self.goal_latencies),
+            "Задержка записи, мс": self._percentiles(self.end_latencies),
+        }
+
+
+# === Конвейер ===
+class _LiveMatch:
+    """Идущий матч: объект Match, очередь событий и номера игроков команд."""
+
+    def __init__(self, match: Match, queue_size: int):
+        self.match = match
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.players = {
+            match.team_a.name: {p.number: p for p in match.team_a.players},
+            match.team_b.name: {p.number: p for p in match.team_b.players},
+        }
+
+
+class LivePipeline:
+    """
+    Диспетчер событий по матчам. teams — команды по названию (Team.name).
+    persist=False — матчи завершаются, но не записываются в БД.
+    league — лига, через команды которой проходят начало матча, голы и завершение
+    (события журнала пишутся пачками, см. League.start_batch); тогда teams должны быть league.teams.
+    """
+
+    def __init__(self, teams: Dict[str, Team], queue_size: int = QUEUE_SIZE,
+                 persist: bool = True, persist_batch: int = PERSIST_BATCH,
+                 league: League = None):
+        if queue_size <= 0 or persist_batch <= 0:
+            raise ValueError("Размеры очередей должны быть положительными.")
+        if league is not None and teams is not league.teams:
+            raise ValueError("Команды конвейера должны быть командами лиги (league.teams).")
+        self.teams = teams
+        self.league = league
+        self.queue_size = queue_size
+        self.persist = persist
+        self.persist_batch = persist_batch
+        self.live: Dict[str, _LiveMatch] = {}
+        self.finished: List[Match] = []
+        self.unsaved: List[Match] = []  # завершённые матчи, которые не удалось записать
+        self.stats = LiveStats()
+        self._workers: List[asyncio.Task] = []
+        self._to_persist: Optional[asyncio.Queue] = None
+        self._journal_stop: Optional[asyncio.Event] = None
+
+    async def run(self, source) -> LiveStats:
+        """Обрабатывает события источника до его окончания; возвращает статистику."""
+        self.stats = stats = LiveStats()
+        self._to_persist = asyncio.Queue(self.persist_batch * 4)
+        persister = asyncio.create_task(self._persister())
+        journal = None
+        if self.league is not None:
+            self.league.start_batch()
+            self._journal_stop = asyncio.Event()
+            journal = asyncio.create_task(self._journal())
+        cancelled = False
+        try:
+            async for event in source:
+                stats.events += 1
+                try:
+                    await self._dispatch(event)
+                except (KeyError, ValueError) as e:
+                    stats.errors.append(f"{event.type} {event.match}: {e}")
+            # Источник закончился: дожидаемся обработки уже принятых событий
+            for live in self.live.values():
+                await live.queue.put(_STOP)
+            await asyncio.gather(*self._workers)
+            self._workers = []
+        except asyncio.CancelledError:
+            # Отмена: задачи останавливаются сразу, принятые на запись матчи попадают в unsaved
+            for task in self._workers:
+                task.cancel()
+            self._workers = []
+            persister.cancel()
+            if journal is not None:
+                journal.cancel()
+            cancelled = True
+            while not self._to_persist.empty():
+                item = self._to_persist.get_nowait()
+                if item is not _STOP:
+                    self.unsaved.append(item[0])
+            raise
+        finally:
+            # Записывающая задача не падает на ошибках записи, поэтому место для _STOP освободится;
+            # если она уже завершена (или отменена выше), ждать места в очереди нельзя
+            if not cancelled and not persister.done():
+                await self._to_persist.put(_STOP)
+                await persister
+            if journal is not None and not cancelled:
+                self._journal_stop.set()
+                await journal
+                self.league.end_batch()
+        stats.elapsed = time.perf_counter() - stats.started
+        return stats
+
+    async def _dispatch(self, event: LiveEvent):
+        if event.type == "invalid":
+            raise ValueError(event.data["error"])
+        if event.type == "start":
+            if event.match in self.live:
+                raise ValueError("Матч уже идёт.")
+            data = event.data
+            date = datetime.fromisoformat(data["date"]) if data.get("date") else None
+            team_a, team_b = self.teams[data["team_a"]], self.teams[data["team_b"]]
+            if self.league is None:
+                match = Match(team_a, team_b, date)
+            else:
+                match = self.league.start_match(team_a.name, team_b.name, date)
+            live = _LiveMatch(match, self.queue_size)
+            self.live[event.match] = live
+            self._workers.append(asyncio.create_task(self._worker(event.match, live)))
+            return
+        live = self.live.get(event.match)
+        if live is None:
+            raise KeyError("Матч не начат.")
+        if live.queue.full():
+            self.stats.backpressure += 1
+        await live.queue.put(event)
+        if event.type == "end":
+            del self.live[event.match]  # новые события этого матча — ошибка
+
+    async def _worker(self, match_id: str, live: _LiveMatch):
+        """Применяет события одного матча по порядку."""
+        stats = self.stats
+        while True:
+            event = await live.queue.get()
+            if event is _STOP:  # источник закончился, матч остаётся незавершённым
+                return
+            if event.type == "end":
+                match = live.match
+                if self.league is None:
+                    match.finalize_match()
+                    match.team_a.add_match(match)
+                    match.team_b.add_match(match)
+                else:
+                    self.league.finalize_match(match)
+                self.finished.append(match)
+                stats.finished += 1
+                await self._to_persist.put((match, event.received))
+                return
+            try:
+                player = live.players[event.data["team"]][event.data["number"]]
+                if self.league is None:
+                    live.match.record_goal(player, event.data["minute"])
+                else:
+                    self.league.record_goal(live.match, player, event.data["minute"])
+            except (KeyError, ValueError) as e:
+                stats.errors.append(f"goal {match_id}: {e!r}")
+                continue
+            stats.goals += 1
+            stats.goal_latencies.append(time.perf_counter() - event.received)
+
+    async def _journal(self):
+        """
+        Раз в JOURNAL_INTERVAL пишет накопленные события лиги в журнал одной транзакцией (в потоке).
+        Пачка, которую не удалось записать, повторяется со следующей.
+        """
+        league, stats = self.league, self.stats
+        unwritten: list = []
+        while True:
+            try:
+                await asyncio.wait_for(self._journal_stop.wait(), JOURNAL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            unwritten += league.take_batch()
+            if unwritten:
+                try:
+                    await asyncio.to_thread(league.write_batch, unwritten)
+                    unwritten = []
+                except Exception as e:
+                    stats.errors.append(f"журнал лиги, {len(unwritten)} событий: {e!r}")
+            if not unwritten:
+                league.snapshot_if_due()
+            if self._journal_stop.is_set():
+                return
+
+    async def _persister(self):
+        """Записывает завершённые матчи пачками; запись идёт в потоке, цикл событий не блокируется."""
+        stats = self.stats
+        stop = False
+        while not stop:
+            batch = [await self._to_persist.get()]
+            while len(batch) < self.persist_batch and not self._to_persist.empty():
+                batch.append(self._to_persist.get_nowait())
+            if batch[-1] is _STOP:
+                batch.pop()
+                stop = True
+            if not batch:
+                continue
+            if self.persist:
+                try:
+                    await asyncio.to_thread(Matchday(m for m, _ in batch).commit)
+                except Exception as e:  # ошибка записи не должна останавливать приём событий
+                    stats.errors.append(f"запись {len(batch)} матчей: {e!r}")
+                    self.unsaved.extend(m for m, _ in batch)
+                    continue
+            now = time.perf_counter()
+            stats.persisted += len(batch)
+            stats.end_latencies.extend(now - received for _, received in batch)
+
+    def open_matches(self) -> Dict[str, Match]:
+        """Матчи, для которых ещё не пришло событие end."""
+        return {match_id: live.match for match_id, live in self.live.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Приём событий идущих матчей.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="файл JSON-строк событий")
+    source.add_argument("--port", type=int, help="принимать события по TCP на этом порту")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--follow", action="store_true", help="ждать новых строк файла (до события eof)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    args = parser.parse_args()
+    enable_from_env()
+
+    from sports_team.db import init_db
+
+    init_db()
+    league = League.open()
+
+    async def run():
+        pipeline = LivePipeline(league.teams, queue_size=args.queue_size, league=league)
+        if args.file:
+            return await pipeline.run(file_source(args.file, follow=args.follow))
+        events = SocketSource(args.host, args.port)
+        print(f"Приём событий на {args.host}:{await events.start()} (Ctrl+C — завершить)")
+        try:
+            return await pipeline.run(events)
+        finally:
+            await events.close()
+
+    try:
+        stats = asyncio.run(run())
+    except KeyboardInterrupt:
+        return
+    for key, value in stats.summary().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
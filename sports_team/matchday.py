@@ -0,0 +1,167 @@
+﻿# sports_team/matchday.py
+"""
+Пакетное сохранение игрового дня.
+
+Вместо save_match + двух save_team на каждый матч (отдельные транзакции)
+Matchday собирает приращения статистики игроков в памяти и записывает матчи,
+события и игроков одной транзакцией массовыми запросами (executemany).
+"""
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from sports_team import db, ratings
+from sports_team.match import Match
+from sports_team.profiling import profiled
+
+_CHUNK = 500  # размер списка параметров в запросах вида IN (...)
+
+
+class Matchday:
+    """Набор завершённых матчей одного игрового дня."""
+
+    def __init__(self, matches: Iterable[Match] = ()):
+        self.matches: List[Match] = []
+        self.timings: Dict[str, float] = {}
+        for match in matches:
+            self.add(match)
+
+    def add(self, match: Match):
+        """Добавляет завершённый матч."""
+        if not isinstance(match, Match):
+            raise TypeError("Можно добавить только объект Match")
+        self.matches.append(match)
+
+    def player_deltas(self) -> Dict[Tuple[str, int], dict]:
+        """
+        Приращения статистики игроков за игровой день: {(команда, номер): {...}}.
+        Приращения те же, что внёс в объекты record_goal: за каждый гол +1 гол и +1 матч.
+        """
+        deltas: Dict[Tuple[str, int], dict] = {}
+        for match in self.matches:
+            for e in match.events:
+                player = e.get("player")
+                side = e.get("team")
+                if player is None or side not in ("A", "B"):
+                    continue
+                team = match.team_a if side == "A" else match.team_b
+                key = (team.name, player.number)
+                delta = deltas.get(key)
+                if delta is None:
+                    delta = deltas[key] = {"player": player, "goals": 0, "assists": 0, "games": 0}
+                delta["goals"] += 1
+                delta["games"] += 1
+        return deltas
+
+    @profiled(name="matchday_commit")
+    def commit(self) -> Dict[str, float]:
+        """Записывает игровой день одной транзакцией. Возвращает время этапов в секундах."""
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        db._ensure_schema()
+
+        # --- агрегация в памяти ---
+        archived = {season for season, _ in db.list_season_partitions()}
+        match_rows = []
+        for match in self.matches:
+            season = db.season_of(match.date)
+            if season in archived:
+                raise ValueError(f"Сезон {season} перенесён в архив и закрыт для записи.")
+            goals_a, goals_b = match.score()
+            match_rows.append((match.team_a.name, match.team_b.name, goals_a, goals_b,
+                               match.date.strftime("%Y-%m-%d %H:%M:%S"),
+                               db._pair_key(match.team_a.name, match.team_b.name)))
+        deltas = self.player_deltas()
+        team_names = sorted({name for name, _ in deltas})
+        timings["агрегация"] = time.perf_counter() - start
+
+        conn = db.get_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE;")
+            # Чужие фиксации до нашей блокировки сбрасывают кэш целиком (см. db._invalidate_teams)
+            changes_before = db._validate_cache()
+
+            # --- матчи ---
+            stage = time.perf_counter()
+            cur.executemany("""
+                INSERT INTO matches (team_a, team_b, score_a, score_b, date, pair_key)
+                VALUES (?, ?, ?, ?, ?, ?);
+            """, match_rows)
+            # Запись заблокирована BEGIN IMMEDIATE, поэтому id новых матчей идут подряд
+            match_ids = []
+            if match_rows:
+                cur.execute("SELECT id FROM matches ORDER BY id DESC LIMIT ?;", (len(match_rows),))
+                match_ids = [row[0] for row in reversed(cur.fetchall())]
+            timings["матчи"] = time.perf_counter() - stage
+
+            # --- события ---
+            stage = time.perf_counter()
+            event_rows = []
+            for match, match_id in zip(self.matches, match_ids):
+                event_rows.extend(db._event_rows(match, match_id))
+            cur.executemany("""
+                INSERT INTO match_events (match_id, minute, team, player_name, player_number)
+                VALUES (?, ?, ?, ?, ?);
+            """, event_rows)
+            timings["события"] = time.perf_counter() - stage
+
+            # --- игроки ---
+            stage = time.perf_counter()
+            cur.executemany("INSERT OR IGNORE INTO teams (name) VALUES (?);", [(n,) for n in team_names])
+            team_ids = {}
+            for i in range(0, len(team_names), _CHUNK):
+                chunk = team_names[i:i + _CHUNK]
+                cur.execute(f"SELECT name, id FROM teams WHERE name IN ({','.join('?' * len(chunk))});", chunk)
+                team_ids.update(cur.fetchall())
+            # Новый игрок записывается с текущими значениями, существующему добавляются приращения
+            cur.executemany("""
+                INSERT INTO players (name, number, position, goals, assists, games, team_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (team_id, number) DO UPDATE SET
+                    goals = players.goals + ?,
+                    assists = players.assists + ?,
+                    games = players.games + ?;
+            """, [(d["player"].name, number, d["player"].position, d["player"].goals,
+                   d["player"].assists, d["player"].games, team_ids[team],
+                   d["goals"], d["assists"], d["games"])
+                  for (team, number), d in deltas.items()])
+            timings["игроки"] = time.perf_counter() - stage
+
+            # --- история статистики игроков и агрегаты по периодам ---
+            stage = time.perf_counter()
+            stat_rows = []
+            for match, match_id in zip(self.matches, match_ids):
+                stat_rows.extend(db._player_stat_rows(match, match_id))
+            db._apply_player_stats(cur, stat_rows)
+            timings["статистика"] = time.perf_counter() - stage
+
+            # --- рейтинги: в порядке (дата, id), как при пересчёте всей истории ---
+            stage = time.perf_counter()
+            rating_rows = sorted(((match_id, *row[:4], row[4]) for row, match_id in zip(match_rows, match_ids)),
+                                 key=lambda r: (r[5], r[0]))
+            replayed_from = ratings.apply_matches(cur, rating_rows, archived_until=db._archived_until())
+            timings["рейтинги"] = time.perf_counter() - stage
+
+            changes_after = db._match_changes(cur)
+            stage = time.perf_counter()
+            conn.commit()
+            timings["фиксация"] = time.perf_counter() - stage
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        db._invalidate_teams(*{name for m in self.matches for name in (m.team_a.name, m.team_b.name)},
+                             changes=(changes_before, changes_after))
+        db._finish_ratings_replay(replayed_from)
+        timings["всего"] = time.perf_counter() - start
+        self.timings = timings
+        return timings
+
+    def __len__(self):
+        return len(self.matches)
+
+    def __repr__(self):
+        return f"Matchday(matches={len(self.matches)})"
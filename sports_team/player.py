@@ -7,6 +7,9 @@ from sports_team.utils import validate_non_negative
 class Player(ABC):
     """Абстрактный базовый класс, описывающий игрока спортивной команды."""
 
+    # Изменён ли игрок после последнего сохранения в БД (для старых сохранений — да)
+    _dirty = True
+
     def __init__(self, name: str, number: int, position: str):
         self.name = name
         self.number = number
@@ -14,6 +17,7 @@ class Player(ABC):
         self._games = 0
         self._goals = 0
         self._assists = 0
+        self._dirty = True
 
     # --- managed-атрибуты ---
     @property
@@ -24,6 +28,7 @@ class Player(ABC):
     def games(self, value: int):
         validate_non_negative(value, "Количество игр")
         self._games = value
+        self._dirty = True
 
     @property
     def goals(self) -> int:
@@ -33,6 +38,7 @@ class Player(ABC):
     def goals(self, value: int):
         validate_non_negative(value, "Количество голов")
         self._goals = value
+        self._dirty = True
 
     @property
     def assists(self) -> int:
@@ -42,6 +48,7 @@ class Player(ABC):
     def assists(self, value: int):
         validate_non_negative(value, "Количество передач")
         self._assists = value
+        self._dirty = True
 
     # --- абстрактный метод ---
     @abstractmethod
@@ -57,7 +64,16 @@ class Player(ABC):
         self._games += 1
         self._goals += goals
         self._assists += assists
-  
+        self._dirty = True
+
+    @property
+    def is_dirty(self) -> bool:
+        """Есть ли несохранённые изменения."""
+        return self._dirty
+
+    def mark_clean(self):
+        """Отметить игрока как сохранённого."""
+        self._dirty = False
 
     def to_dict(self) -> Dict[str, str]:
         """Преобразовать объект игрока в словарь."""
@@ -0,0 +1,218 @@
+﻿# sports_team/profiling.py
+"""
+Режим профилирования действий меню и функций db/report.
+
+Включается переменной окружения SPORTS_PROFILE (1 — каталог profiles,
+иначе — путь к каталогу; читается точками входа run.py, live и server через
+enable_from_env()), флагом `python run.py --profile[=КАТАЛОГ]` или вызовом enable(). Для каждого вызова функции, помеченной @profiled, в каталог
+пишутся файлы <действие>-<время>-<n>:
+    .prof       — статистика cProfile (pstats, snakeviz и т. п.);
+    .collapsed  — стеки в свёрнутом формате ("a;b;c мкс") для flamegraph.pl / speedscope;
+    .mem.txt    — пик памяти и строки кода, выделившие больше всего (tracemalloc).
+Вложенные профилируемые вызовы входят в профиль внешнего действия.
+Действия в разных потоках профилируются одновременно: tracemalloc общий,
+он запускается первым действием и останавливается последним, а пик памяти
+при параллельных действиях включает выделения других потоков.
+Ошибки самого профилирования не прерывают вызов и не подменяют его результат.
+Когда режим выключен, декоратор только проверяет флаг.
+"""
+import functools
+import itertools
+import os
+import threading
+import time
+
+PROFILE_ENV = "SPORTS_PROFILE"
+DEFAULT_DIR = "profiles"
+# Сколько строк-источников выделений памяти записывать
+TOP_ALLOCATIONS = 25
+# Пути стека короче этой доли секунды в .collapsed не попадают
+_MIN_STACK_TIME = 1e-6
+_MAX_DEPTH = 100
+
+_config = {"directory": None}
+_counter = itertools.count(1)
+_active = threading.local()
+# Сколько действий сейчас пользуются tracemalloc и запущен ли он профилированием
+_tracing = {"users": 0, "owned": False}
+_tracing_lock = threading.Lock()
+
+
+def enable(directory: str = DEFAULT_DIR):
+    """Включает профилирование с записью результатов в directory."""
+    os.makedirs(directory, exist_ok=True)
+    _config["directory"] = directory
+
+
+def disable():
+    _config["directory"] = None
+
+
+def is_enabled() -> bool:
+    return _config["directory"] is not None
+
+
+def enable_from_env():
+    """Включает профилирование, если задана переменная SPORTS_PROFILE (кроме "0")."""
+    value = os.environ.get(PROFILE_ENV, "").strip()
+    if value and value != "0":
+        enable(DEFAULT_DIR if value == "1" else value)
+
+
+def enable_from_argv(argv) -> bool:
+    """Обрабатывает флаг --profile[=КАТАЛОГ]; возвращает True, если он есть."""
+    for arg in argv:
+        if arg == "--profile":
+            enable()
+            return True
+        if arg.startswith("--profile="):
+            enable(arg.split("=", 1)[1] or DEFAULT_DIR)
+            return True
+    return False
+
+
+def _label(code) -> str:
+    """Имя функции для стека: модуль:функция:строка."""
+    filename, line, name = code
+    if filename == "~":  # встроенные функции: ('~', 0, "<built-in method ...>")
+        return name
+    return f"{os.path.splitext(os.path.basename(filename))[0]}:{name}:{line}"
+
+
+def collapsed_stacks(stats) -> list:
+    """
+    Свёрнутые стеки из pstats.Stats: ["корень;…;функция мкс", …].
+    cProfile хранит только пары вызывающий → вызываемый, поэтому время пути
+    распределяется пропорционально времени рёбер (как в flameprof/gprof2dot).
+    """
+    entries = stats.stats  # func -> (cc, nc, tt, ct, callers)
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, value in entries.items() if not value[4]]
+    totals = {}
+
+    def walk(func, path, time_on_path):
+        _, _, tt, ct, _ = entries[func]
+        ratio = time_on_path / ct if ct else 0.0
+        path = path + (_label(func),)
+        own = tt * ratio
+        if own >= _MIN_STACK_TIME:
+            key = ";".join(path)
+            totals[key] = totals.get(key, 0.0) + own
+        if len(path) >= _MAX_DEPTH:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            share = edge_ct * ratio
+            if share >= _MIN_STACK_TIME and _label(callee) not in path:  # рекурсия — один уровень
+                walk(callee, path, share)
+
+    for root in roots:
+        walk(root, (), entries[root][3])
+    return [f"{stack} {round(seconds * 1e6)}" for stack, seconds in sorted(totals.items())]
+
+
+def _write_results(name, profiler, snapshot, peak, elapsed):
+    import pstats
+
+    base = os.path.join(_config["directory"] or DEFAULT_DIR,
+                        f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{next(_counter)}")
+    profiler.dump_stats(base + ".prof")
+    stats = pstats.Stats(profiler)
+    with open(base + ".collapsed", "w", encoding="utf-8") as f:
+        f.write("\n".join(collapsed_stacks(stats)) + "\n")
+    with open(base + ".mem.txt", "w", encoding="utf-8") as f:
+        f.write(f"Действие: {name}\nВремя: {elapsed:.4f} с\nПик памяти: {peak / 1024:.1f} КБ\n\n")
+        f.write(f"Больше всего памяти выделили (осталось после вызова, топ {TOP_ALLOCATIONS}):\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            f.write(f"{stat.size / 1024:10.1f} КБ {stat.count:8d} блоков  {frame.filename}:{frame.lineno}\n")
+    return base
+
+
+def _start_tracing() -> bool:
+    """Подключает действие к tracemalloc; True, если других действий сейчас нет."""
+    import tracemalloc
+
+    with _tracing_lock:
+        if _tracing["users"] == 0:
+            _tracing["owned"] = not tracemalloc.is_tracing()
+            if _tracing["owned"]:
+                tracemalloc.start()
+        _tracing["users"] += 1
+        return _tracing["users"] == 1
+
+
+def _stop_tracing():
+    import tracemalloc
+
+    with _tracing_lock:
+        _tracing["users"] -= 1
+        if _tracing["users"] == 0 and _tracing["owned"]:
+            tracemalloc.stop()
+            _tracing["owned"] = False
+
+
+class _Session:
+    """Профиль одного действия: cProfile текущего потока и замер памяти."""
+
+    def __init__(self):
+        import cProfile
+        import tracemalloc
+
+        alone = _start_tracing()
+        try:
+            if alone:  # пик общий для всех потоков, сбрасывать его при чужом замере нельзя
+                tracemalloc.reset_peak()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+            self.profiler = cProfile.Profile()
+            self.start = time.perf_counter()
+            self.profiler.enable()
+        except BaseException:
+            _stop_tracing()
+            raise
+
+    def finish(self, action: str):
+        import tracemalloc
+
+        elapsed = time.perf_counter() - self.start
+        self.profiler.disable()
+        try:
+            peak = tracemalloc.get_traced_memory()[1] - self.baseline
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)])
+        finally:
+            _stop_tracing()
+        base = _write_results(action, self.profiler, snapshot, peak, elapsed)
+        print(f" Профиль {action}: {elapsed:.4f} сек, пик памяти {peak / 1024:.1f} КБ -> {base}.*")
+
+
+def profiled(func=None, *, name: str = None):
+    """
+    Декоратор: при включённом режиме профилирует каждый вызов функции
+    (cProfile + tracemalloc) и пишет файлы результатов.
+    """
+    if func is None:
+        return functools.partial(profiled, name=name)
+    action = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _config["directory"] is None or getattr(_active, "depth", 0):
+            return func(*args, **kwargs)
+        try:
+            session = _Session()
+        except Exception as e:  # например, в потоке уже работает другой профилировщик
+            print(f" Профиль {action} не снят: {e!r}")
+            return func(*args, **kwargs)
+        _active.depth = 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _active.depth = 0
+            try:
+                session.finish(action)
+            except Exception as e:
+                print(f" Профиль {action} не записан: {e!r}")
+    return wrapper
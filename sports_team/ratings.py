@@ -0,0 +1,317 @@
+﻿# sports_team/ratings.py
+"""
+Рейтинги силы команд по системе Эло.
+
+После каждого матча рейтинги двух команд меняются на одну и ту же величину
+с разными знаками: delta = K · G · (результат − ожидание), где ожидание
+учитывает преимущество своего поля, а G растёт с разницей мячей.
+apply_matches() обновляет таблицы ratings и rating_history за O(1) на матч
+внутри транзакции save_match / Matchday.commit (матч задним числом — пересчёт
+с его даты, replay_since, а если истории для этого не хватает — полный пересчёт). ReplayPlan пересчитывает всю историю заново:
+матчи одного дня, в которых команды не пересекаются, обрабатываются
+одним векторным шагом NumPy.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 60.0  # в очках рейтинга
+
+
+class EloModel:
+    """Параметры модели Эло."""
+
+    def __init__(self, k: float = K_FACTOR, home_advantage: float = HOME_ADVANTAGE,
+                 initial: float = INITIAL_RATING, margin: bool = True):
+        if k <= 0:
+            raise ValueError("Коэффициент K должен быть положительным.")
+        self.k = k
+        self.home_advantage = home_advantage
+        self.initial = initial
+        self.margin = margin
+
+    def expected(self, rating_home: float, rating_away: float) -> float:
+        """Ожидаемый результат хозяев (от 0 до 1)."""
+        return 1.0 / (1.0 + 10 ** ((rating_away - rating_home - self.home_advantage) / 400.0))
+
+    def multiplier(self, goal_diff: int) -> float:
+        """Множитель за разницу мячей: 1, 1.5 при разнице 2, (11 + N) / 8 при N ≥ 3."""
+        n = abs(goal_diff)
+        if not self.margin or n <= 1:
+            return 1.0
+        return 1.5 if n == 2 else (11 + n) / 8
+
+    def delta(self, rating_home: float, rating_away: float, score_home: int, score_away: int) -> float:
+        """Изменение рейтинга хозяев (у гостей — то же с обратным знаком)."""
+        actual = 1.0 if score_home > score_away else 0.0 if score_home < score_away else 0.5
+        return self.k * self.multiplier(score_home - score_away) * (actual - self.expected(rating_home, rating_away))
+
+    def __repr__(self):
+        return (f"EloModel(k={self.k}, home_advantage={self.home_advantage}, "
+                f"initial={self.initial}, margin={self.margin})")
+
+
+DEFAULT_MODEL = EloModel()
+
+
+# === Таблицы ===
+def create_tables(cur):
+    """Текущие рейтинги и история изменений (по строке на команду в каждом матче)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ratings (
+            team TEXT PRIMARY KEY,
+            rating REAL NOT NULL,
+            matches INTEGER NOT NULL DEFAULT 0,
+            updated TEXT
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS rating_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER,
+            team TEXT NOT NULL,
+            date TEXT,
+            rating_before REAL NOT NULL,
+            rating_after REAL NOT NULL
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_rating_history_team ON rating_history (team, date);")
+
+
+def _apply_sequence(current: Dict[str, float], rows, model: EloModel):
+    """Последовательно применяет матчи к рейтингам current; возвращает (история, матчей, последняя дата)."""
+    played: Dict[str, int] = {}
+    updated: Dict[str, str] = {}
+    history = []
+    for match_id, team_a, team_b, score_a, score_b, date in rows:
+        before_a = current.get(team_a, model.initial)
+        before_b = current.get(team_b, model.initial)
+        delta = model.delta(before_a, before_b, score_a or 0, score_b or 0)
+        current[team_a], current[team_b] = before_a + delta, before_b - delta
+        history.append((match_id, team_a, date, before_a, before_a + delta))
+        history.append((match_id, team_b, date, before_b, before_b - delta))
+        for name in (team_a, team_b):
+            played[name] = played.get(name, 0) + 1
+            updated[name] = date
+    return history, played, updated
+
+
+def _insert_history(cur, history):
+    cur.executemany("""
+        INSERT INTO rating_history (match_id, team, date, rating_before, rating_after)
+        VALUES (?, ?, ?, ?, ?);
+    """, history)
+
+
+def apply_matches(cur, rows, model: EloModel = None, archived_until: str = None) -> Optional[str]:
+    """
+    Обновляет рейтинги по новым матчам (id, team_a, team_b, score_a, score_b, date) в переданном порядке.
+    Текущие рейтинги участников читаются одним запросом, записи — пакетно;
+    на каждый матч — O(1) работы. Вызывается внутри транзакции, которая сохраняет матчи.
+    Если новый матч старше последнего учтённого (запись задним числом), рейтинги
+    пересчитываются с его даты (replay_since) — как при полном пересчёте в порядке (date, id).
+    archived_until — конец последнего архивного сезона (его матчей нет в таблице matches).
+    Возвращает дату, с которой нужен полный пересчёт после фиксации (рейтинги не тронуты), или None.
+    """
+    if not rows:
+        return None
+    model = model or DEFAULT_MODEL
+    earliest = min(row[5] or "" for row in rows)
+    latest = cur.execute("SELECT MAX(updated) FROM ratings;").fetchone()[0]
+    if latest is not None and earliest < latest:
+        return None if replay_since(cur, earliest, model, archived_until) is not None else earliest
+
+    names = sorted({name for row in rows for name in (row[1], row[2])})
+    current: Dict[str, float] = {}
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        cur.execute(f"SELECT team, rating FROM ratings WHERE team IN ({','.join('?' * len(chunk))});", chunk)
+        current.update(cur.fetchall())
+
+    history, played, updated = _apply_sequence(current, rows, model)
+    cur.executemany("""
+        INSERT INTO ratings (team, rating, matches, updated) VALUES (?, ?, ?, ?)
+        ON CONFLICT (team) DO UPDATE SET
+            rating = excluded.rating,
+            matches = ratings.matches + excluded.matches,
+            updated = excluded.updated;
+    """, [(name, current[name], played[name], updated[name]) for name in played])
+    _insert_history(cur, history)
+    return None
+
+
+def replay_since(cur, since: str, model: EloModel = None, archived_until: str = None) -> Optional[int]:
+    """
+    Пересчитывает рейтинги матчей таблицы matches с даты since (включительно) в порядке (date, id):
+    рейтинги на начало since берутся из rating_history, её строки с этой даты пишутся заново.
+    Нужна полная история: если в rating_history не по строке на каждый учтённый матч
+    (пересчёт с history=False) или архив (archived_until) заканчивается позже since,
+    ничего не меняется и возвращается None — нужен полный пересчёт.
+    Возвращает количество пересчитанных матчей.
+    """
+    model = model or DEFAULT_MODEL
+    if archived_until is not None and archived_until > since:
+        return None
+    counted, recorded = cur.execute("""
+        SELECT (SELECT COALESCE(SUM(matches), 0) FROM ratings), (SELECT COUNT(*) FROM rating_history);
+    """).fetchone()
+    if counted != recorded:
+        return None
+    teams = [row[0] for row in cur.execute("SELECT team FROM ratings;").fetchall()]
+    current: Dict[str, float] = {}
+    for team in teams:
+        row = cur.execute("""
+            SELECT rating_after FROM rating_history
+            WHERE team = ? AND date < ?
+            ORDER BY date DESC, match_id DESC LIMIT 1;
+        """, (team, since)).fetchone()
+        if row is not None:
+            current[team] = row[0]
+    rows = cur.execute("""
+        SELECT id, team_a, team_b, score_a, score_b, date FROM matches
+        WHERE date >= ? ORDER BY date, id;
+    """, (since,)).fetchall()
+
+    # Матчи с since учитываются заново: из счётчика вычитаются их прежние строки истории
+    cur.execute("""
+        UPDATE ratings SET matches = matches - (
+            SELECT COUNT(*) FROM rating_history h WHERE h.team = ratings.team AND h.date >= ?);
+    """, (since,))
+    cur.execute("DELETE FROM rating_history WHERE date >= ?;", (since,))
+    history, played, updated = _apply_sequence(current, rows, model)
+    _insert_history(cur, history)
+    cur.executemany("""
+        INSERT INTO ratings (team, rating, matches, updated) VALUES (?, ?, ?, ?)
+        ON CONFLICT (team) DO UPDATE SET
+            rating = excluded.rating,
+            matches = ratings.matches + excluded.matches,
+            updated = excluded.updated;
+    """, [(name, current[name], played[name], updated[name]) for name in played])
+    return len(rows)
+
+
+# === Пересчёт всей истории ===
+class ReplayPlan:
+    """
+    Разбиение истории матчей на шаги для векторного пересчёта.
+    Строится один раз по строкам (id, team_a, team_b, score_a, score_b, date) в порядке (date, id);
+    run() можно вызывать много раз с разными параметрами модели.
+
+    Матчи одного дня попадают в один шаг, если команды в них не повторяются.
+    Если команда играет в день несколько раз, её матчи разносятся по разным шагам
+    в исходном порядке — результат совпадает с последовательным применением apply_matches.
+    """
+
+    def __init__(self, rows: Iterable[tuple]):
+        import numpy as np  # NumPy нужен только для пакетного пересчёта
+
+        ids, home, away, score_a, score_b, dates, days = [], [], [], [], [], [], []
+        self.index: Dict[str, int] = {}
+        for match_id, team_a, team_b, sa, sb, date in rows:
+            ids.append(match_id)
+            home.append(self.index.setdefault(team_a, len(self.index)))
+            away.append(self.index.setdefault(team_b, len(self.index)))
+            score_a.append(sa or 0)
+            score_b.append(sb or 0)
+            dates.append(date)
+            days.append((date or "")[:10])
+        self.teams: List[str] = list(self.index)
+
+        home = np.array(home, dtype=np.intp)
+        away = np.array(away, dtype=np.intp)
+        day = np.unique(np.array(days, dtype=str), return_inverse=True)[1].astype(np.int64).reshape(-1)
+        rounds = self._rounds(home, away, day)
+
+        # Стабильная сортировка по (день, шаг): внутри шага исходный порядок сохраняется
+        order = np.lexsort((np.arange(len(home)), rounds, day))
+        self.match_ids = np.array(ids, dtype=np.int64)[order]
+        self.dates = [dates[i] for i in order]
+        self.home, self.away = home[order], away[order]
+        self.score_a = np.array(score_a, dtype=np.int64)[order]
+        self.score_b = np.array(score_b, dtype=np.int64)[order]
+        keys = day[order] * (len(home) + 1) + rounds[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        edges = np.concatenate(([0], bounds, [len(keys)])) if len(keys) else np.zeros(1, dtype=np.int64)
+        self.steps: List[Tuple[int, int]] = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+    def _rounds(self, home, away, day):
+        """Номер шага внутри дня; ненулевой только в днях, где команда играет дважды."""
+        import numpy as np
+
+        rounds = np.zeros(len(home), dtype=np.int64)
+        if not len(home):
+            return rounds
+        n_teams = max(len(self.index), 1)
+        slots = np.concatenate((day * n_teams + home, day * n_teams + away))
+        slot_values, slot_counts = np.unique(slots, return_counts=True)
+        busy_days = np.unique(slot_values[slot_counts > 1] // n_teams)
+        # Редкий случай — жадно, по порядку матчей в таких днях
+        next_round: Dict[Tuple[int, int], int] = {}
+        for i in np.flatnonzero(np.isin(day, busy_days)).tolist():
+            h, a = (int(day[i]), int(home[i])), (int(day[i]), int(away[i]))
+            r = max(next_round.get(h, 0), next_round.get(a, 0))
+            rounds[i] = r
+            next_round[h] = next_round[a] = r + 1
+        return rounds
+
+    def run(self, model: EloModel = None):
+        """
+        Пересчитывает рейтинги. Возвращает (рейтинги по командам self.teams,
+        рейтинги хозяев до/после, рейтинги гостей до/после — по матчам в порядке плана).
+        """
+        import numpy as np
+
+        model = model or DEFAULT_MODEL
+        n = len(self.home)
+        ratings = np.full(len(self.teams), float(model.initial))
+        before_a, after_a, before_b, after_b = np.empty(n), np.empty(n), np.empty(n), np.empty(n)
+        diff = np.abs(self.score_a - self.score_b)
+        if model.margin:
+            multiplier = np.where(diff <= 1, 1.0, np.where(diff == 2, 1.5, (11 + diff) / 8))
+        else:
+            multiplier = np.ones(n)
+        actual = np.where(self.score_a > self.score_b, 1.0, np.where(self.score_a < self.score_b, 0.0, 0.5))
+        gain = model.k * multiplier
+
+        for start, stop in self.steps:
+            h, a = self.home[start:stop], self.away[start:stop]
+            ra, rb = ratings[h], ratings[a]
+            before_a[start:stop], before_b[start:stop] = ra, rb
+            expected = 1.0 / (1.0 + 10 ** ((rb - ra - model.home_advantage) / 400.0))
+            delta = gain[start:stop] * (actual[start:stop] - expected)
+            after_a[start:stop] = ratings[h] = ra + delta
+            after_b[start:stop] = ratings[a] = rb - delta
+        return ratings, before_a, after_a, before_b, after_b
+
+    def __len__(self):
+        return len(self.home)
+
+    def __repr__(self):
+        return f"ReplayPlan(matches={len(self.home)}, teams={len(self.teams)}, steps={len(self.steps)})"
+
+
+def write_replay(cur, plan: ReplayPlan, result, history: bool = True):
+    """Заменяет содержимое ratings (и rating_history) результатом plan.run()."""
+    ratings, before_a, after_a, before_b, after_b = result
+    home, away = plan.home.tolist(), plan.away.tolist()
+    played: Dict[int, int] = {}
+    last: Dict[int, str] = {}
+    for i, date in enumerate(plan.dates):
+        for t in (home[i], away[i]):
+            played[t] = played.get(t, 0) + 1
+            last[t] = date
+    cur.execute("DELETE FROM ratings;")
+    cur.executemany("INSERT INTO ratings (team, rating, matches, updated) VALUES (?, ?, ?, ?);",
+                    [(name, float(ratings[i]), played.get(i, 0), last.get(i))
+                     for i, name in enumerate(plan.teams)])
+    cur.execute("DELETE FROM rating_history;")
+    if not history:
+        return
+    teams, ids = plan.teams, plan.match_ids.tolist()
+    ba, aa, bb, ab = before_a.tolist(), after_a.tolist(), before_b.tolist(), after_b.tolist()
+    cur.executemany("""
+        INSERT INTO rating_history (match_id, team, date, rating_before, rating_after)
+        VALUES (?, ?, ?, ?, ?);
+    """, ((ids[i], teams[side[i]], plan.dates[i], before[i], after[i])
+          for i in range(len(ids))
+          for side, before, after in ((home, ba, aa), (away, bb, ab))))
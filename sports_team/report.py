@@ -1,16 +1,99 @@
 ﻿# sports_team/report.py
+import hashlib
+import json
 import os
-from docx import Document
+from typing import Iterable
 from sports_team.team import Team
 from sports_team.db import get_team_match_stats
 from sports_team.utils import timed
+from sports_team.profiling import profiled
 
+REPORT_DIR = os.path.join(os.path.dirname(__file__), "..", "report")
+# Увеличивается при изменении оформления отчёта — старые отчёты пересоздаются
+REPORT_VERSION = 1
+# Отпечаток данных отчёта хранится рядом с ним: report_X.docx -> report_X.docx.sha1
+FINGERPRINT_SUFFIX = ".sha1"
+
+
+class ReportCache:
+    """
+    Пропуск неизменившихся отчётов: отпечаток входных данных (состав, статистика
+    игроков и матчей команды) сравнивается с сохранённым рядом с файлом.
+    """
+
+    def __init__(self):
+        self.hits = 0    # отчёт актуален, не пересоздавался
+        self.misses = 0  # отчёт создан заново
+
+    @staticmethod
+    def fingerprint(team: Team, stats: dict) -> str:
+        """SHA-1 от данных, из которых строится отчёт."""
+        data = [
+            REPORT_VERSION,
+            team.name,
+            [[type(p).__name__, p.name, p.number, p.position, p.games, p.goals, p.assists]
+             for p in team.players],
+            stats,
+        ]
+        return hashlib.sha1(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_fresh(filepath: str, fingerprint: str) -> bool:
+        """Есть ли отчёт, построенный по данным с таким отпечатком."""
+        if not os.path.exists(filepath):
+            return False
+        try:
+            with open(filepath + FINGERPRINT_SUFFIX, encoding="utf-8") as f:
+                return f.read().strip() == fingerprint
+        except OSError:
+            return False
+
+    @staticmethod
+    def invalidate(filepath: str):
+        """Удаляет отпечаток (перед перезаписью отчёта: прерванная запись не сочтётся актуальной)."""
+        try:
+            os.remove(filepath + FINGERPRINT_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def store(filepath: str, fingerprint: str):
+        with open(filepath + FINGERPRINT_SUFFIX, "w", encoding="utf-8") as f:
+            f.write(fingerprint)
+
+    def info(self) -> dict:
+        """Статистика: сколько отчётов пропущено и сколько создано."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def reset(self):
+        self.hits = self.misses = 0
+
+
+report_cache = ReportCache()
+
+
+@profiled
 @timed
-def save_team_report_docx(team: Team, filename: str):
-    """Создаёт отчёт о команде и сохраняет его в формате .docx"""
-    report_dir = os.path.join(os.path.dirname(__file__), "..", "report")
-    os.makedirs(report_dir, exist_ok=True)
-    filepath = os.path.abspath(os.path.join(report_dir, filename))
+def save_team_report_docx(team: Team, filename: str, force: bool = False, open_file: bool = True) -> bool:
+    """
+    Создаёт отчёт о команде и сохраняет его в формате .docx.
+    Если данные команды не изменились с прошлого отчёта, файл не пересоздаётся
+    (force=True — пересоздать всё равно). Возвращает True, если отчёт записан.
+    """
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    filepath = os.path.abspath(os.path.join(REPORT_DIR, filename))
+
+    stats = get_team_match_stats(team.name)
+    fingerprint = report_cache.fingerprint(team, stats)
+    if not force and report_cache.is_fresh(filepath, fingerprint):
+        report_cache.hits += 1
+        print(f"Отчёт не изменился: {filepath}")
+        return False
+    report_cache.misses += 1
+    report_cache.invalidate(filepath)
+
+    # python-docx (с lxml) импортируется только при создании отчёта — не замедляет запуск меню
+    from docx import Document
 
     doc = Document()
     doc.add_heading(f"Отчёт о команде: {team.name}", level=1)
@@ -19,14 +102,13 @@ def save_team_report_docx(team: Team, filename: str):
     total_goals = team.total_goals()
     total_games = getattr(team, "total_games", lambda: 0)()
     player_count = len(team.players)
-    
+
     doc.add_paragraph(f"Количество игроков: {player_count}")
     doc.add_paragraph(f"Общие голы: {total_goals}")
-    
-  
+
+
     # --- Статистика матчей ---
     doc.add_heading("Статистика матчей", level=2)
-    stats = get_team_match_stats(team.name)
     doc.add_paragraph(f"Сыграно матчей: {stats['Матчи']}")
     doc.add_paragraph(f"Побед: {stats['Победы']}")
     doc.add_paragraph(f"Поражений: {stats['Поражения']}")
@@ -60,8 +142,27 @@ def save_team_report_docx(team: Team, filename: str):
 
     # --- Сохранение и открытие ---
     doc.save(filepath)
+    report_cache.store(filepath, fingerprint)
     print(f"Отчёт сохранён: {filepath}")
-    try:
-        os.startfile(filepath)
-    except Exception:
-        pass
+    if open_file:
+        try:
+            os.startfile(filepath)
+        except Exception:
+            pass
+    return True
+
+
+def report_filename(team: Team) -> str:
+    return f"report_{team.name.replace(' ', '_')}.docx"
+
+
+@profiled
+def save_all_reports(teams: Iterable[Team], force: bool = False) -> dict:
+    """
+    Отчёты по всем командам (например, ночная перегенерация): пересоздаются
+    только отчёты изменившихся команд. Возвращает {"hits": …, "misses": …} за этот вызов.
+    """
+    hits, misses = report_cache.hits, report_cache.misses
+    for team in teams:
+        save_team_report_docx(team, report_filename(team), force=force, open_file=False)
+    return {"hits": report_cache.hits - hits, "misses": report_cache.misses - misses}
@@ -0,0 +1,278 @@
+﻿# sports_team/schedule.py
+"""
+Календарь двухкругового турнира (метод круга).
+
+Все туры строятся сразу массивами NumPy: в туре r пара i — это команды
+(r + i) mod (N − 1) и (r − i) mod (N − 1), команда N − 1 неподвижна.
+Хозяин пары чередуется по номеру пары (у неподвижной команды — по номеру тура);
+второй круг — зеркальное отражение первого, сдвинутое на один тур, поэтому
+серии "дома"/"в гостях" не длиннее двух матчей и нет повторной встречи подряд.
+При нечётном N добавляется фиктивная команда, её матчи — выходные дни.
+
+Ограничения (Constraints) проверяются индексами, без попарного перебора матчей:
+даты туров пропускают запретные дни, матч, попавший на запретный день одной из
+команд, сдвигается в пределах тура, отдых и серии проверяются по матчам,
+отсортированным по (команда, день).
+
+    schedule = round_robin(teams, start=date(2024, 8, 3))
+    db.save_fixtures(schedule.rows(season="2024-2025"))
+    matches = list(schedule.matches(teams_by_name))
+"""
+from datetime import date, datetime, time, timedelta
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Sequence, Set
+
+import numpy as np
+
+from sports_team.match import Match
+
+
+class Fixture(NamedTuple):
+    """Запланированный матч: team_a — хозяева, team_b — гости."""
+    division: str
+    round: int
+    date: datetime
+    team_a: str
+    team_b: str
+
+
+class Constraints:
+    """
+    Ограничения календаря.
+    interval — дней между турами; min_rest — минимум полных дней отдыха между матчами команды;
+    max_streak — самая длинная допустимая серия матчей дома (или в гостях);
+    blackout_dates — дни без матчей; team_blackouts — {команда: дни, когда она играть не может}.
+    """
+
+    def __init__(self, interval: int = 7, min_rest: int = 2, max_streak: int = 2,
+                 blackout_dates: Iterable[date] = (), team_blackouts: Dict[str, Iterable[date]] = None):
+        if interval <= min_rest:
+            raise ValueError("Интервал между турами должен быть больше минимального отдыха.")
+        if min_rest < 0 or max_streak < 1:
+            raise ValueError("Некорректные ограничения календаря.")
+        self.interval = interval
+        self.min_rest = min_rest
+        self.max_streak = max_streak
+        self.blackout_dates: Set[date] = set(blackout_dates)
+        self.team_blackouts: Dict[str, Set[date]] = {team: set(days) for team, days in (team_blackouts or {}).items()}
+
+    @property
+    def max_shift(self) -> int:
+        """На сколько дней можно сдвинуть матч внутри тура, не нарушая отдых до следующего тура."""
+        return self.interval - self.min_rest - 1
+
+
+def _days(dates: Iterable[date]) -> np.ndarray:
+    return np.array(sorted(dates), dtype="datetime64[D]")
+
+
+def circle_pairs(n: int):
+    """
+    Пары двухкругового турнира для n (чётного) участников: массивы хозяев и гостей
+    формы (2·(n − 1), n / 2) — по строке на тур.
+    """
+    if n < 2 or n % 2:
+        raise ValueError("Нужно чётное число участников (не меньше двух).")
+    m = n - 1
+    r = np.arange(m)[:, None]
+    i = np.arange(n // 2)[None, :]
+    a = (r + i) % m
+    b = np.where(i == 0, m, (r - i) % m)
+    swap = np.where(i == 0, r % 2 == 1, i % 2 == 1)
+    home, away = np.where(swap, b, a), np.where(swap, a, b)
+    # Второй круг: те же пары с обменом полей, начиная со второго тура первого круга
+    return (np.concatenate((home, np.roll(away, -1, axis=0))),
+            np.concatenate((away, np.roll(home, -1, axis=0))))
+
+
+class Schedule:
+    """Календарь: массивы по матчам (тур, день, хозяева, гости — номера в teams)."""
+
+    def __init__(self, teams: Sequence[str], rounds, days, home, away, divisions=None,
+                 division_names: Sequence[str] = ("",), kickoff: time = time(18, 0)):
+        self.teams = list(teams)
+        self.rounds = np.asarray(rounds, dtype=np.int32)
+        self.days = np.asarray(days, dtype="datetime64[D]")
+        self.home = np.asarray(home, dtype=np.int32)
+        self.away = np.asarray(away, dtype=np.int32)
+        self.divisions = (np.zeros(len(self.home), dtype=np.int32) if divisions is None
+                          else np.asarray(divisions, dtype=np.int32))
+        self.division_names = list(division_names)
+        self.kickoff = kickoff
+
+    def __len__(self):
+        return len(self.home)
+
+    def __repr__(self):
+        return f"Schedule(teams={len(self.teams)}, fixtures={len(self)}, rounds={int(self.rounds.max(initial=-1)) + 1})"
+
+    def _day_index(self, convert):
+        """convert(день) для каждого матча: значение считается один раз на уникальный день."""
+        unique, inverse = np.unique(self.days, return_inverse=True)
+        values = [convert(datetime.combine(d, self.kickoff)) for d in unique.astype(object)]
+        return map(values.__getitem__, inverse.reshape(-1).tolist())
+
+    def _columns(self, dates):
+        return (map(self.division_names.__getitem__, self.divisions.tolist()), self.rounds.tolist(), dates,
+                map(self.teams.__getitem__, self.home.tolist()), map(self.teams.__getitem__, self.away.tolist()))
+
+    def fixtures(self) -> Iterator[Fixture]:
+        return map(Fixture._make, zip(*self._columns(self._day_index(lambda d: d))))
+
+    def rows(self, season: str = None) -> Iterator[tuple]:
+        """Строки для db.save_fixtures: (сезон, дивизион, тур, дата, хозяева, гости)."""
+        dates = self._day_index(lambda d: d.strftime("%Y-%m-%d %H:%M:%S"))
+        return zip(repeat(season), *self._columns(dates))
+
+    def matches(self, teams: Dict[str, object]) -> Iterator[Match]:
+        """Объекты Match по календарю; teams — команды Team по названию."""
+        for f in self.fixtures():
+            yield Match(teams[f.team_a], teams[f.team_b], f.date)
+
+    def team_fixtures(self, team: str) -> List[Fixture]:
+        """Матчи одной команды в порядке дат."""
+        idx = self.teams.index(team)
+        mask = (self.home == idx) | (self.away == idx)
+        order = np.flatnonzero(mask)[np.argsort(self.days[mask], kind="stable")]
+        names, divisions = self.teams, self.division_names
+        return [Fixture(divisions[self.divisions[k]], int(self.rounds[k]),
+                        datetime.combine(self.days[k].astype(object), self.kickoff),
+                        names[self.home[k]], names[self.away[k]]) for k in order.tolist()]
+
+    def violations(self, constraints: Constraints, limit: int = 20) -> List[str]:
+        """Нарушения ограничений (не больше limit описаний); пустой список — календарь корректен."""
+        found: List[str] = []
+        names = self.teams
+
+        # Запретные дни: поиск в отсортированных массивах
+        if constraints.blackout_dates:
+            for k in np.flatnonzero(np.isin(self.days, _days(constraints.blackout_dates)))[:limit].tolist():
+                found.append(f"Матч {names[self.home[k]]} – {names[self.away[k]]} в запретный день {self.days[k]}")
+        blocked = self._team_blocked(constraints)
+        for k in np.flatnonzero(blocked)[:limit].tolist():
+            found.append(f"Матч {names[self.home[k]]} – {names[self.away[k]]} {self.days[k]}: "
+                         f"день недоступен одной из команд")
+
+        # Отдых и серии: все выступления, отсортированные по (команда, день)
+        team = np.concatenate((self.home, self.away))
+        day = np.concatenate((self.days, self.days)).astype(np.int64)
+        venue = np.concatenate((np.ones(len(self), np.int8), np.zeros(len(self), np.int8)))
+        order = np.lexsort((day, team))
+        team, day, venue = team[order], day[order], venue[order]
+        same_team = team[1:] == team[:-1]
+        short = np.flatnonzero(same_team & (np.diff(day) <= constraints.min_rest))
+        for k in short[:limit].tolist():
+            found.append(f"{names[team[k]]}: меньше {constraints.min_rest} дн. отдыха "
+                         f"между {np.datetime64(int(day[k]), 'D')} и {np.datetime64(int(day[k + 1]), 'D')}")
+        # Серия начинается там, где сменилась команда или поле; длина — расстояние до следующего начала
+        starts = np.flatnonzero(np.concatenate(([True], ~same_team | (venue[1:] != venue[:-1]))))
+        lengths = np.diff(np.append(starts, len(team)))
+        for k in np.flatnonzero(lengths > constraints.max_streak)[:limit].tolist():
+            found.append(f"{names[team[starts[k]]]}: {lengths[k]} матча подряд "
+                         f"{'дома' if venue[starts[k]] else 'в гостях'}")
+
+        # Баланс дома/в гостях по каждой команде
+        n = len(names)
+        diff = np.bincount(self.home, minlength=n) - np.bincount(self.away, minlength=n)
+        for k in np.flatnonzero(np.abs(diff) > 1)[:limit].tolist():
+            found.append(f"{names[k]}: разница матчей дома и в гостях {int(diff[k])}")
+        return found[:limit]
+
+    def _team_blocked(self, constraints: Constraints) -> np.ndarray:
+        """Матчи, попавшие на день, недоступный хозяевам или гостям (поиск ключей команда×день)."""
+        if not constraints.team_blackouts:
+            return np.zeros(len(self), dtype=bool)
+        index = {name: k for k, name in enumerate(self.teams)}
+        keys = [index[team] * _DAY_SPAN + int(d)
+                for team, days in constraints.team_blackouts.items() if team in index
+                for d in _days(days).astype(np.int64)]
+        keys = np.unique(np.array(keys, dtype=np.int64))
+        days = self.days.astype(np.int64)
+        return (np.isin(self.home.astype(np.int64) * _DAY_SPAN + days, keys) |
+                np.isin(self.away.astype(np.int64) * _DAY_SPAN + days, keys))
+
+
+# Ключ "команда × день": номер дня от 1970-01-01 заведомо меньше _DAY_SPAN
+_DAY_SPAN = 1 << 20
+
+
+def _round_days(n_rounds: int, start: date, constraints: Constraints) -> np.ndarray:
+    """Дни туров: не раньше чем через interval дней после предыдущего тура и не в запретный день."""
+    days = []
+    current = start
+    for _ in range(n_rounds):
+        while current in constraints.blackout_dates:
+            current += timedelta(days=1)
+        days.append(current)
+        current += timedelta(days=constraints.interval)
+    return np.array(days, dtype="datetime64[D]")
+
+
+def _shift_blocked(schedule: Schedule, constraints: Constraints):
+    """
+    Сдвигает матчи, попавшие на недоступный команде день, на ближайший
+    допустимый день того же тура (не дальше constraints.max_shift дней).
+    """
+    blocked = schedule._team_blocked(constraints)
+    if not blocked.any():
+        return
+    unavailable = {name: constraints.team_blackouts.get(name, set()) for name in schedule.teams}
+    for k in np.flatnonzero(blocked).tolist():
+        home, away = schedule.teams[schedule.home[k]], schedule.teams[schedule.away[k]]
+        base = schedule.days[k].astype(object)
+        for shift in range(1, constraints.max_shift + 1):
+            day = base + timedelta(days=shift)
+            if day not in constraints.blackout_dates and day not in unavailable[home] \
+                    and day not in unavailable[away]:
+                schedule.days[k] = np.datetime64(day, "D")
+                break
+        else:
+            raise ValueError(f"Матч {home} – {away} ({base}) некуда перенести: "
+                             f"все дни тура недоступны одной из команд.")
+
+
+def round_robin(teams: Sequence[str], start: date, constraints: Constraints = None,
+                division: str = "", kickoff: time = time(18, 0), check: bool = True) -> Schedule:
+    """
+    Двухкруговой турнир для команд teams (названия) начиная с даты start.
+    Если после расстановки ограничения нарушены и check=True — ValueError.
+    """
+    return schedule_divisions({division: teams}, start, constraints, kickoff, check)
+
+
+def schedule_divisions(divisions: Dict[str, Sequence[str]], start: date,
+                       constraints: Constraints = None, kickoff: time = time(18, 0),
+                       check: bool = True) -> Schedule:
+    """Календари нескольких дивизионов на общих датах туров (каждый дивизион — свой двухкруговой турнир)."""
+    constraints = constraints or Constraints()
+    names: List[str] = []
+    parts = []
+    max_rounds = 0
+    for div_index, (division, teams) in enumerate(divisions.items()):
+        teams = list(teams)
+        if len(set(teams)) != len(teams) or len(teams) < 2:
+            raise ValueError(f"Дивизион '{division}': нужно не меньше двух разных команд.")
+        offset = len(names)
+        names.extend(teams)
+        n = len(teams) + len(teams) % 2  # нечётное число — фиктивная команда с номером len(teams)
+        home, away = circle_pairs(n)
+        rounds = np.broadcast_to(np.arange(home.shape[0])[:, None], home.shape)
+        real = (home < len(teams)) & (away < len(teams))
+        parts.append((home[real] + offset, away[real] + offset, rounds[real],
+                      np.full(int(real.sum()), div_index)))
+        max_rounds = max(max_rounds, home.shape[0])
+    if len(set(names)) != len(names):
+        raise ValueError("Команда не может играть в двух дивизионах.")
+
+    home, away, rounds, div = (np.concatenate(column) for column in zip(*parts))
+    round_days = _round_days(max_rounds, start, constraints)
+    # Внутри тура — по дивизиону и номеру пары: порядок вставки совпадает с порядком в календаре
+    order = np.lexsort((div, rounds))
+    schedule = Schedule(names, rounds[order], round_days[rounds[order]], home[order], away[order],
+                        div[order], list(divisions), kickoff)
+    _shift_blocked(schedule, constraints)
+    if check:
+        problems = schedule.violations(constraints)
+        if problems:
+            raise ValueError("Календарь нарушает ограничения:\n" + "\n".join(problems))
+    return schedule
@@ -0,0 +1,248 @@
+﻿# sports_team/search.py
+"""
+Поиск игроков по имени во всей лиге.
+
+Префиксный поиск — двоичным поиском по двум отсортированным массивам ключей:
+полных имён и слов имени. Полные имена просматриваются первыми, поэтому
+совпадения перебираются по убыванию оценки и перебор останавливается на limit.
+Нечёткий поиск (опечатки) идёт по словарю слов имён. Сначала слова на расстоянии
+одной правки (замена, вставка, удаление буквы) ищутся по индексу удалений: слово
+и все его варианты без одной буквы; так проверяется только несколько ключей.
+Если для слова запроса ничего не нашлось, используется индекс триграмм: слова
+с достаточной долей общих триграмм. Кандидаты берутся у самого редкого слова
+запроса. Индекс лиги —
+League.index (Team.add_player(player, index=...)); новые ключи досортировываются
+лениво, при следующем запросе.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from math import ceil
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, NamedTuple
+
+# Оценки совпадений: точное имя > префикс полного имени > префикс слова > нечёткое (≤ 1)
+_EXACT, _PREFIX, _WORD_PREFIX = 4.0, 3.0, 2.0
+# Минимальная доля триграмм запроса, которая должна найтись в имени
+MIN_SIMILARITY = 0.5
+# До такого числа новых ключей вставляются по одному (insort), больше — полная пересортировка
+_INSORT_LIMIT = 64
+_EMPTY = array("I")
+
+
+def normalize(name: str) -> str:
+    """Ключ поиска: нижний регистр, ё → е, одиночные пробелы."""
+    return " ".join(name.lower().replace("ё", "е").split())
+
+
+def deletions(word: str) -> set:
+    """Слово и все его варианты без одной буквы (ключи индекса удалений)."""
+    return {word, *(word[:i] + word[i + 1:] for i in range(len(word)))}
+
+
+def trigrams(key: str) -> set:
+    """Триграммы ключа с пробелами по краям (учитывают начало и конец имени)."""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchResult(NamedTuple):
+    """Найденный игрок, его команда и оценка совпадения."""
+    player: object
+    team: object
+    score: float
+
+
+class _SortedKeys:
+    """Отсортированные ключи с номерами записей; новые ключи досортировываются лениво."""
+
+    __slots__ = ("keys", "ids", "pending")
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.ids = array("I")  # номер записи для каждого ключа
+        self.pending = []      # (ключ, номер) ещё не в отсортированном массиве
+
+    def sort(self):
+        pending, self.pending = self.pending, []
+        if len(pending) <= _INSORT_LIMIT:
+            for key, entry in pending:
+                pos = bisect_left(self.keys, key)
+                self.keys.insert(pos, key)
+                self.ids.insert(pos, entry)
+            return
+        pairs = list(zip(self.keys, self.ids))
+        pairs.extend(pending)
+        pairs.sort()  # timsort: уже отсортированная часть + новая — почти линейно
+        self.keys = [key for key, _ in pairs]
+        self.ids = array("I", (entry for _, entry in pairs))
+
+    def prefixed(self, query: str) -> Iterator[tuple]:
+        """(ключ, номер записи) для ключей, начинающихся с query, в порядке ключей."""
+        keys, ids = self.keys, self.ids
+        pos = bisect_left(keys, query)
+        while pos < len(keys) and keys[pos].startswith(query):
+            yield keys[pos], ids[pos]
+            pos += 1
+
+
+class PlayerIndex:
+    """Индекс имён игроков для префиксного и нечёткого поиска."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    @classmethod
+    def from_teams(cls, teams: Iterable):
+        """Индекс по игрокам указанных команд."""
+        index = cls()
+        for team in teams:
+            index.add_team(team)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._players, self._teams = [], []
+            self._norm: List[str] = []
+            self._names = _SortedKeys()   # полные имена
+            self._words = _SortedKeys()   # слова имени, кроме первого (его префикс — префикс имени)
+            # Словарь различных слов имён: триграммы строятся по словам, а не по игрокам,
+            # поэтому тысячи однофамильцев занимают в индексе триграмм одну запись
+            self._word_ids: Dict[str, int] = {}
+            self._word_names: List[str] = []
+            self._word_grams = array("H")  # число триграмм слова
+            self._word_players: List[array] = []
+            self._grams: Dict[str, array] = {}
+            self._deletes: Dict[str, array] = {}  # вариант без одной буквы -> слова
+
+    def add(self, player, team=None) -> int:
+        """Добавляет игрока (O(длина имени)); возвращает номер записи."""
+        key = normalize(player.name)
+        words = key.split(" ")
+        with self._lock:
+            entry = len(self._players)
+            self._players.append(player)
+            self._teams.append(team)
+            self._norm.append(key)
+            self._names.pending.append((key, entry))
+            if len(words) > 1:
+                self._words.pending.extend((word, entry) for word in words[1:])
+            for word in set(words):
+                word_id = self._word_ids.get(word)
+                if word_id is None:
+                    word_id = self._word_ids[word] = len(self._word_players)
+                    self._word_names.append(word)
+                    self._word_players.append(array("I"))
+                    grams = trigrams(word)
+                    self._word_grams.append(len(grams))
+                    for index, keys in ((self._grams, grams), (self._deletes, deletions(word))):
+                        for key in keys:
+                            postings = index.get(key)
+                            if postings is None:
+                                postings = index[key] = array("I")
+                            postings.append(word_id)
+                self._word_players[word_id].append(entry)
+        return entry
+
+    def add_team(self, team):
+        """Добавляет всех игроков команды."""
+        for player in team.players:
+            self.add(player, team)
+
+    def rebuild(self, teams: Iterable):
+        """Строит индекс заново по командам (например, после загрузки состояния)."""
+        self.clear()
+        for team in teams:
+            self.add_team(team)
+
+    def _prefix(self, query: str, limit: int, found: Dict[int, float]):
+        """
+        Префиксные совпадения, не больше limit записей. Точные имена стоят в начале диапазона
+        полных имён, слова имени проверяются последними — перебор идёт по убыванию оценки.
+        """
+        for key, entry in self._names.prefixed(query):
+            if len(found) >= limit:
+                return
+            found[entry] = _EXACT if key == query else _PREFIX
+        for _, entry in self._words.prefixed(query):
+            if len(found) >= limit:
+                return
+            found.setdefault(entry, _WORD_PREFIX)
+
+    def _similar_words(self, word: str) -> Dict[int, float]:
+        """
+        Слова словаря, похожие на слово запроса: на расстоянии одной правки (индекс удалений),
+        а если таких нет — содержащие не меньше MIN_SIMILARITY его триграмм.
+        """
+        query_grams = trigrams(word)
+        need = max(1, ceil(len(query_grams) * MIN_SIMILARITY))
+        close = set()
+        for key in deletions(word):
+            close.update(self._deletes.get(key, _EMPTY))
+        # Слово на расстоянии одной правки — опечатка, даже если у короткого слова
+        # совпала лишь малая доля триграмм
+        counts = {w: max(len(query_grams & trigrams(self._word_names[w])), need) for w in close}
+        if not counts:
+            counts = Counter()
+            for gram in query_grams:
+                counts.update(self._grams.get(gram, _EMPTY))
+        sizes = self._word_grams
+        total = len(query_grams)
+        # Доля найденных триграмм запроса; при равенстве выше — более близкие по длине слова
+        return {w: c / total + c / (total + sizes[w] - c) * 1e-3
+                for w, c in counts.items() if c >= need}
+
+    def _fuzzy(self, query: str, limit: int, found: Dict[int, float]):
+        """Совпадения с опечатками: каждое слово запроса сравнивается со словарём слов имён."""
+        words = [w for w in query.split(" ") if len(w) >= 3]
+        if not words:
+            return
+        similar = [self._similar_words(w) for w in words]
+        # Кандидаты — игроки самого редкого из найденных слов, остальные слова только проверяются
+        anchor = min(range(len(words)),
+                     key=lambda i: sum(len(self._word_players[w]) for w in similar[i]))
+        candidates = []
+        for word_id, _ in sorted(similar[anchor].items(), key=itemgetter(1), reverse=True):
+            candidates.extend(self._word_players[word_id])
+            if len(candidates) >= limit * 10:
+                break
+        scored = []
+        for entry in set(candidates):
+            if entry in found:
+                continue
+            name_words = [self._word_ids[w] for w in self._norm[entry].split(" ")]
+            score = sum(max((sim.get(w, 0.0) for w in name_words), default=0.0)
+                        for sim in similar) / len(words)
+            if score >= MIN_SIMILARITY:
+                scored.append((score, entry))
+        for score, entry in nlargest(limit, scored):
+            found[entry] = min(score, 1.0)
+
+    def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+        """
+        Игроки, чьё имя (или одно из слов имени) начинается с query, по убыванию оценки.
+        Если таких нет — игроки с похожими именами (опечатки).
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        found: Dict[int, float] = {}
+        with self._lock:
+            for keys in (self._names, self._words):
+                if keys.pending:
+                    keys.sort()
+            self._prefix(query, limit, found)
+            if not found:  # по началу имени никого нет — вероятно, опечатка
+                self._fuzzy(query, limit, found)
+            best = sorted(found.items(), key=lambda item: (-item[1], self._norm[item[0]]))[:limit]
+            return [SearchResult(self._players[e], self._teams[e], score) for e, score in best]
+
+    def __len__(self):
+        return len(self._players)
+
+    def __repr__(self):
+        return f"PlayerIndex(players={len(self._players)}, words={len(self._word_players)})"
+
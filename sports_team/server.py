@@ -0,0 +1,207 @@
+﻿# sports_team/server.py
+"""
+Локальный HTTP/JSON-сервис только для чтения.
+
+Эндпоинты:
+    GET /standings[?season=2024-2025]              — турнирная таблица
+    GET /teams/<команда>/stats                      — статистика матчей команды
+    GET /teams/<команда>/matches[?since=&until=&limit=] — матчи команды, новые первыми
+    GET /leaders[?period=season|month&value=&stat=goals&limit=10] — лидеры периода
+
+Ответы кэшируются в памяти по пути и параметрам запроса. Каждая запись помнит
+PRAGMA data_version, при которой она посчитана: после любой фиксации в БД
+запись пересчитывается. ETag — хэш тела ответа, на If-None-Match отвечаем 304.
+
+Запуск:
+    python -m sports_team.server [--host 127.0.0.1] [--port 8000] [--workers 8]
+"""
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from sports_team import db
+from sports_team.cache import LRUCache
+from sports_team.profiling import enable_from_env
+
+
+class NotFound(Exception):
+    """Неизвестный путь."""
+
+
+def _param(query, name, default=None, cast=str):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return cast(values[0])
+    except ValueError:
+        raise ValueError(f"Некорректное значение параметра {name}: {values[0]!r}")
+
+
+def _standings(query):
+    return db.get_standings(_param(query, "season"))
+
+
+def _team_stats(query, team):
+    return {"Команда": team, **db.get_team_match_stats(team)}
+
+
+def _team_matches(query, team):
+    rows = db.load_team_matches_range(team, _param(query, "since"), _param(query, "until"),
+                                      _param(query, "limit", cast=int))
+    return [{"Хозяева": a, "Гости": b, "Счёт": f"{sa}:{sb}", "Дата": date}
+            for a, b, sa, sb, date in rows]
+
+
+def _leaders(query):
+    period = _param(query, "period", "season")
+    value = _param(query, "value")
+    if value is None:
+        value = db.current_season() if period == "season" else datetime.now().strftime("%Y-%m")
+    return db.get_period_leaders(value, _param(query, "stat", "goals"), period,
+                                 _param(query, "limit", 10, int))
+
+
+def route(path, query):
+    """Выполняет запрос к БД по пути и параметрам; возвращает данные для JSON."""
+    parts = [unquote(p) for p in path.strip("/").split("/") if p]
+    if parts == ["standings"]:
+        return _standings(query)
+    if parts == ["leaders"]:
+        return _leaders(query)
+    if len(parts) == 3 and parts[0] == "teams" and parts[2] == "stats":
+        return _team_stats(query, parts[1])
+    if len(parts) == 3 and parts[0] == "teams" and parts[2] == "matches":
+        return _team_matches(query, parts[1])
+    raise NotFound(path)
+
+
+class ResponseCache:
+    """
+    Готовые ответы (тело и ETag) по ключу запроса.
+    Запись действительна, пока не изменилась data_version БД.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, key):
+        """Возвращает (body, etag): из кэша или заново посчитанные."""
+        version = db.data_version()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        path, query = key
+        body = json.dumps(route(path, parse_qs(query)), ensure_ascii=False).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self._cache.set(key, (version, body, etag))
+        return body, etag
+
+    def info(self) -> dict:
+        return self._cache.info()
+
+    def clear(self):
+        self._cache.clear()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Обработчик GET-запросов; кэш ответов — в атрибуте сервера."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive для дашбордов и нагрузочного теста
+    timeout = 15  # простаивающее соединение не держит поток пула дольше этого
+    # Заголовки и тело уходят отдельными записями: без TCP_NODELAY ответ
+    # ждёт отложенного ACK клиента (~40 мс на запрос при keep-alive)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        # Порядок параметров не влияет на ключ кэша
+        query = "&".join(sorted(url.query.split("&"))) if url.query else ""
+        try:
+            body, etag = self.server.responses.get((url.path, query))
+        except NotFound:
+            return self._send_json(404, {"Ошибка": f"Неизвестный путь: {url.path}"})
+        except ValueError as e:
+            return self._send_json(400, {"Ошибка": str(e)})
+        except Exception as e:
+            return self._send_json(500, {"Ошибка": str(e)})
+
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # журнал каждого запроса не нужен
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """HTTPServer, обрабатывающий соединения в пуле потоков фиксированного размера."""
+
+    def __init__(self, address, handler=QueryHandler, workers: int = 8, cache_size: int = 1024):
+        super().__init__(address, handler)
+        self.responses = ResponseCache(cache_size)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sports-http")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = 8):
+    """Запускает сервис и обслуживает запросы до Ctrl+C."""
+    db.init_db()
+    server = ThreadPoolHTTPServer((host, port), workers=workers)
+    print(f"Сервис запущен: http://{host}:{server.server_port}/standings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON-сервис статистики (только чтение).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    enable_from_env()
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
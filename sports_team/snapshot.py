@@ -0,0 +1,367 @@
+﻿# sports_team/snapshot.py
+"""
+Бинарный снимок лиги (замена teams.pkl).
+
+Формат (little-endian, версия SNAPSHOT_VERSION):
+    заголовок  — сигнатура, версия, количества записей и смещения секций;
+    команды    — записи фиксированной длины TEAM, отсортированы по ключу (название в нижнем регистре);
+    игроки     — записи фиксированной длины PLAYER, игроки команды лежат подряд;
+    результаты — записи фиксированной длины RECORD из журнала команды, тоже подряд;
+    строки     — таблица строк UTF-8, записи ссылаются на неё парой (смещение, длина).
+
+Файл открывается через mmap и читается без копирования: TeamView / PlayerView
+создаются лениво и достают поля прямо из буфера. В отличие от pickle, при чтении
+не исполняется никакой код из файла.
+"""
+import mmap
+import os
+import pickle
+import struct
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+from sports_team.player import Player, Forward, Defender, Goalkeeper
+from sports_team.team import Team
+from sports_team.ledger import MatchLedger, MatchRecord
+
+MAGIC = b"STSNAP\x00\x00"
+SNAPSHOT_VERSION = 1
+
+HEADER = struct.Struct("<8sHHIII5Q")
+TEAM = struct.Struct("<8I")          # name(off, len), key(off, len), first_player, players, first_record, records
+PLAYER = struct.Struct("<4IiB3x3I")  # name(off, len), position(off, len), number, kind, games, goals, assists
+RECORD = struct.Struct("<4IB3xd")    # opponent(off, len), goals_for, goals_against, home, timestamp (nan — нет даты)
+
+_KINDS = [Forward, Defender, Goalkeeper]
+
+
+class _StringTable:
+    """Таблица строк для записи: одинаковые строки хранятся один раз."""
+
+    def __init__(self):
+        self._offsets: Dict[str, tuple] = {}
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, text: str) -> tuple:
+        ref = self._offsets.get(text)
+        if ref is None:
+            data = text.encode("utf-8")
+            ref = self._offsets[text] = (self.size, len(data))
+            self._chunks.append(data)
+            self.size += len(data)
+        return ref
+
+    def tobytes(self) -> bytes:
+        return b"".join(self._chunks)
+
+
+def _kind_of(player: Player) -> int:
+    for i, cls in enumerate(_KINDS):
+        if isinstance(player, cls):
+            return i
+    raise TypeError(f"Неизвестный тип игрока: {type(player).__name__}")
+
+
+def dump_snapshot(teams: Dict[str, Team]) -> bytes:
+    """Сериализует словарь {ключ: Team} в байты снимка."""
+    strings = _StringTable()
+    team_recs, player_recs, results = [], [], []
+
+    for key in sorted(teams):
+        team = teams[key]
+        first_player, first_record = len(player_recs), len(results)
+        for p in team.players:
+            player_recs.append(PLAYER.pack(*strings.add(p.name), *strings.add(p.position or ""),
+                                           p.number, _kind_of(p), p.games, p.goals, p.assists))
+        for r in team.ledger:
+            results.append(RECORD.pack(*strings.add(r.opponent), r.goals_for, r.goals_against, r.home,
+                                       r.date.timestamp() if r.date is not None else float("nan")))
+        team_recs.append(TEAM.pack(*strings.add(team.name), *strings.add(key), first_player,
+                                   len(team.players), first_record, len(results) - first_record))
+
+    off_teams = HEADER.size
+    off_players = off_teams + TEAM.size * len(team_recs)
+    off_records = off_players + PLAYER.size * len(player_recs)
+    off_strings = off_records + RECORD.size * len(results)
+    header = HEADER.pack(MAGIC, SNAPSHOT_VERSION, 0, len(team_recs), len(player_recs),
+                         len(results), off_teams, off_players, off_records,
+                         off_strings, strings.size)
+    return b"".join([header, *team_recs, *player_recs, *results, strings.tobytes()])
+
+
+def write_snapshot(teams: Dict[str, Team], path: str):
+    """Атомарно записывает снимок лиги в файл."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(dump_snapshot(teams))
+    os.replace(tmp, path)
+
+
+class PlayerView:
+    """Ленивое представление игрока поверх буфера снимка."""
+
+    __slots__ = ("_snap", "_offset")
+
+    def __init__(self, snap: "LeagueSnapshot", index: int):
+        self._snap = snap
+        self._offset = snap.off_players + index * PLAYER.size
+
+    def _fields(self):
+        return PLAYER.unpack_from(self._snap.buffer, self._offset)
+
+    @property
+    def name(self) -> str:
+        f = self._fields()
+        return self._snap.string(f[0], f[1])
+
+    @property
+    def position(self) -> str:
+        f = self._fields()
+        return self._snap.string(f[2], f[3])
+
+    @property
+    def number(self) -> int:
+        return self._fields()[4]
+
+    @property
+    def games(self) -> int:
+        return self._fields()[6]
+
+    @property
+    def goals(self) -> int:
+        return self._fields()[7]
+
+    @property
+    def assists(self) -> int:
+        return self._fields()[8]
+
+    def role(self) -> str:
+        return self.to_player().role()
+
+    def to_player(self) -> Player:
+        """Создаёт полноценный объект Player нужного подкласса."""
+        name_off, name_len, pos_off, pos_len, number, kind, games, goals, assists = self._fields()
+        player = _KINDS[kind](self._snap.string(name_off, name_len), number,
+                              self._snap.string(pos_off, pos_len))
+        player.games, player.goals, player.assists = games, goals, assists
+        return player
+
+    def __repr__(self):
+        return f"PlayerView(name={self.name!r}, number={self.number})"
+
+
+class TeamView:
+    """Ленивое представление команды поверх буфера снимка."""
+
+    __slots__ = ("_snap", "_fields")
+
+    def __init__(self, snap: "LeagueSnapshot", index: int):
+        self._snap = snap
+        self._fields = TEAM.unpack_from(snap.buffer, snap.off_teams + index * TEAM.size)
+
+    @property
+    def name(self) -> str:
+        return self._snap.string(self._fields[0], self._fields[1])
+
+    @property
+    def key(self) -> str:
+        return self._snap.string(self._fields[2], self._fields[3])
+
+    @property
+    def players(self) -> List[PlayerView]:
+        first, count = self._fields[4], self._fields[5]
+        return [PlayerView(self._snap, first + i) for i in range(count)]
+
+    def records(self) -> List[MatchRecord]:
+        """Результаты матчей команды из журнала."""
+        first, count = self._fields[6], self._fields[7]
+        snap = self._snap
+        out = []
+        for i in range(count):
+            opp_off, opp_len, goals_for, goals_against, home, ts = RECORD.unpack_from(
+                snap.buffer, snap.off_records + (first + i) * RECORD.size)
+            out.append(MatchRecord(snap.string(opp_off, opp_len), goals_for, goals_against, bool(home),
+                                   None if ts != ts else datetime.fromtimestamp(ts)))
+        return out
+
+    def match_stats(self) -> Dict[str, int]:
+        """Статистика матчей в формате Team.match_stats()."""
+        ledger = MatchLedger()
+        for r in self.records():
+            ledger.append(r.opponent, r.goals_for, r.goals_against, r.home, r.date)
+        return ledger.stats()
+
+    def total_goals(self) -> int:
+        return sum(p.goals for p in self.players)
+
+    def __len__(self):
+        return self._fields[5]
+
+    def __iter__(self):
+        return iter(self.players)
+
+    def __getitem__(self, index: int) -> PlayerView:
+        if not 0 <= index < self._fields[5]:
+            raise IndexError(index)
+        return PlayerView(self._snap, self._fields[4] + index)
+
+    def __repr__(self):
+        return f"TeamView(name={self.name!r}, players={len(self)})"
+
+
+class LeagueSnapshot:
+    """Снимок лиги, открытый через mmap. Поддерживает доступ по ключу команды."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл
+            self._file.close()
+            raise ValueError("Файл снимка пуст или повреждён.")
+        if len(self.buffer) < HEADER.size:
+            self.close()
+            raise ValueError("Файл снимка пуст или повреждён.")
+        (magic, version, _, self.team_count, self.player_count, self.record_count,
+         self.off_teams, self.off_players, self.off_records,
+         self.off_strings, strings_size) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Файл не является снимком лиги.")
+        if version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+        self.strings_size = strings_size
+        try:
+            self._validate()
+        except ValueError:
+            self.close()
+            raise
+
+    def _validate(self):
+        """
+        Проверяет, что секции лежат внутри файла друг за другом, ссылки команд на игроков
+        и результаты не выходят за секции, а типы игроков известны. Строки проверяются
+        при чтении (string()) — так повреждённый файл даёт ValueError, а не struct.error/IndexError.
+        """
+        sections = [(self.off_teams, self.team_count * TEAM.size),
+                    (self.off_players, self.player_count * PLAYER.size),
+                    (self.off_records, self.record_count * RECORD.size),
+                    (self.off_strings, self.strings_size)]
+        end = HEADER.size
+        for offset, size in sections:
+            if offset < end:
+                raise ValueError("Файл снимка повреждён: секции перекрываются.")
+            end = offset + size
+        if end > len(self.buffer):
+            raise ValueError("Файл снимка обрезан.")
+
+        section = self.buffer[self.off_teams:self.off_teams + self.team_count * TEAM.size]
+        for _, _, _, _, first_player, players, first_record, records in TEAM.iter_unpack(section):
+            if first_player + players > self.player_count or first_record + records > self.record_count:
+                raise ValueError("Файл снимка повреждён: команда ссылается за пределы секции.")
+        # Байт типа игрока (kind) стоит на смещении 20 каждой записи PLAYER
+        kinds = self.buffer[self.off_players + 20:self.off_players + self.player_count * PLAYER.size:PLAYER.size]
+        if kinds and max(kinds) >= len(_KINDS):
+            raise ValueError("Файл снимка повреждён: неизвестный тип игрока.")
+
+    def string(self, offset: int, length: int) -> str:
+        if offset + length > self.strings_size:
+            raise ValueError("Файл снимка повреждён: строка за пределами таблицы строк.")
+        start = self.off_strings + offset
+        return str(self.buffer[start:start + length], "utf-8")
+
+    def team(self, index: int) -> TeamView:
+        return TeamView(self, index)
+
+    def keys(self) -> Iterator[str]:
+        return (self.team(i).key for i in range(self.team_count))
+
+    def __getitem__(self, key: str) -> TeamView:
+        # Команды отсортированы по ключу — двоичный поиск без построения словаря
+        lo, hi = 0, self.team_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.team(mid).key < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.team_count:
+            view = self.team(lo)
+            if view.key == key:
+                return view
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return self.team_count
+
+    def __iter__(self):
+        return self.keys()
+
+    def to_teams(self) -> Dict[str, Team]:
+        """Материализует снимок в обычные объекты Team/Player (результаты матчей — в журнал команды)."""
+        teams: Dict[str, Team] = {}
+        # Секция игроков разбирается целиком одним проходом iter_unpack
+        section = memoryview(self.buffer)[self.off_players:self.off_players + self.player_count * PLAYER.size]
+        players = []
+        try:
+            for name_off, name_len, pos_off, pos_len, number, kind, games, goals, assists in PLAYER.iter_unpack(section):
+                player = _KINDS[kind](self.string(name_off, name_len), number, self.string(pos_off, pos_len))
+                # Значения уже проверены при записи снимка — сеттеры не нужны
+                player._games, player._goals, player._assists = games, goals, assists
+                players.append(player)
+        finally:
+            section.release()
+
+        views = [self.team(i) for i in range(self.team_count)]
+        for view in views:
+            team = Team(view.name)
+            first, count = view._fields[4], view._fields[5]
+            team.players.extend(players[first:first + count])
+            teams[view.key] = team
+
+        for view in views:
+            ledger = teams[view.key].ledger
+            for r in view.records():
+                ledger.append(r.opponent, r.goals_for, r.goals_against, r.home, r.date)
+        return teams
+
+    def close(self):
+        self.buffer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"LeagueSnapshot(teams={self.team_count}, players={self.player_count})"
+
+
+def load_snapshot(path: str) -> Dict[str, Team]:
+    """Читает снимок и возвращает словарь {ключ: Team} (файл сразу закрывается)."""
+    with LeagueSnapshot(path) as snap:
+        return snap.to_teams()
+
+
+def convert_pickle(pkl_path: str, snapshot_path: str) -> int:
+    """
+    Переводит старый teams.pkl в формат снимка. Возвращает количество команд.
+    pickle исполняет код при загрузке — конвертировать можно только свои файлы.
+    """
+    with open(pkl_path, "rb") as f:
+        teams = pickle.load(f)
+    if not isinstance(teams, dict):
+        raise ValueError("Ожидался словарь команд.")
+    write_snapshot(teams, snapshot_path)
+    return len(teams)
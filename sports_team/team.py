@@ -1,23 +1,71 @@
 ﻿# sports_team/team.py
 from typing import List, Dict
 from sports_team.player import Player, Forward, Defender, Goalkeeper
+from sports_team.ledger import MatchLedger
 
 
 class Team:
     """Класс, описывающий спортивную команду."""
 
+    # Изменён ли состав после последнего сохранения в БД (для старых сохранений — да)
+    _dirty = True
+
     def __init__(self, name: str):
         self.name = name
         self.players: List[Player] = []
-
-    def add_player(self, player: Player):
-        """Добавить игрока в команду."""
+        self.ledger = MatchLedger()
+        self._dirty = True
+
+    def __setstate__(self, state):
+        """Поддержка старых сохранений, где матчи хранились списком team.matches."""
+        old_matches = state.pop("matches", None)
+        self.__dict__.update(state)
+        if "_ledger" not in state:
+            self._ledger = MatchLedger()
+            # Во время распаковки матчи ещё не восстановлены — переносим их при первом обращении
+            if old_matches:
+                self._legacy_matches = old_matches
+
+    @property
+    def ledger(self) -> MatchLedger:
+        """Журнал результатов матчей команды."""
+        legacy = self.__dict__.pop("_legacy_matches", None)
+        if legacy is not None:
+            for match in legacy:
+                self.add_match(match)
+        return self._ledger
+
+    @ledger.setter
+    def ledger(self, value: MatchLedger):
+        self.__dict__.pop("_legacy_matches", None)
+        self._ledger = value
+
+    def add_player(self, player: Player, index=None):
+        """Добавить игрока в команду (index — индекс поиска PlayerIndex, в который его добавить)."""
         if not isinstance(player, Player):
             raise TypeError("Можно добавить только объект класса Player или его подкласса")
         # Проверяем, нет ли игрока с таким же номером
         if any(p.number == player.number for p in self.players):
             raise ValueError(f"Игрок с номером {player.number} уже есть в команде")
         self.players.append(player)
+        self._dirty = True
+        if index is not None:
+            index.add(player, self)
+
+    def dirty_players(self) -> List[Player]:
+        """Игроки с несохранёнными изменениями."""
+        return [p for p in self.players if p._dirty]
+
+    @property
+    def is_dirty(self) -> bool:
+        """Есть ли несохранённые изменения в команде или у её игроков."""
+        return self._dirty or any(p._dirty for p in self.players)
+
+    def mark_clean(self):
+        """Отметить команду и всех её игроков как сохранённых."""
+        self._dirty = False
+        for p in self.players:
+            p._dirty = False
 
     def create_player(self, name: str, number: int, position: str):
         """Создать игрока нужного типа по его позиции."""
@@ -70,29 +118,30 @@ class Team:
     def __repr__(self):
         return f"Team(name='{self.name}', players={len(self.players)})"
     
-    def match_stats(self):
-        """Возвращает статистику по матчам: всего, побед, поражений, ничьих."""
-        stats = {"Матчи": 0, "Победы": 0, "Поражения": 0, "Ничьи": 0}
+    # --- матчи ---
+    def add_match(self, match):
+        """Добавляет результат завершённого матча в журнал команды (O(1))."""
+        goals_a, goals_b = match.score()
+        if match.team_a is self:
+            self.ledger.append(match.team_b.name, goals_a, goals_b, home=True, date=match.date)
+        elif match.team_b is self:
+            self.ledger.append(match.team_a.name, goals_b, goals_a, home=False, date=match.date)
+        else:
+            raise ValueError("Команда не участвовала в этом матче.")
+
+    @property
+    def matches(self):
+        """Результаты сыгранных матчей (записи MatchRecord)."""
+        return list(self.ledger)
 
-        matches = getattr(self, "matches", [])
+    @matches.setter
+    def matches(self, matches):
+        """Заменяет журнал результатами переданных матчей (матчи без участия команды пропускаются)."""
+        self.ledger = MatchLedger()
         for match in matches:
-            stats["Матчи"] += 1
-            goals_a, goals_b = match.score()
-
-            # Определяем, сколько забила текущая команда и соперник
-            if match.team_a == self:
-                team_goals, opponent_goals = goals_a, goals_b
-            elif match.team_b == self:
-                team_goals, opponent_goals = goals_b, goals_a
-            else:
-                continue  # на случай, если матч не связан с этой командой
-
-            # Обновляем статистику в одну строку
-            if team_goals > opponent_goals:
-                stats["Победы"] += 1
-            elif team_goals < opponent_goals:
-                stats["Поражения"] += 1
-            else:
-                stats["Ничьи"] += 1
-
-        return stats
+            if match.team_a is self or match.team_b is self:
+                self.add_match(match)
+
+    def match_stats(self):
+        """Возвращает статистику по матчам: всего, побед, поражений, ничьих."""
+        return self.ledger.stats()
@@ -0,0 +1,127 @@
+﻿import time
+import sqlite3
+import pytest
+from datetime import datetime
+
+from sports_team import db
+from sports_team.cache import LRUCache
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.db import (init_db, save_match, load_team_matches, get_team_match_stats,
+                            configure_match_cache, match_cache_info, close_match_cache)
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    configure_match_cache()
+    init_db()
+    yield
+    close_match_cache()
+
+
+def play(name_a, name_b):
+    save_match(Match(Team(name_a), Team(name_b), datetime(2024, 1, 1)))
+
+
+# === LRUCache ===
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.info()["hits"] == 3
+
+
+def test_lru_ttl_expires(monkeypatch):
+    cache = LRUCache(maxsize=2, ttl=10)
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.info()["misses"] == 1
+
+
+# === Кэш db ===
+def test_repeated_calls_hit_cache():
+    play("A", "B")
+    get_team_match_stats("A")
+    get_team_match_stats("A")
+    load_team_matches("A")
+    load_team_matches("A")
+    info = match_cache_info()
+    assert info["hits"] == 2
+    assert info["misses"] == 2
+
+
+def test_save_match_invalidates_only_both_teams():
+    play("A", "B")
+    for name in ("A", "B", "C"):
+        get_team_match_stats(name)
+    play("A", "B")
+    assert get_team_match_stats("A")["Матчи"] == 2
+    assert get_team_match_stats("B")["Матчи"] == 2
+    before = match_cache_info()["hits"]
+    get_team_match_stats("C")
+    assert match_cache_info()["hits"] == before + 1
+
+
+def test_external_write_detected_by_data_version():
+    play("A", "B")
+    assert get_team_match_stats("A")["Матчи"] == 1
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("INSERT INTO matches (team_a, team_b, score_a, score_b, date) "
+                 "VALUES ('A', 'C', 1, 0, '2024-02-01 00:00:00');")
+    conn.commit()
+    conn.close()
+    assert get_team_match_stats("A")["Матчи"] == 2
+
+
+def test_external_write_before_own_write_is_not_lost():
+    play("A", "B")
+    assert get_team_match_stats("A")["Матчи"] == 1
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("INSERT INTO matches (team_a, team_b, score_a, score_b, date) "
+                 "VALUES ('A', 'C', 1, 0, '2024-02-01 00:00:00');")
+    conn.commit()
+    conn.close()
+    # Своя запись по другим командам не должна скрыть чужое изменение команды A
+    play("B", "D")
+    assert get_team_match_stats("A")["Матчи"] == 2
+
+
+def test_external_write_right_after_own_commit_is_not_lost(monkeypatch):
+    play("A", "B")
+    assert get_team_match_stats("A")["Матчи"] == 1
+    invalidate = db._invalidate_teams
+
+    def external_then_invalidate(*names, **kwargs):
+        # Чужая фиксация между нашим COMMIT и учётом своего изменения в кэше
+        conn = sqlite3.connect(db.DB_NAME)
+        conn.execute("INSERT INTO matches (team_a, team_b, score_a, score_b, date) "
+                     "VALUES ('A', 'C', 1, 0, '2024-02-01 00:00:00');")
+        conn.commit()
+        conn.close()
+        invalidate(*names, **kwargs)
+
+    monkeypatch.setattr(db, "_invalidate_teams", external_then_invalidate)
+    play("B", "D")
+    assert get_team_match_stats("A")["Матчи"] == 2
+
+
+def test_ttl_mode_skips_version_check():
+    configure_match_cache(ttl=60)
+    play("A", "B")
+    assert len(load_team_matches("A")) == 1
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("INSERT INTO matches (team_a, team_b) VALUES ('A', 'C');")
+    conn.commit()
+    conn.close()
+    # Внешнее изменение не видно до истечения TTL
+    assert len(load_team_matches("A")) == 1
@@ -0,0 +1,86 @@
+﻿import pickle
+
+import pytest
+
+from sports_team.team import Team
+from sports_team.player import Forward, Defender
+from sports_team.db import init_db, save_team, flush, get_connection, close_match_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def make_team(name):
+    team = Team(name)
+    team.add_player(Forward(f"Нападающий {name}", 9))
+    team.add_player(Defender(f"Защитник {name}", 4))
+    return team
+
+
+def players_in_db():
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT t.name, p.number, p.goals, p.games FROM players p
+        JOIN teams t ON t.id = p.team_id ORDER BY t.name, p.number;
+    """).fetchall()
+    conn.close()
+    return rows
+
+
+def test_new_objects_are_dirty_and_flush_cleans_them():
+    team = make_team("A")
+    assert team.is_dirty and all(p.is_dirty for p in team.players)
+    assert flush([team]) == {"Команды": 1, "Игроки": 2}
+    assert not team.is_dirty
+    assert flush([team]) == {"Команды": 0, "Игроки": 0}
+
+
+def test_flush_writes_only_changed_players():
+    a, b = make_team("A"), make_team("B")
+    flush([a, b])
+    a.players[0].add_match_stats(goals=2)
+    b.players[1].goals = 5
+    b.players[1].goals = 5  # повторная установка не дублирует запись
+    assert a.dirty_players() == [a.players[0]]
+    assert flush([a, b]) == {"Команды": 2, "Игроки": 2}
+    assert players_in_db() == [("A", 4, 0, 0), ("A", 9, 2, 1), ("B", 4, 5, 0), ("B", 9, 0, 0)]
+
+
+def test_add_player_marks_team_dirty():
+    team = make_team("A")
+    flush([team])
+    team.add_player(Forward("Новичок", 11))
+    assert team.is_dirty
+    assert flush([team]) == {"Команды": 1, "Игроки": 1}
+    assert len(players_in_db()) == 3
+
+
+def test_save_team_clears_flags():
+    team = make_team("A")
+    save_team(team)
+    assert not team.is_dirty
+
+
+def test_failed_flush_keeps_flags(monkeypatch):
+    team = make_team("A")
+
+    def broken():
+        raise RuntimeError("нет соединения")
+    monkeypatch.setattr("sports_team.db.get_connection", broken)
+    with pytest.raises(RuntimeError):
+        flush([team])
+    assert team.is_dirty
+
+
+def test_old_pickles_are_dirty():
+    team = make_team("A")
+    team.mark_clean()
+    state = pickle.dumps(team)
+    restored = pickle.loads(state)
+    del restored.__dict__["_dirty"], restored.players[0].__dict__["_dirty"]
+    assert restored.is_dirty and restored.players[0].is_dirty
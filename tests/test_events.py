@@ -0,0 +1,168 @@
+﻿import sqlite3
+from datetime import datetime
+
+import pytest
+
+from sports_team import db
+from sports_team.db import init_db, close_match_cache
+from sports_team.events import EventStore, League, LeagueState, replay
+from sports_team.player import Forward, Goalkeeper
+from sports_team.team import Team
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def play(league, a, b, goals, date=None):
+    """Матч a–b; goals — список (сторона, номер игрока, минута)."""
+    match = league.start_match(a, b, date)
+    for side, number, minute in goals:
+        team = match.team_a if side == "A" else match.team_b
+        league.record_goal(match, next(p for p in team.players if p.number == number), minute)
+    return league.finalize_match(match)
+
+
+def make_league(**kwargs):
+    league = League(**kwargs)
+    for name in ("Спартак", "Зенит"):
+        league.create_team(name)
+        league.add_player(name, f"Нападающий {name}", 9, "Нападающий")
+        league.add_player(name, f"Вратарь {name}", 1, "Вратарь")
+    return league
+
+
+def summary(state):
+    return {name: (len(team.ledger), team.ledger.stats(),
+                   [(p.name, type(p).__name__, p.games, p.goals) for p in team.players])
+            for name, team in state.teams.items()}
+
+
+def test_state_is_derived_from_log():
+    league = make_league()
+    play(league, "Спартак", "Зенит", [("A", 9, 10), ("B", 9, 50), ("A", 9, 80)])
+    spartak = league.teams["Спартак"]
+    assert spartak.ledger.stats()["Победы"] == 1
+    assert spartak.players[0].goals == 2
+    assert isinstance(spartak.players[1], Goalkeeper)
+    assert summary(replay()) == summary(league.state)
+
+
+def test_snapshot_plus_tail_equals_full_replay():
+    league = make_league(snapshot_every=5)
+    for i in range(6):
+        play(league, "Спартак", "Зенит", [("A", 9, 10 + i)] * (i % 3), datetime(2024, 5, 1 + i))
+    store = EventStore()
+    conn = db.get_connection()
+    snapshots = [row[0] for row in conn.execute("SELECT seq FROM event_log_snapshots ORDER BY seq;")]
+    conn.close()
+    assert snapshots
+    for until in (snapshots[0], snapshots[0] + 2, store.last_seq()):
+        full = LeagueState()
+        for seq, type_, data in store.iter_events(until=until):
+            full.apply(seq, type_, data)
+        assert summary(replay(until=until)) == summary(full)
+        assert replay(until=until).seq == until
+
+
+def test_batch_mode_writes_one_transaction_per_flush(monkeypatch):
+    league = make_league(snapshot_every=5)
+    before = EventStore().last_seq()
+    league.start_batch()
+
+    def per_event(*_):
+        raise AssertionError("в режиме пачек события пишутся только append_many")
+    monkeypatch.setattr(EventStore, "append", per_event)
+    match = play(league, "Спартак", "Зенит", [("A", 9, 10), ("B", 9, 20)])
+    assert match.event_id == before + 1
+    assert EventStore().last_seq() == before  # пока только в памяти
+    assert league.flush() == 4
+    play(league, "Зенит", "Спартак", [("A", 9, 5)])
+    assert league.end_batch() == 3
+    assert EventStore().last_seq() == league.state.seq == before + 7
+    assert summary(replay()) == summary(league.state)
+
+    # Снимок сохраняется только после записи всех событий — при flush, а не посреди пачки
+    conn = db.get_connection()
+    assert conn.execute("SELECT MAX(seq) FROM event_log_snapshots;").fetchone()[0] == before + 4
+    conn.close()
+
+
+@pytest.mark.parametrize("snapshot_every", [1, 1000])
+def test_open_match_survives_reopen(snapshot_every):
+    # snapshot_every=1 — матч восстанавливается из снимка, 1000 — воспроизведением журнала
+    league = make_league(snapshot_every=snapshot_every)
+    match = league.start_match("Спартак", "Зенит")
+    scorer = match.team_b.players[0]
+    league.record_goal(match, scorer, 30)
+
+    reopened = League.open()
+    restored = reopened.state.matches[match.event_id]
+    assert restored.event_id == match.event_id
+    assert restored.score() == (0, 1)
+    reopened.record_goal(restored, restored.team_b.players[0], 60)
+    reopened.finalize_match(restored)
+    assert reopened.teams["Зенит"].ledger.stats()["Победы"] == 1
+    assert reopened.teams["Зенит"].players[0].goals == 2
+
+
+def test_replay_until_moment():
+    store = EventStore()
+    store.append("team_created", {"name": "Спартак"}, ts=datetime(2024, 1, 1))
+    store.append("team_created", {"name": "Зенит"}, ts=datetime(2024, 3, 1))
+    assert list(replay(until=datetime(2024, 2, 1)).teams) == ["Спартак"]
+    assert list(replay(until=datetime(2023, 12, 31)).teams) == []
+    assert sorted(replay().teams) == ["Зенит", "Спартак"]
+
+
+def test_invalid_commands_are_not_logged():
+    league = make_league()
+    before = EventStore().last_seq()
+    with pytest.raises(ValueError):
+        league.create_team("Спартак")
+    with pytest.raises(ValueError):
+        league.add_player("Спартак", "Дубль", 9, "Нападающий")
+    with pytest.raises(ValueError):
+        league.add_player("Динамо", "Кто-то", 5, "Защитник")
+    with pytest.raises(ValueError):
+        league.start_match("Спартак", "Спартак")
+    assert EventStore().last_seq() == before
+
+
+def test_log_is_append_only():
+    make_league()
+    conn = db.get_connection()
+    try:
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute("DELETE FROM event_log;")
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute("UPDATE event_log SET type = 'x';")
+    finally:
+        conn.close()
+
+
+def test_import_teams_keeps_stats_and_results():
+    a, b = Team("Спартак"), Team("Зенит")
+    a.add_player(Forward("Иванов", 9))
+    b.add_player(Forward("Петров", 10))
+    a.players[0].add_match_stats(goals=3)
+    a.ledger.append("Зенит", 3, 0, home=True, date=datetime(2024, 4, 1))
+
+    League().import_teams([a, b])
+    state = replay()
+    assert state.teams["Спартак"].players[0].goals == 3
+    assert state.teams["Спартак"].ledger.stats()["Победы"] == 1
+    assert state.teams["Спартак"].ledger[0].date == datetime(2024, 4, 1)
+
+
+def test_each_league_has_own_search_index():
+    league = make_league()
+    assert [r.player.name for r in league.index.search("нападающий спар")] == ["Нападающий Спартак"]
+    reopened = League.open()
+    assert reopened.index is not league.index and len(reopened.index) == 4
+    # Состояние на момент времени строится без индекса поиска
+    assert replay().index is None
@@ -0,0 +1,83 @@
+﻿from datetime import datetime
+
+import numpy as np
+import pytest
+
+from sports_team.db import init_db, save_team, save_match, archive_season, close_match_cache
+from sports_team.export import export_columnar, load_export, MANIFEST
+from sports_team.match import Match
+from sports_team.player import Forward, Goalkeeper
+from sports_team.team import Team
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def make_league():
+    a, b = Team("Альфа"), Team("Бета")
+    a.add_player(Forward("Иванов", 9))
+    a.add_player(Goalkeeper("Смирнов", 1))
+    b.add_player(Forward("Петров", 10))
+    games = [(datetime(2022, 9, 1), [(a, 0, 10)]),
+             (datetime(2024, 9, 1), [(a, 0, 5), (b, 0, 40), (a, 0, 77)]),
+             (datetime(2024, 9, 8), [])]
+    for date, goals in games:
+        m = Match(a, b, date)
+        for team, i, minute in goals:
+            m.record_goal(team.players[i], minute)
+        m.finalize_match()
+        save_match(m)
+    save_team(a)
+    save_team(b)
+    return a, b
+
+
+def test_roundtrip_matches_and_goals(tmp_path):
+    make_league()
+    archive_season("2022-2023")  # архивные матчи тоже выгружаются
+    manifest = export_columnar(str(tmp_path / "out"), chunk_size=2)
+    assert manifest["tables"]["matches"]["rows"] == 3
+    assert manifest["tables"]["goals"]["rows"] == 4
+
+    data = load_export(str(tmp_path / "out"))
+    matches = data["matches"]
+    assert isinstance(matches["score_a"], np.memmap)
+    assert list(data.decode("matches", "team_a")) == ["Альфа"] * 3
+    assert matches["score_a"].tolist() == [1, 2, 0]
+    assert matches["score_b"].tolist() == [0, 1, 0]
+    assert matches["date"][0] == np.datetime64("2022-09-01T00:00:00")
+
+    goals = data["goals"]
+    order = np.argsort(goals["match_id"], kind="stable")
+    assert goals["minute"][order].tolist() == [10, 5, 40, 77]
+    assert goals["side"][order].tolist() == [0, 0, 1, 0]
+    assert list(data.decode("goals", "player")[order]) == ["Иванов", "Иванов", "Петров", "Иванов"]
+    assert (goals["player"] == data.code("players", "Петров")).sum() == 1
+
+
+def test_players_table(tmp_path):
+    make_league()
+    export_columnar(str(tmp_path / "out"))
+    players = load_export(str(tmp_path / "out"))
+    names = list(players.decode("players", "name"))
+    assert sorted(names) == ["Иванов", "Петров", "Смирнов"]
+    goals = dict(zip(names, players["players"]["goals"].tolist()))
+    assert goals == {"Иванов": 3, "Петров": 1, "Смирнов": 0}
+    assert set(players.decode("players", "team")) == {"Альфа", "Бета"}
+    assert set(players.decode("players", "position")) == {"Нападающий", "Вратарь"}
+
+
+def test_empty_database_and_incomplete_export(tmp_path):
+    out = tmp_path / "out"
+    export_columnar(str(out))
+    data = load_export(str(out))
+    assert len(data["matches"]["id"]) == 0
+    (out / MANIFEST).unlink()
+    with pytest.raises(FileNotFoundError):
+        load_export(str(out))
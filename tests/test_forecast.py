@@ -0,0 +1,143 @@
+﻿import pytest
+from datetime import datetime
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.db import init_db, save_match
+from sports_team.forecast import PoissonModel, remaining_fixtures, simulate_season, forecast_season
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+
+
+HISTORY = [
+    ("Сильные", "Слабые", 4, 0, "2024-01-01 12:00:00"),
+    ("Слабые", "Сильные", 0, 3, "2024-01-08 12:00:00"),
+    ("Средние", "Слабые", 2, 1, "2024-01-15 12:00:00"),
+]
+
+
+def test_fit_ranks_teams_by_strength():
+    model = PoissonModel.fit(HISTORY)
+    strong = model.index["Сильные"]
+    weak = model.index["Слабые"]
+    assert model.attack[strong] > model.attack[weak]
+    assert model.defense[weak] > model.defense[strong]
+
+
+def test_remaining_fixtures_excludes_played():
+    teams = ["Сильные", "Слабые", "Средние"]
+    fixtures = remaining_fixtures(teams, HISTORY)
+    assert len(fixtures) == 6 - 3
+    assert ("Сильные", "Слабые") not in fixtures
+    assert ("Сильные", "Средние") in fixtures
+
+
+@pytest.mark.parametrize("rounds", [1, 2, 3, 4])
+def test_remaining_fixtures_games_per_pair(rounds):
+    fixtures = remaining_fixtures(["A", "B", "C"], [], rounds=rounds)
+    assert len(fixtures) == 3 * rounds
+    assert fixtures.count(("A", "B")) + fixtures.count(("B", "A")) == rounds
+    assert fixtures.count(("A", "B")) - fixtures.count(("B", "A")) == rounds % 2
+
+
+def test_simulation_probabilities_sum_to_one():
+    model = PoissonModel.fit(HISTORY)
+    fixtures = remaining_fixtures(model.teams, HISTORY)
+    forecast = simulate_season(model, fixtures, played=HISTORY, iterations=2000, seed=1)
+    probs = forecast.position_probabilities
+    assert probs.shape == (3, 3)
+    assert abs(probs.sum(axis=1) - 1).max() < 1e-9
+    assert abs(probs.sum(axis=0) - 1).max() < 1e-9
+    odds = forecast.title_odds()
+    assert odds["Сильные"] > odds["Слабые"]
+
+
+def test_simulation_is_reproducible_with_seed():
+    model = PoissonModel.fit(HISTORY)
+    fixtures = remaining_fixtures(model.teams, HISTORY)
+    first = simulate_season(model, fixtures, played=HISTORY, iterations=500, seed=7)
+    second = simulate_season(model, fixtures, played=HISTORY, iterations=500, seed=7)
+    assert (first.position_counts == second.position_counts).all()
+
+
+def test_forecast_season_reads_matches_table():
+    a, b = Team("Альфа"), Team("Бета")
+    p = Forward("Бомбардир", 9)
+    a.add_player(p)
+    m = Match(a, b, datetime(2024, 5, 1))
+    m.record_goal(p, 10)
+    save_match(m)
+    forecast = forecast_season(iterations=100, seed=0)
+    assert set(forecast.teams) == {"Альфа", "Бета"}
+    assert forecast.position_counts.sum() == 2 * 100
+
+
+def test_forecast_season_uses_saved_schedule():
+    from sports_team.db import save_fixtures
+    from sports_team.schedule import round_robin
+    save_fixtures(round_robin(["Альфа", "Бета", "Гамма"], datetime(2024, 5, 1).date()).rows("2024"))
+    forecast = forecast_season(iterations=50, seed=0, season="2024")
+    assert set(forecast.teams) == {"Альфа", "Бета", "Гамма"}
+    assert forecast.position_counts.sum() == 3 * 50
+
+
+def capture_simulation(monkeypatch):
+    calls = {}
+
+    def fake(model, fixtures, played=(), **_):
+        calls.update(teams=list(model.teams), fixtures=list(fixtures), played=list(played))
+    monkeypatch.setattr("sports_team.forecast.simulate_season", fake)
+    return calls
+
+
+def test_forecast_season_counts_only_matches_of_selected_season(monkeypatch):
+    from sports_team.db import save_fixtures
+    from sports_team.schedule import round_robin
+    names = ["Альфа", "Бета", "Гамма"]
+    teams = {name: Team(name) for name in names}
+    save_fixtures(round_robin(names, datetime(2024, 8, 3).date()).rows("2024"))
+    save_fixtures(round_robin(names, datetime(2025, 8, 2).date()).rows("2025"))
+    # Прошлый сезон, текущий сезон 2024 и начало 2025 — одна и та же пара хозяев и гостей
+    for date in (datetime(2023, 9, 1), datetime(2024, 9, 1), datetime(2025, 9, 1)):
+        save_match(Match(teams["Альфа"], teams["Бета"], date))
+    calls = capture_simulation(monkeypatch)
+
+    forecast_season(season="2024")
+    assert [m[4][:10] for m in calls["played"]] == ["2024-09-01"]
+    assert len(calls["fixtures"]) == 5
+
+    # Без season — последний по датам календарь, без матчей других сезонов
+    forecast_season()
+    assert [m[4][:10] for m in calls["played"]] == ["2025-09-01"]
+    assert len(calls["fixtures"]) == 5
+    assert sorted(calls["teams"]) == sorted(names)
+
+
+def test_forecast_season_without_schedule_uses_latest_season(monkeypatch):
+    a, b = Team("Альфа"), Team("Бета")
+    for date in (datetime(2023, 9, 1), datetime(2024, 9, 1)):
+        save_match(Match(a, b, date))
+    calls = capture_simulation(monkeypatch)
+    forecast_season()
+    assert [m[4][:10] for m in calls["played"]] == ["2024-09-01"]
+    # Двухкруговой турнир: одна встреча сыграна, осталась ответная
+    assert calls["fixtures"] == [("Бета", "Альфа")]
+
+
+def test_forecast_season_skips_teams_of_earlier_seasons(monkeypatch):
+    a, b, gone = Team("Альфа"), Team("Бета"), Team("Выбывшие")
+    save_match(Match(gone, a, datetime(2023, 9, 1)))
+    save_match(Match(a, b, datetime(2024, 9, 1)))
+    forecast = forecast_season(iterations=20, seed=0)
+    assert set(forecast.teams) == {"Альфа", "Бета"}
+
+    calls = capture_simulation(monkeypatch)
+    forecast_season()
+    assert calls["fixtures"] == [("Бета", "Альфа")]
@@ -0,0 +1,64 @@
+﻿import pytest
+from datetime import datetime, date
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.db import init_db, save_match, load_team_matches_range, close_match_cache
+from sports_team.form import RollingForm
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def play(name_a, name_b, day, goals_a=0):
+    a, b = Team(name_a), Team(name_b)
+    p = Forward("Игрок", 9)
+    a.add_player(p)
+    m = Match(a, b, datetime(2024, 3, day, 18, 0))
+    for minute in range(goals_a):
+        m.record_goal(p, minute + 1)
+    save_match(m)
+
+
+def test_range_returns_most_recent_first_with_limit():
+    for day in range(1, 8):
+        play("A", "B", day)
+    play("C", "A", 10)
+    rows = load_team_matches_range("A", limit=3)
+    assert [r[4][:10] for r in rows] == ["2024-03-10", "2024-03-07", "2024-03-06"]
+
+
+def test_range_since_until_accepts_dates():
+    for day in range(1, 8):
+        play("A", "B", day)
+    rows = load_team_matches_range("A", since=date(2024, 3, 3), until=date(2024, 3, 5))
+    assert len(rows) == 3
+    rows = load_team_matches_range("B", since=datetime(2024, 3, 7, 0, 0))
+    assert len(rows) == 1
+
+
+def test_rolling_form_window():
+    form = RollingForm(window=3)
+    form.add_result("A", "B", 1, 0)  # A: В
+    form.add_result("A", "B", 0, 0)  # A: Н
+    form.add_result("A", "B", 0, 2)  # A: П
+    form.add_result("A", "B", 3, 1)  # A: В, первая победа выпадает из окна
+    assert form.form("A") == "НПВ"
+    assert form.points("A") == 4
+    assert form.points("B") == 4
+    assert form.table()[0] == ("A", 4)
+
+
+def test_rolling_form_from_db():
+    play("A", "B", 1, goals_a=2)
+    play("A", "C", 2)
+    form = RollingForm.from_db(window=5)
+    assert form.points("A") == 4
+    assert form.form("C") == "Н"
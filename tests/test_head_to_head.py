@@ -0,0 +1,74 @@
+﻿import sqlite3
+import types
+import pytest
+from datetime import datetime
+
+from sports_team import db
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.db import init_db, save_match, get_head_to_head, close_match_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def play(home, away, goals_home, goals_away, day):
+    a, b = Team(home), Team(away)
+    pa, pb = Forward("Игрок A", 9), Forward("Игрок B", 10)
+    a.add_player(pa)
+    b.add_player(pb)
+    m = Match(a, b, datetime(2024, 4, day))
+    for i in range(goals_home):
+        m.record_goal(pa, i + 1)
+    for i in range(goals_away):
+        m.record_goal(pb, i + 50)
+    save_match(m)
+
+
+def test_head_to_head_is_order_independent():
+    play("Спартак", "ЦСКА", 2, 1, 1)   # победа Спартака дома
+    play("ЦСКА", "Спартак", 3, 0, 2)   # победа ЦСКА дома
+    play("ЦСКА", "Спартак", 1, 1, 3)   # ничья
+    play("Спартак", "Зенит", 5, 0, 4)  # другая пара не учитывается
+
+    spartak = get_head_to_head("Спартак", "ЦСКА")
+    assert spartak == {"Матчи": 3, "Победы": 1, "Поражения": 1, "Ничьи": 1,
+                       "Забито": 3, "Пропущено": 5}
+    cska = get_head_to_head("ЦСКА", "Спартак")
+    assert cska["Забито"] == 5 and cska["Победы"] == 1
+
+
+def test_head_to_head_matches_are_lazy_iterator():
+    play("A", "B", 1, 0, 1)
+    play("B", "A", 2, 0, 2)
+    result = get_head_to_head("A", "B", include_matches=True)
+    assert isinstance(result["Список матчей"], types.GeneratorType)
+    rows = list(result["Список матчей"])
+    assert [(r[0], r[1]) for r in rows] == [("A", "B"), ("B", "A")]
+
+
+def test_head_to_head_without_matches():
+    assert get_head_to_head("X", "Y")["Матчи"] == 0
+    with pytest.raises(ValueError):
+        get_head_to_head("X", "X")
+
+
+def test_old_database_gets_pair_key_backfilled():
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("DROP TABLE matches;")
+    conn.execute("CREATE TABLE matches (id INTEGER PRIMARY KEY AUTOINCREMENT, team_a TEXT NOT NULL, "
+                 "team_b TEXT NOT NULL, score_a INTEGER DEFAULT 0, score_b INTEGER DEFAULT 0, date TEXT);")
+    conn.execute("INSERT INTO matches (team_a, team_b, score_a, score_b, date) "
+                 "VALUES ('B', 'A', 2, 0, '2023-01-01 00:00:00');")
+    conn.execute("PRAGMA user_version = 0;")  # БД до введения версии схемы
+    conn.commit()
+    conn.close()
+    init_db()
+    assert get_head_to_head("A", "B")["Поражения"] == 1
@@ -0,0 +1,76 @@
+﻿import threading
+import pytest
+from datetime import datetime
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.ingest import ConcurrentMatchRecorder, ConcurrentIngest
+
+
+def make_match(players_per_team=4):
+    a, b = Team("A"), Team("B")
+    for team in (a, b):
+        for n in range(1, players_per_team + 1):
+            team.add_player(Forward(f"{team.name}{n}", n))
+    return Match(a, b, datetime(2024, 5, 1))
+
+
+def test_stress_exact_totals():
+    threads_count, goals_per_thread = 8, 2000
+    match = make_match()
+    recorder = ConcurrentMatchRecorder(match)
+    players = match.team_a.players + match.team_b.players
+    start = threading.Barrier(threads_count)
+
+    def worker(k):
+        start.wait()
+        for i in range(goals_per_thread):
+            recorder.record_goal(players[(k + i) % len(players)], i % 90 + 1)
+            if i % 500 == 0:
+                recorder.merge()  # слияние параллельно с записью не теряет голов
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(threads_count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    recorder.finalize()
+
+    total = threads_count * goals_per_thread
+    assert len(match.events) == total
+    assert sum(p.goals for p in players) == total
+    assert sum(match.score()) == total
+    assert recorder.pending() == 0
+
+
+def test_same_result_as_single_threaded_path():
+    m1, m2 = make_match(), make_match()
+    recorder = ConcurrentMatchRecorder(m2)
+    for minute, idx in [(30, 0), (10, 5), (75, 0)]:
+        m1.record_goal((m1.team_a.players + m1.team_b.players)[idx], minute)
+        recorder.record_goal((m2.team_a.players + m2.team_b.players)[idx], minute)
+    recorder.finalize()
+    assert m2.score() == m1.score() == (2, 1)
+    assert [e["minute"] for e in m2.events] == [10, 30, 75]
+    assert m2.team_a[0].goals == m1.team_a[0].goals == 2
+
+
+def test_validation_happens_in_worker_thread():
+    match = make_match()
+    recorder = ConcurrentMatchRecorder(match)
+    with pytest.raises(ValueError):
+        recorder.record_goal(match.team_a[0], 130)
+    with pytest.raises(ValueError):
+        recorder.record_goal(Forward("Чужой", 99), 10)
+
+
+def test_ingest_registry_finalizes_all():
+    ingest = ConcurrentIngest()
+    m1, m2 = make_match(), make_match()
+    ingest.record_goal(m1, m1.team_a[0], 5)
+    ingest.record_goal(m2, m2.team_b[0], 7)
+    assert len(ingest) == 2
+    finished = ingest.finalize_all()
+    assert {m.score() for m in finished} == {(1, 0), (0, 1)}
+    assert len(ingest) == 0
@@ -0,0 +1,68 @@
+﻿import pickle
+import pytest
+from datetime import datetime
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.ledger import MatchLedger, MatchRecord
+
+
+def play(a, b, goals_a, goals_b):
+    pa, pb = a[0], b[0]
+    m = Match(a, b, datetime(2024, 5, 1))
+    for i in range(goals_a):
+        m.record_goal(pa, i + 1)
+    for i in range(goals_b):
+        m.record_goal(pb, i + 50)
+    return m
+
+
+def make_teams():
+    a, b = Team("A"), Team("B")
+    a.add_player(Forward("Игрок A", 9))
+    b.add_player(Forward("Игрок B", 9))
+    return a, b
+
+
+def test_ledger_running_totals():
+    ledger = MatchLedger()
+    ledger.append("X", 2, 1)
+    ledger.append("Y", 0, 0, home=False)
+    ledger.append("Z", 1, 3)
+    assert ledger.stats() == {"Матчи": 3, "Победы": 1, "Поражения": 1, "Ничьи": 1}
+    assert ledger.scored == 3 and ledger.conceded == 4
+    assert [r.result for r in ledger] == ["В", "Н", "П"]
+    assert ledger[1] == MatchRecord("Y", 0, 0, False, None)
+    with pytest.raises(ValueError):
+        ledger.append("X", -1, 0)
+
+
+def test_add_match_records_both_perspectives():
+    a, b = make_teams()
+    m = play(a, b, 3, 1)
+    a.add_match(m)
+    b.add_match(m)
+    assert a.match_stats()["Победы"] == 1
+    assert b.match_stats()["Поражения"] == 1
+    assert b.matches[0] == MatchRecord("A", 1, 3, False, datetime(2024, 5, 1))
+    with pytest.raises(ValueError):
+        Team("C").add_match(m)
+
+
+def test_team_pickle_round_trip_keeps_ledger():
+    a, b = make_teams()
+    a.add_match(play(a, b, 1, 1))
+    restored = pickle.loads(pickle.dumps(a))
+    assert restored.match_stats()["Ничьи"] == 1
+
+
+def test_legacy_pickle_with_match_list_is_migrated():
+    a, b = make_teams()
+    m = play(a, b, 2, 0)
+    # Так выглядела команда в старом teams.pkl: список объектов Match в team.matches
+    for team in (a, b):
+        team.__dict__ = {"name": team.name, "players": team.players, "matches": [m]}
+    a2, b2 = pickle.loads(pickle.dumps((a, b)))
+    assert a2.match_stats() == {"Матчи": 1, "Победы": 1, "Поражения": 0, "Ничьи": 0}
+    assert b2.matches[0].opponent == "A"
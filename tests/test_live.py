@@ -0,0 +1,200 @@
+﻿import asyncio
+import json
+
+import pytest
+
+from sports_team import db
+from sports_team.db import init_db, close_match_cache, get_team_match_stats
+from sports_team.events import EventStore, League, replay
+from sports_team.live import LivePipeline, SocketSource, file_source, queue_source
+from sports_team.player import Forward
+from sports_team.team import Team
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def make_teams(n=4):
+    teams = {}
+    for i in range(n):
+        team = Team(f"T{i}")
+        team.add_player(Forward(f"Игрок {i}", 9))
+        teams[team.name] = team
+    return teams
+
+
+def events_for(match_id, a, b, goals):
+    yield {"type": "start", "match": match_id, "team_a": a, "team_b": b}
+    for team, minute in goals:
+        yield {"type": "goal", "match": match_id, "team": team, "number": 9, "minute": minute}
+    yield {"type": "end", "match": match_id}
+
+
+def run_queue(pipeline, events, maxsize=8):
+    async def main():
+        queue = asyncio.Queue(maxsize)
+
+        async def produce():
+            for event in events:
+                await queue.put(event)
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        stats = await pipeline.run(queue_source(queue))
+        await producer
+        return stats
+    return asyncio.run(main())
+
+
+def test_interleaved_matches_are_finalized_and_persisted():
+    teams = make_teams()
+    first = list(events_for("m1", "T0", "T1", [("T0", 10), ("T1", 20), ("T0", 30)]))
+    second = list(events_for("m2", "T2", "T3", [("T3", 5)]))
+    # События двух матчей вперемешку
+    events = [e for pair in zip(first, second + [None] * len(first)) for e in pair if e]
+    pipeline = LivePipeline(teams, queue_size=2)
+    stats = run_queue(pipeline, events)
+
+    assert stats.goals == 4 and stats.finished == 2 and stats.persisted == 2
+    assert not stats.errors
+    assert sorted(m.score() for m in pipeline.finished) == [(0, 1), (2, 1)]
+    assert teams["T0"].players[0].goals == 2
+    assert teams["T0"].ledger.stats()["Победы"] == 1
+    assert get_team_match_stats("T3")["Победы"] == 1
+    summary = stats.summary()
+    assert summary["Задержка гола, мс"]["p50"] >= 0
+    assert summary["Событий в секунду"] > 0
+
+
+def test_bad_events_are_reported_not_fatal():
+    teams = make_teams(2)
+    events = [
+        {"type": "goal", "match": "nope", "team": "T0", "number": 9, "minute": 1},
+        {"type": "start", "match": "m1", "team_a": "T0", "team_b": "Нет такой"},
+        *events_for("m2", "T0", "T1", [("T0", 3), ("T1", 200)]),
+        {"type": "goal", "match": "m2", "team": "T0", "number": 9, "minute": 90},
+    ]
+    pipeline = LivePipeline(teams, persist=False)
+    stats = run_queue(pipeline, events)
+    assert len(stats.errors) == 4
+    assert stats.goals == 1 and stats.finished == 1 and stats.persisted == 1
+    assert db.load_all_matches() == []
+
+
+def test_failed_commit_is_reported_and_run_completes(monkeypatch):
+    def fail(self):
+        raise OSError("диск заполнен")
+
+    monkeypatch.setattr("sports_team.live.Matchday.commit", fail)
+    teams = make_teams(2)
+    events = [e for i in range(20) for e in events_for(f"m{i}", "T0", "T1", [("T0", 1)])]
+    pipeline = LivePipeline(teams, persist_batch=1)
+
+    async def main():
+        queue = asyncio.Queue()
+        for event in events:
+            queue.put_nowait(event)
+        queue.put_nowait(None)
+        return await asyncio.wait_for(pipeline.run(queue_source(queue)), timeout=10)
+
+    stats = asyncio.run(main())
+    # Ни одна пачка не записана, но приём событий дошёл до конца
+    assert stats.finished == 20 and stats.persisted == 0
+    assert len(stats.errors) == 20 and "диск заполнен" in stats.errors[0]
+    assert len(pipeline.unsaved) == 20
+
+
+def test_league_pipeline_writes_event_log():
+    league = League.open()
+    for name in ("T0", "T1"):
+        league.create_team(name)
+        league.add_player(name, f"Игрок {name}", 9, kind="Forward")
+    events = [*events_for("m1", "T0", "T1", [("T0", 10), ("T1", 20), ("T0", 30)]),
+              *events_for("m2", "T1", "T0", [("T1", 5), ("T0", 500)])]
+    pipeline = LivePipeline(league.teams, league=league)
+    stats = run_queue(pipeline, events)
+    assert stats.finished == 2 and stats.persisted == 2 and len(stats.errors) == 1
+    assert not league.state.matches
+
+    # Новое чтение журнала видит завершённые матчи и голы
+    teams = replay().teams
+    assert teams["T0"].ledger.stats()["Победы"] == 1
+    assert teams["T1"].ledger.stats()["Победы"] == 1
+    assert teams["T0"].players[0].goals == 2
+    assert get_team_match_stats("T1")["Победы"] == 1
+
+    with pytest.raises(ValueError):
+        LivePipeline(make_teams(2), league=league)
+
+
+def test_league_events_are_journaled_in_batches(monkeypatch):
+    league = League.open()
+    for name in ("T0", "T1"):
+        league.create_team(name)
+        league.add_player(name, f"Игрок {name}", 9, kind="Forward")
+    batches = []
+    append_many = EventStore.append_many
+
+    def counting(store, events):
+        batches.append(len(events))
+        return append_many(store, events)
+    monkeypatch.setattr(EventStore, "append_many", counting)
+    monkeypatch.setattr(EventStore, "append", None)  # по событию на транзакцию — ошибка
+    events = [e for i in range(50) for e in events_for(f"m{i}", "T0", "T1", [("T0", 1), ("T1", 2)])]
+    stats = run_queue(LivePipeline(league.teams, persist=False, league=league), events, maxsize=1000)
+    assert stats.finished == 50 and not stats.errors
+    assert sum(batches) == 200 and len(batches) < 20
+    assert EventStore().last_seq() == league.state.seq
+    assert replay().teams["T0"].players[0].goals == 50
+
+
+def test_unfinished_matches_stay_open():
+    teams = make_teams(2)
+    events = list(events_for("m1", "T0", "T1", [("T0", 3)]))[:-1]
+    pipeline = LivePipeline(teams, persist=False)
+    stats = run_queue(pipeline, events)
+    assert stats.finished == 0
+    assert pipeline.open_matches()["m1"].score() == (1, 0)
+
+
+def test_file_source(tmp_path):
+    path = tmp_path / "events.jsonl"
+    lines = [json.dumps(e, ensure_ascii=False) for e in events_for("m1", "T0", "T1", [("T1", 7)])]
+    # Ошибочные строки учитываются как ошибки и не останавливают чтение файла
+    lines[1:1] = ['{"type": "goal", "match": ', "[1, 2]"]
+    path.write_text("\n".join(lines + ['{"type": "eof"}', '{"type": "start"}']) + "\n", encoding="utf-8")
+    teams = make_teams(2)
+    stats = asyncio.run(LivePipeline(teams, persist=False).run(file_source(str(path), follow=True, poll=0.01)))
+    assert stats.events == 5 and stats.finished == 1
+    assert len(stats.errors) == 2 and stats.errors[0].startswith("invalid строка 2")
+    assert teams["T1"].players[0].goals == 1
+
+
+def test_socket_source():
+    teams = make_teams(2)
+
+    async def main():
+        source = SocketSource(queue_size=2)
+        port = await source.start()
+        pipeline = LivePipeline(teams, persist=False)
+        task = asyncio.create_task(pipeline.run(source))
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"not json\n")
+        for event in events_for("m1", "T0", "T1", [("T0", 1), ("T0", 2)]):
+            writer.write((json.dumps(event) + "\n").encode("utf-8"))
+        await writer.drain()
+        writer.close()
+        while pipeline.stats.finished < 1:
+            await asyncio.sleep(0.01)
+        await source.close()
+        return await task
+
+    stats = asyncio.run(main())
+    assert stats.goals == 2 and stats.finished == 1
+    assert len(stats.errors) == 1
@@ -216,6 +216,33 @@ def test_database_functions(tmp_path):
     data = cur.fetchall()
     conn.close()
     assert data and "TestDB" in data[0][0]
+
+
+def test_failed_save_match_releases_write_lock(tmp_path, monkeypatch):
+    import sqlite3
+    from sports_team import db
+    os.chdir(tmp_path)
+    init_db()
+    m = Match(Team("A"), Team("B"))
+    apply_player_stats = db._apply_player_stats
+
+    def fail(*_):
+        raise RuntimeError("сбой записи статистики")
+
+    monkeypatch.setattr(db, "_apply_player_stats", fail)
+    with pytest.raises(RuntimeError):
+        save_match(m)
+    # Транзакция откатилась, блокировка записи свободна
+    conn = sqlite3.connect(db.DB_NAME, timeout=0)
+    conn.execute("BEGIN IMMEDIATE;")
+    assert conn.execute("SELECT COUNT(*) FROM matches;").fetchone()[0] == 0
+    conn.rollback()
+    conn.close()
+    monkeypatch.setattr(db, "_apply_player_stats", apply_player_stats)
+    save_match(m)
+    conn = get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM matches;").fetchone()[0] == 1
+    conn.close()
 def test_create_player_creates_correct_subclass():
     t = Team("Тестовая")
     f = t.create_player("Иван", 10, "нападающий")
@@ -0,0 +1,81 @@
+﻿import pytest
+from datetime import datetime
+
+from sports_team import db
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward, Defender
+from sports_team.matchday import Matchday
+from sports_team.db import (init_db, save_team, get_connection, get_team_match_stats,
+                            close_match_cache)
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def make_teams():
+    a, b, c, d = Team("A"), Team("B"), Team("C"), Team("D")
+    for team in (a, b, c, d):
+        team.add_player(Forward(f"Нападающий {team.name}", 9))
+        team.add_player(Defender(f"Защитник {team.name}", 4))
+    return a, b, c, d
+
+
+def query(sql, params=()):
+    conn = get_connection()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+
+def test_commit_writes_matches_events_and_player_deltas():
+    a, b, c, d = make_teams()
+    save_team(a)  # у команды A игроки уже есть в БД
+    m1 = Match(a, b, datetime(2024, 5, 1))
+    m1.record_goal(a[0], 10)
+    m1.record_goal(a[0], 20)
+    m2 = Match(c, d, datetime(2024, 5, 1))
+    m2.record_goal(d[1], 30)
+    for m in (m1, m2):
+        m.finalize_match()
+
+    timings = Matchday([m1, m2]).commit()
+    assert {"агрегация", "матчи", "события", "игроки", "фиксация", "всего"} <= set(timings)
+
+    assert query("SELECT COUNT(*) FROM matches;")[0][0] == 2
+    assert query("SELECT COUNT(*) FROM match_events;")[0][0] == 3
+    goals = dict(query("SELECT name, goals FROM players;"))
+    assert goals["Нападающий A"] == 2
+    assert goals["Защитник D"] == 1
+    # Приращения применяются к уже сохранённой строке, дубликатов нет
+    assert query("SELECT COUNT(*) FROM players WHERE name = 'Нападающий A';")[0][0] == 1
+    assert get_team_match_stats("A")["Победы"] == 1
+
+
+def test_matches_saved_through_matchday_match_per_match_path():
+    a, b, c, d = make_teams()
+    m = Match(a, b, datetime(2024, 5, 1))
+    m.record_goal(b[0], 5)
+    Matchday([m]).commit()
+    save_team(b)
+    row = query("SELECT goals, games FROM players WHERE name = 'Нападающий B';")
+    assert row == [(b[0].goals, b[0].games)]
+
+
+def test_failed_commit_rolls_back(monkeypatch):
+    a, b, _, _ = make_teams()
+    day = Matchday([Match(a, b, datetime(2024, 5, 1))])
+
+    def broken(*_):
+        raise RuntimeError("сбой при записи событий")
+
+    monkeypatch.setattr(db, "_event_rows", broken)
+    with pytest.raises(RuntimeError):
+        day.commit()
+    assert query("SELECT COUNT(*) FROM matches;")[0][0] == 0
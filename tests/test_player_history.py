@@ -0,0 +1,81 @@
+﻿import pytest
+from datetime import datetime
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward, Defender
+from sports_team.matchday import Matchday
+from sports_team.db import (init_db, save_match, get_connection, get_player_career,
+                            get_period_leaders, archive_season, close_match_cache)
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+@pytest.fixture
+def teams():
+    a, b = Team("A"), Team("B")
+    a.add_player(Forward("Форвард", 9))
+    a.add_player(Defender("Защитник", 4))
+    b.add_player(Forward("Гость", 10))
+    return a, b
+
+
+def play(a, b, when, scorers):
+    m = Match(a, b, when)
+    for minute, player in enumerate(scorers, start=1):
+        m.record_goal(player, minute)
+    return m
+
+
+def test_fact_rows_and_rollups(teams):
+    a, b = teams
+    save_match(play(a, b, datetime(2024, 8, 10), [a[0], a[0], b[0]]))
+    save_match(play(b, a, datetime(2024, 9, 1), [a[1]]))
+    save_match(play(a, b, datetime(2025, 8, 1), [a[0]]))
+
+    conn = get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM player_match_stats;").fetchone()[0] == 9
+    conn.close()
+
+    career = get_player_career("A", 9)
+    assert career == [
+        {"Период": "2024-2025", "Матчи": 2, "Голы": 2, "Передачи": 0},
+        {"Период": "2025-2026", "Матчи": 1, "Голы": 1, "Передачи": 0},
+    ]
+    months = get_player_career("A", 4, period="month")
+    assert [(m["Период"], m["Голы"]) for m in months] == [("2024-08", 0), ("2024-09", 1), ("2025-08", 0)]
+
+
+def test_period_leaders(teams):
+    a, b = teams
+    save_match(play(a, b, datetime(2024, 8, 10), [a[0], a[0], b[0]]))
+    leaders = get_period_leaders("2024-2025", limit=2)
+    assert [(l["Имя"], l["Голы"]) for l in leaders] == [("Форвард", 2), ("Гость", 1)]
+    assert get_period_leaders("2024-08", period="month")[0]["Команда"] == "A"
+    with pytest.raises(ValueError):
+        get_period_leaders("2024-2025", stat="id; DROP TABLE players")
+
+
+def test_matchday_maintains_rollups(teams):
+    a, b = teams
+    day = Matchday([play(a, b, datetime(2024, 8, 10), [a[0]]),
+                    play(b, a, datetime(2024, 8, 10), [a[0], b[0]])])
+    day.commit()
+    assert get_player_career("A", 9)[0] == {"Период": "2024-2025", "Матчи": 2, "Голы": 2, "Передачи": 0}
+
+
+def test_archive_moves_facts_but_keeps_rollups(teams):
+    a, b = teams
+    save_match(play(a, b, datetime(2022, 8, 10), [a[0]]))
+    archive_season("2022-2023")
+    conn = get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM player_match_stats;").fetchone()[0] == 0
+    conn.close()
+    assert get_player_career("A", 9)[0]["Голы"] == 1
@@ -0,0 +1,111 @@
+﻿import os
+import threading
+import tracemalloc
+
+import pytest
+
+from sports_team import profiling
+from sports_team.db import init_db, close_match_cache, get_standings
+from sports_team.profiling import profiled
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    profiling.disable()
+    close_match_cache()
+
+
+def leaf(n):
+    return [str(i) * 10 for i in range(n)]
+
+
+@profiled
+def outer(n):
+    return len(inner(n))
+
+
+@profiled(name="внутренний")
+def inner(n):
+    return leaf(n)
+
+
+def files(directory):
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def test_disabled_writes_nothing(tmp_path):
+    assert outer(100) == 100
+    assert files(tmp_path / "profiles") == []
+
+
+def test_profile_files_per_action(tmp_path):
+    profiling.enable(str(tmp_path / "p"))
+    assert outer(20000) == 20000
+    get_standings()
+    names = files(tmp_path / "p")
+    # Вложенный inner входит в профиль outer — отдельных файлов нет
+    assert [n.split("-")[0] for n in names] == ["get_standings"] * 3 + ["outer"] * 3
+    suffixes = {os.path.splitext(n)[1] for n in names}
+    assert suffixes == {".prof", ".collapsed", ".txt"}
+
+    collapsed = (tmp_path / "p" / next(n for n in names if n.startswith("outer") and n.endswith(".collapsed")))
+    lines = collapsed.read_text(encoding="utf-8").splitlines()
+    stack, micros = max((line.rsplit(" ", 1) for line in lines), key=lambda item: int(item[1]))
+    assert "test_profiling:leaf" in stack and "test_profiling:inner" in stack
+    assert int(micros) > 0
+
+    memory = (tmp_path / "p" / next(n for n in names if n.startswith("outer") and n.endswith(".mem.txt")))
+    assert "Пик памяти" in memory.read_text(encoding="utf-8")
+
+
+def test_enable_from_env_and_argv(monkeypatch, tmp_path):
+    monkeypatch.setenv(profiling.PROFILE_ENV, "0")
+    profiling.enable_from_env()
+    assert not profiling.is_enabled()
+    monkeypatch.setenv(profiling.PROFILE_ENV, str(tmp_path / "env"))
+    profiling.enable_from_env()
+    assert profiling.is_enabled() and (tmp_path / "env").is_dir()
+
+    profiling.disable()
+    assert not profiling.enable_from_argv(["--other"])
+    assert profiling.enable_from_argv(["--profile=" + str(tmp_path / "cli")])
+    assert (tmp_path / "cli").is_dir()
+
+
+def test_threads_profile_concurrently(tmp_path):
+    profiling.enable(str(tmp_path / "p"))
+    errors = []
+
+    def work():
+        try:
+            for _ in range(20):
+                assert outer(200) == 200
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(files(tmp_path / "p")) == 4 * 20 * 3
+    # Последнее действие остановило tracemalloc, запущенный профилированием
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiler_errors_do_not_escape(monkeypatch, tmp_path):
+    profiling.enable(str(tmp_path / "p"))
+
+    def broken(*_):
+        raise OSError("нет места")
+
+    monkeypatch.setattr(profiling, "_write_results", broken)
+    assert outer(10) == 10
+    monkeypatch.setattr(profiling, "_start_tracing", broken)
+    assert outer(10) == 10
+    assert not tracemalloc.is_tracing()
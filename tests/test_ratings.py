@@ -0,0 +1,165 @@
+﻿import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from sports_team import db
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.matchday import Matchday
+from sports_team.ratings import EloModel, ReplayPlan, INITIAL_RATING
+from sports_team.db import (init_db, save_match, get_ratings, get_rating_history,
+                            recompute_ratings, close_match_cache)
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def make_teams(n):
+    teams = []
+    for i in range(n):
+        team = Team(f"T{i}")
+        team.add_player(Forward(f"Игрок {i}", 9))
+        teams.append(team)
+    return teams
+
+
+def make_match(a, b, goals_a, goals_b, date):
+    m = Match(a, b, date)
+    for i in range(goals_a):
+        m.record_goal(a.players[0], i + 1)
+    for i in range(goals_b):
+        m.record_goal(b.players[0], i + 50)
+    return m
+
+
+def ratings_by_team():
+    return {r["Команда"]: r["Рейтинг"] for r in get_ratings()}
+
+
+def test_elo_model():
+    model = EloModel(k=20, home_advantage=0)
+    assert model.expected(1500, 1500) == 0.5
+    assert model.delta(1500, 1500, 1, 0) == pytest.approx(10)
+    assert model.delta(1500, 1500, 0, 0) == 0
+    assert model.delta(1500, 1500, 3, 0) == pytest.approx(10 * 14 / 8)
+    # Преимущество поля: ничья дома — потеря рейтинга
+    assert EloModel(home_advantage=60).delta(1500, 1500, 1, 1) < 0
+    with pytest.raises(ValueError):
+        EloModel(k=0)
+
+
+def test_save_match_updates_ratings_and_history():
+    a, b = make_teams(2)
+    save_match(make_match(a, b, 2, 0, datetime(2024, 3, 1)))
+    save_match(make_match(b, a, 1, 1, datetime(2024, 3, 8)))
+    table = get_ratings()
+    assert table[0]["Команда"] == "T0" and table[0]["Матчи"] == 2
+    assert sum(r["Рейтинг"] for r in table) == pytest.approx(2 * INITIAL_RATING)
+    history = get_rating_history("T0")
+    assert [h["Дата"][:10] for h in history] == ["2024-03-01", "2024-03-08"]
+    assert history[0]["До"] == INITIAL_RATING and history[1]["До"] == history[0]["После"]
+
+
+def test_batch_recompute_matches_incremental_updates():
+    rng = random.Random(3)
+    teams = make_teams(8)
+    start = datetime(2024, 1, 1)
+    matches = []
+    for day in range(30):
+        # иногда команда играет дважды в один день
+        for _ in range(rng.randint(1, 5)):
+            a, b = rng.sample(teams, 2)
+            matches.append(make_match(a, b, rng.randint(0, 4), rng.randint(0, 4),
+                                      start + timedelta(days=day, hours=rng.randint(0, 3))))
+    matches.sort(key=lambda m: m.date)
+    for m in matches[:40]:
+        save_match(m)
+    Matchday(matches[40:]).commit()
+    incremental = ratings_by_team()
+    history = len(get_rating_history("T0"))
+
+    assert recompute_ratings() == len(matches)
+    assert ratings_by_team() == pytest.approx(incremental)
+    assert len(get_rating_history("T0")) == history
+
+
+def test_backfilled_match_triggers_replay_from_its_date():
+    rng = random.Random(5)
+    teams = make_teams(6)
+    start = datetime(2024, 1, 1)
+    for day in range(20):
+        a, b = rng.sample(teams, 2)
+        save_match(make_match(a, b, rng.randint(0, 3), rng.randint(0, 3), start + timedelta(days=day)))
+    # Задним числом: один матч и пачка матчей за прошедшие дни
+    save_match(make_match(teams[0], teams[1], 4, 0, start + timedelta(days=5, hours=1)))
+    Matchday([make_match(teams[2], teams[3], 0, 3, start + timedelta(days=2, hours=2)),
+              make_match(teams[4], teams[5], 2, 2, start + timedelta(days=12, hours=2))]).commit()
+    incremental = ratings_by_team()
+    matches = {r["Команда"]: r["Матчи"] for r in get_ratings()}
+    history = get_rating_history("T0")
+    assert [h["Дата"] for h in history] == sorted(h["Дата"] for h in history)
+
+    recompute_ratings()
+    assert ratings_by_team() == pytest.approx(incremental)
+    assert {r["Команда"]: r["Матчи"] for r in get_ratings()} == matches
+    assert [h["После"] for h in get_rating_history("T0")] == pytest.approx([h["После"] for h in history])
+
+
+@pytest.mark.parametrize("gap", ["history=False", "archive"])
+def test_backfill_without_full_history_recomputes_everything(gap):
+    rng = random.Random(7)
+    teams = make_teams(4)
+    start = datetime(2022, 9, 1)
+    for day in range(0, 600, 30):
+        a, b = rng.sample(teams, 2)
+        save_match(make_match(a, b, rng.randint(0, 3), rng.randint(0, 3), start + timedelta(days=day)))
+    if gap == "archive":
+        db.archive_season("2023-2024")  # сезон 2022-2023 остаётся в основной БД
+    else:
+        recompute_ratings(history=False)
+
+    save_match(make_match(teams[0], teams[1], 3, 0, start + timedelta(days=10)))
+    incremental = ratings_by_team()
+    matches = {r["Команда"]: r["Матчи"] for r in get_ratings()}
+    assert set(incremental.values()) != {INITIAL_RATING}
+    recompute_ratings()
+    assert ratings_by_team() == pytest.approx(incremental)
+    assert {r["Команда"]: r["Матчи"] for r in get_ratings()} == matches
+    assert sum(matches.values()) == 2 * 21
+
+
+def test_replay_plan_groups_independent_games():
+    rows = [(1, "A", "B", 1, 0, "2024-01-01 10:00:00"),
+            (2, "C", "D", 0, 0, "2024-01-01 12:00:00"),
+            (3, "A", "C", 2, 1, "2024-01-01 18:00:00"),  # A и C уже играли в этот день
+            (4, "B", "D", 0, 3, "2024-01-02 12:00:00")]
+    plan = ReplayPlan(rows)
+    assert plan.steps == [(0, 2), (2, 3), (3, 4)]
+    assert plan.match_ids.tolist() == [1, 2, 3, 4]
+    ratings = plan.run(EloModel())[0]
+    assert ratings.sum() == pytest.approx(4 * INITIAL_RATING)
+    assert len(ReplayPlan([]).run()[0]) == 0
+
+
+def test_old_database_gets_ratings_backfilled():
+    a, b = make_teams(2)
+    save_match(make_match(a, b, 1, 0, datetime(2024, 3, 1)))
+    expected = ratings_by_team()
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("DROP TABLE ratings;")
+    conn.execute("DROP TABLE rating_history;")
+    conn.execute("PRAGMA user_version = 1;")
+    conn.commit()
+    conn.close()
+    close_match_cache()
+    init_db()
+    assert ratings_by_team() == pytest.approx(expected)
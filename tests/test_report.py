@@ -0,0 +1,70 @@
+﻿import os
+
+import pytest
+
+from sports_team import report
+from sports_team.db import init_db, save_match, close_match_cache
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.report import save_team_report_docx, save_all_reports, report_cache, report_filename
+from sports_team.team import Team
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(report, "REPORT_DIR", str(tmp_path / "report"))
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    report_cache.reset()
+    yield
+    close_match_cache()
+
+
+def make_teams():
+    a, b = Team("Альфа"), Team("Бета")
+    a.add_player(Forward("Иванов", 9))
+    b.add_player(Forward("Петров", 10))
+    return a, b
+
+
+def test_unchanged_report_is_skipped(tmp_path):
+    a, _ = make_teams()
+    assert save_team_report_docx(a, "a.docx", open_file=False)
+    path = tmp_path / "report" / "a.docx"
+    mtime = os.stat(path).st_mtime_ns
+    assert not save_team_report_docx(a, "a.docx", open_file=False)
+    assert os.stat(path).st_mtime_ns == mtime
+    assert report_cache.info() == {"hits": 1, "misses": 1}
+    assert save_team_report_docx(a, "a.docx", force=True, open_file=False)
+
+
+def test_player_stats_and_matches_change_fingerprint():
+    a, b = make_teams()
+    save_team_report_docx(a, "a.docx", open_file=False)
+    a.players[0].add_match_stats(assists=1)
+    assert save_team_report_docx(a, "a.docx", open_file=False)
+
+    save_team_report_docx(b, "b.docx", open_file=False)
+    m = Match(a, b)
+    m.finalize_match()
+    save_match(m)  # изменилась только статистика матчей в БД
+    assert save_team_report_docx(b, "b.docx", open_file=False)
+
+
+def test_missing_file_or_sidecar_regenerates(tmp_path):
+    a, _ = make_teams()
+    save_team_report_docx(a, "a.docx", open_file=False)
+    os.remove(tmp_path / "report" / ("a.docx" + report.FINGERPRINT_SUFFIX))
+    assert save_team_report_docx(a, "a.docx", open_file=False)
+    os.remove(tmp_path / "report" / "a.docx")
+    assert save_team_report_docx(a, "a.docx", open_file=False)
+
+
+def test_save_all_reports_only_rewrites_changed_teams(tmp_path):
+    teams = make_teams()
+    assert save_all_reports(teams) == {"hits": 0, "misses": 2}
+    teams[1].add_player(Forward("Сидоров", 7))
+    assert save_all_reports(teams) == {"hits": 1, "misses": 1}
+    assert save_all_reports(teams, force=True) == {"hits": 0, "misses": 2}
+    assert (tmp_path / "report" / report_filename(teams[0])).exists()
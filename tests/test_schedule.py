@@ -0,0 +1,141 @@
+﻿from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from sports_team import db
+from sports_team.db import init_db, close_match_cache, save_fixtures, load_fixtures
+from sports_team.forecast import unplayed_fixtures
+from sports_team.player import Forward
+from sports_team.schedule import Constraints, Schedule, round_robin, schedule_divisions
+from sports_team.team import Team
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+START = date(2024, 8, 3)
+
+
+def names(n):
+    return [f"T{i}" for i in range(n)]
+
+
+def streaks(fixtures, team):
+    """Самая длинная серия матчей дома или в гостях."""
+    longest = current = 0
+    previous = None
+    for f in fixtures:
+        at_home = f.team_a == team
+        current = current + 1 if at_home == previous else 1
+        previous = at_home
+        longest = max(longest, current)
+    return longest
+
+
+@pytest.mark.parametrize("n", [2, 3, 4, 7, 10])
+def test_double_round_robin(n):
+    schedule = round_robin(names(n), START)
+    pairs = Counter((f.team_a, f.team_b) for f in schedule.fixtures())
+    # Каждая пара играет дважды: один раз дома, один раз в гостях
+    assert len(schedule) == n * (n - 1)
+    assert set(pairs.values()) == {1}
+    assert all((b, a) in pairs for a, b in pairs)
+    for team in names(n):
+        played = schedule.team_fixtures(team)
+        assert len(played) == 2 * (n - 1)
+        assert streaks(played, team) <= 2
+        days = [f.date for f in played]
+        assert all(later - earlier > timedelta(days=2) for earlier, later in zip(days, days[1:]))
+    assert schedule.violations(Constraints()) == []
+
+
+def test_odd_teams_get_bye_rounds():
+    schedule = round_robin(names(5), START)
+    rounds = Counter(f.round for f in schedule.fixtures())
+    assert len(rounds) == 10 and set(rounds.values()) == {2}
+
+
+def test_blackout_date_skips_round():
+    blackout = START + timedelta(days=7)
+    schedule = round_robin(names(4), START, Constraints(blackout_dates=[blackout]))
+    days = sorted({f.date.date() for f in schedule.fixtures()})
+    assert blackout not in days
+    # Тур переносится на следующий день, следующие туры отсчитываются от него
+    assert days[:3] == [START, blackout + timedelta(days=1), blackout + timedelta(days=8)]
+
+
+def test_team_blackout_shifts_match():
+    blocked = START + timedelta(days=14)
+    constraints = Constraints(team_blackouts={"T1": [blocked]})
+    schedule = round_robin(names(4), START, constraints)
+    assert all(f.date.date() != blocked for f in schedule.team_fixtures("T1"))
+    assert schedule.violations(constraints) == []
+
+
+def test_team_blackout_without_free_day_fails():
+    week = [START + timedelta(days=d) for d in range(7)]
+    with pytest.raises(ValueError):
+        round_robin(names(4), START, Constraints(team_blackouts={"T0": week}))
+
+
+def test_violations_are_reported():
+    # Три матча подряд дома и отдых в один день
+    schedule = Schedule(["A", "B", "C", "D"], [0, 1, 2], ["2024-01-01", "2024-01-02", "2024-01-10"],
+                        [0, 0, 0], [1, 2, 3])
+    problems = schedule.violations(Constraints())
+    assert any("A" in p for p in problems) and len(problems) >= 2
+
+
+def test_divisions_share_round_dates():
+    schedule = schedule_divisions({"Север": names(4), "Юг": ["U0", "U1", "U2"]}, START)
+    fixtures = list(schedule.fixtures())
+    assert {f.division for f in fixtures} == {"Север", "Юг"}
+    assert Counter(f.division for f in fixtures) == {"Север": 12, "Юг": 6}
+    assert {f.date for f in fixtures if f.division == "Юг"} <= {f.date for f in fixtures}
+    with pytest.raises(ValueError):
+        schedule_divisions({"Север": ["A", "B"], "Юг": ["B", "C"]}, START)
+
+
+def test_matches_are_created_for_teams():
+    teams = {}
+    for name in names(4):
+        teams[name] = Team(name)
+        teams[name].add_player(Forward(f"Игрок {name}", 9))
+    matches = list(round_robin(names(4), START).matches(teams))
+    assert len(matches) == 12
+    assert matches[0].team_a is teams[matches[0].team_a.name]
+    assert isinstance(matches[0].date, datetime)
+
+
+def test_fixtures_roundtrip():
+    schedule = round_robin(names(6), START)
+    assert save_fixtures(schedule.rows(season="2024")) == 30
+    rows = load_fixtures(season="2024")
+    assert len(rows) == 30
+    assert [r[3] for r in rows] == sorted(r[3] for r in rows)
+
+    team_rows = load_fixtures("T2", since=datetime(2024, 9, 1))
+    assert team_rows and all("T2" in r[4:] and r[3] >= "2024-09-01" for r in team_rows)
+
+    # Повторная запись сезона заменяет календарь, другой сезон сохраняется
+    save_fixtures(round_robin(names(4), START).rows(season="2024"))
+    save_fixtures(round_robin(names(4), START).rows(season="2025"))
+    assert len(load_fixtures(season="2024")) == 12
+    assert len(load_fixtures()) == 24
+    # Генератор строк: сезон берётся из самих строк, повторная запись не дублирует календарь
+    save_fixtures(row for row in round_robin(names(4), START).rows(season="2025"))
+    assert len(load_fixtures(season="2025")) == 12
+
+
+def test_unplayed_fixtures():
+    scheduled = [("A", "B"), ("B", "A"), ("A", "C"), ("A", "B")]
+    played = [("A", "B", 1, 0, "2024-01-01"), ("C", "A", 2, 2, "2024-01-02")]
+    assert unplayed_fixtures(scheduled, played) == [("B", "A"), ("A", "C"), ("A", "B")]
+    assert db.load_fixtures() == []
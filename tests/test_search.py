@@ -0,0 +1,80 @@
+﻿from sports_team.team import Team
+from sports_team.player import Forward, Defender
+from sports_team.search import PlayerIndex, normalize
+
+
+def make_index():
+    index = PlayerIndex()
+    a, b = Team("Спартак"), Team("ЦСКА")
+    for i, name in enumerate(["Иван Петров", "Иван Иванов", "Пётр Иванов", "Алексей Смирнов"], 1):
+        a.players.append(Forward(name, i))
+    for i, name in enumerate(["Иванов", "Сергей Кузнецов"], 1):
+        b.players.append(Defender(name, i))
+    index.add_team(a)
+    index.add_team(b)
+    return index
+
+
+def names(results):
+    return [r.player.name for r in results]
+
+
+def test_exact_match_ranks_first():
+    results = make_index().search("иванов")
+    assert results[0].player.name == "Иванов" and results[0].team.name == "ЦСКА"
+    # затем совпадения по началу фамилии
+    assert set(names(results[1:3])) == {"Иван Иванов", "Пётр Иванов"}
+
+
+def test_prefix_search_covers_every_word():
+    index = make_index()
+    assert names(index.search("Иван")) == ["Иван Иванов", "Иван Петров", "Иванов", "Пётр Иванов"]
+    assert names(index.search("смир")) == ["Алексей Смирнов"]
+    assert names(index.search("ПЕТР")) == ["Пётр Иванов", "Иван Петров"]  # ё и регистр не важны
+    assert len(index.search("иван", limit=2)) == 2
+
+
+def test_limit_keeps_best_scored_matches():
+    index = PlayerIndex()
+    team = Team("Спартак")
+    # Ключи слов "иваа", "иваб", "ивав" в порядке сортировки стоят раньше полного имени "ивя ян"
+    for i, name in enumerate(["А Иваа", "Б Иваб", "В Ивав", "Ивя Ян"], 1):
+        team.players.append(Forward(name, i))
+    index.add_team(team)
+    results = index.search("ив", limit=2)
+    assert results[0].player.name == "Ивя Ян"
+    assert results[0].score > results[1].score
+
+
+def test_fuzzy_search_tolerates_typos():
+    index = make_index()
+    assert names(index.search("Кузнецав"))[0] == "Сергей Кузнецов"
+    assert names(index.search("Смирнв")) == ["Алексей Смирнов"]
+    assert index.search("Зидан") == []
+
+
+def test_index_updates_incrementally():
+    index = make_index()
+    assert index.search("Акинфеев") == []
+    team = Team("Динамо")
+    team.players.append(Forward("Игорь Акинфеев", 35))
+    index.add_team(team)
+    assert names(index.search("акин")) == ["Игорь Акинфеев"]
+    index.clear()
+    assert len(index) == 0 and index.search("иван") == []
+
+
+def test_team_add_player_updates_given_index():
+    index = PlayerIndex()
+    team = Team("Локомотив")
+    team.add_player(Forward("Уникальный Форвардов", 10), index=index)
+    team.add_player(Forward("Без индекса", 11))
+    result = index.search("уникальный форв")
+    assert result[0].player is team.players[0] and result[0].team is team
+    assert len(index) == 1
+    index.rebuild([])
+    assert index.search("уникальный") == []
+
+
+def test_normalize():
+    assert normalize("  Пётр   ИВАНОВ ") == "петр иванов"
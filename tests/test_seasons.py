@@ -0,0 +1,163 @@
+﻿import os
+import pytest
+from datetime import datetime
+
+from sports_team import db
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.db import (init_db, save_match, archive_season, list_season_partitions,
+                            season_of, get_team_match_stats, load_team_matches_range,
+                            get_head_to_head, close_match_cache, load_all_matches)
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def play(home, away, when, goals_home=0):
+    a, b = Team(home), Team(away)
+    p = Forward("Игрок", 9)
+    a.add_player(p)
+    m = Match(a, b, when)
+    for i in range(goals_home):
+        m.record_goal(p, i + 1)
+    save_match(m)
+
+
+def test_season_of_uses_start_month():
+    assert season_of(datetime(2024, 7, 1)) == "2024-2025"
+    assert season_of(datetime(2025, 6, 30)) == "2024-2025"
+
+
+def test_archive_moves_rows_and_keeps_all_time_stats():
+    play("A", "B", datetime(2022, 9, 1), 1)
+    play("A", "B", datetime(2023, 9, 1), 1)
+    play("B", "A", datetime.now())
+    assert archive_season("2022-2023") == 1
+    assert archive_season("2023-2024") == 1
+
+    assert [s for s, _ in list_season_partitions()] == ["2022-2023", "2023-2024"]
+    conn = db.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM matches;").fetchone()[0] == 1
+    conn.close()
+
+    stats = get_team_match_stats("A")
+    assert stats == {"Матчи": 3, "Победы": 2, "Поражения": 0, "Ничьи": 1}
+    assert get_head_to_head("A", "B")["Матчи"] == 3
+    rows = load_team_matches_range("A", until=datetime(2023, 1, 1))
+    assert len(rows) == 1
+
+
+def test_archive_is_read_only():
+    play("A", "B", datetime(2022, 9, 1))
+    archive_season("2022-2023")
+    path = db.season_db_path("2022-2023")
+    assert not os.access(path, os.W_OK) or os.geteuid() == 0
+    with pytest.raises(ValueError):
+        play("A", "B", datetime(2022, 10, 1))
+    # Повторный перенос ничего не дублирует
+    assert archive_season("2022-2023") == 0
+    assert get_team_match_stats("A")["Матчи"] == 1
+
+
+def test_current_season_cannot_be_archived():
+    with pytest.raises(ValueError):
+        archive_season(db.current_season())
+
+
+def test_more_archives_than_attach_limit(monkeypatch):
+    for year in range(2008, 2020):
+        play("A", "B", datetime(year, 9, 1), 1)
+        archive_season(f"{year}-{year + 1}")
+    play("B", "A", datetime.now())
+    assert len(list_season_partitions()) == 12
+
+    assert get_team_match_stats("A") == {"Матчи": 13, "Победы": 12, "Поражения": 0, "Ничьи": 1}
+    assert get_head_to_head("A", "B")["Матчи"] == 13
+    assert len(load_all_matches()) == 13
+    # Период подключает только пересекающиеся архивы
+    rows = load_team_matches_range("A", since=datetime(2010, 1, 1), until=datetime(2012, 1, 1))
+    assert len(rows) == 2
+
+
+    # Сводный архив старых сезонов собран при переносе и не пересобирается при чтении
+    assert os.path.exists(db.old_seasons_db_path())
+    ensure_old_seasons = db._ensure_old_seasons
+    builds = []
+
+    def counting(partitions):
+        builds.append(len(partitions))
+        return ensure_old_seasons(partitions)
+    monkeypatch.setattr(db, "_ensure_old_seasons", counting)
+    mtime = os.stat(db.old_seasons_db_path()).st_mtime_ns
+    for _ in range(3):
+        assert get_head_to_head("A", "B")["Матчи"] == 13
+    assert os.stat(db.old_seasons_db_path()).st_mtime_ns == mtime
+
+    # Новый архив меняет состав сводного файла
+    play("A", "B", datetime(2020, 9, 1), 1)
+    archive_season("2020-2021")
+    assert builds[-1] == 4
+    assert get_team_match_stats("A") == {"Матчи": 14, "Победы": 13, "Поражения": 0, "Ничьи": 1}
+
+    # Полная очистка удаляет и архивы: старые матчи не возвращаются
+    close_match_cache()
+    os.remove(db.DB_NAME)
+    assert len(db.remove_season_partitions()) == 14
+    init_db()
+    assert list_season_partitions() == [] and not os.path.exists(db.old_seasons_db_path())
+    assert load_all_matches() == []
+
+
+def test_failed_archive_leaves_no_partial_file(monkeypatch):
+    play("A", "B", datetime(2022, 9, 1), 1)
+
+    create_events_table = db._create_events_table
+
+    def broken(cur):
+        raise OSError("диск заполнен")
+    monkeypatch.setattr(db, "_create_events_table", broken)
+    with pytest.raises(OSError):
+        archive_season("2022-2023")
+    assert list_season_partitions() == []
+    assert not [name for name in os.listdir(".") if name.endswith(".tmp")]
+    assert get_team_match_stats("A")["Матчи"] == 1
+
+    monkeypatch.setattr(db, "_create_events_table", create_events_table)
+    assert archive_season("2022-2023") == 1
+    conn = db.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM matches;").fetchone()[0] == 0
+    conn.close()
+    assert get_team_match_stats("A")["Матчи"] == 1
+
+
+@pytest.mark.parametrize("resume", ["archive_season", "init_db"])
+def test_interrupted_archive_is_finished(monkeypatch, resume):
+    play("A", "B", datetime(2022, 9, 1), 1)
+    play("A", "B", datetime(2022, 10, 1), 1)
+    drop_archived_rows = db._drop_archived_rows
+
+    def crash(path):
+        raise KeyboardInterrupt  # процесс остановлен между os.replace и удалением строк
+    monkeypatch.setattr(db, "_drop_archived_rows", crash)
+    with pytest.raises(KeyboardInterrupt):
+        archive_season("2022-2023")
+    assert [s for s, _ in list_season_partitions()] == ["2022-2023"]
+
+    monkeypatch.setattr(db, "_drop_archived_rows", drop_archived_rows)
+    if resume == "archive_season":
+        assert archive_season("2022-2023") == 2
+    else:
+        close_match_cache()
+        init_db()
+    conn = db.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM matches;").fetchone()[0] == 0
+    conn.close()
+    assert get_team_match_stats("A")["Матчи"] == 2
+    assert len(load_all_matches()) == 2
@@ -0,0 +1,100 @@
+﻿import json
+import threading
+from datetime import datetime
+from http.client import HTTPConnection
+from urllib.parse import quote
+
+import pytest
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward
+from sports_team.db import init_db, save_match, get_standings, close_match_cache
+from sports_team.server import ThreadPoolHTTPServer
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    init_db()
+    yield
+    close_match_cache()
+
+
+@pytest.fixture
+def server():
+    srv = ThreadPoolHTTPServer(("127.0.0.1", 0), workers=2)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def play(home, away, goals_home, goals_away, day):
+    a, b = Team(home), Team(away)
+    pa, pb = Forward("Игрок A", 9), Forward("Игрок B", 10)
+    a.add_player(pa)
+    b.add_player(pb)
+    m = Match(a, b, datetime(2024, 4, day))
+    for i in range(goals_home):
+        m.record_goal(pa, i + 1)
+    for i in range(goals_away):
+        m.record_goal(pb, i + 50)
+    save_match(m)
+
+
+def get(server, path, headers=None):
+    conn = HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response.status, response.getheader("ETag"), json.loads(body) if body else None
+
+
+def test_get_standings_orders_by_points_and_goal_difference():
+    play("A", "B", 2, 0, 1)
+    play("B", "C", 1, 1, 2)
+    play("C", "A", 3, 0, 3)
+    table = get_standings()
+    assert [(r["Место"], r["Команда"], r["Очки"]) for r in table] == [(1, "C", 4), (2, "A", 3), (3, "B", 1)]
+    assert table[0]["Разница"] == 3
+    assert get_standings("2023-2024")[0]["Матчи"] == 2
+    assert get_standings("2022-2023") == []
+
+
+def test_endpoints(server):
+    play("Спартак", "ЦСКА", 2, 1, 1)
+    status, _, standings = get(server, "/standings")
+    assert status == 200 and standings[0]["Команда"] == "Спартак"
+
+    status, _, stats = get(server, f"/teams/{quote('ЦСКА')}/stats")
+    assert stats == {"Команда": "ЦСКА", "Матчи": 1, "Победы": 0, "Поражения": 1, "Ничьи": 0}
+
+    status, _, matches = get(server, f"/teams/{quote('ЦСКА')}/matches?limit=5")
+    assert matches == [{"Хозяева": "Спартак", "Гости": "ЦСКА", "Счёт": "2:1", "Дата": "2024-04-01 00:00:00"}]
+
+    status, _, leaders = get(server, "/leaders?value=2023-2024&limit=1")
+    assert status == 200 and leaders[0]["Голы"] == 2
+
+
+def test_etag_and_invalidation_after_write(server):
+    play("A", "B", 1, 0, 1)
+    status, etag, _ = get(server, "/standings")
+    assert status == 200 and etag
+    status, _, body = get(server, "/standings", {"If-None-Match": etag})
+    assert status == 304 and body is None
+    assert server.responses.info()["hits"] == 1
+
+    play("B", "A", 3, 0, 2)  # новая фиксация меняет data_version
+    status, new_etag, standings = get(server, "/standings", {"If-None-Match": etag})
+    assert status == 200 and new_etag != etag
+    assert standings[0]["Команда"] == "B"
+
+
+def test_errors(server):
+    assert get(server, "/unknown")[0] == 404
+    assert get(server, "/teams/A/matches?limit=ten")[0] == 400
+    assert get(server, "/leaders?period=year")[0] == 400
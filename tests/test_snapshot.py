@@ -0,0 +1,112 @@
+﻿import pickle
+import pytest
+from datetime import datetime
+
+from sports_team.team import Team
+from sports_team.match import Match
+from sports_team.player import Forward, Defender, Goalkeeper
+from sports_team.snapshot import (LeagueSnapshot, write_snapshot, load_snapshot,
+                                  convert_pickle, dump_snapshot)
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    yield
+
+
+def make_league():
+    a, b = Team("Спартак"), Team("Зенит")
+    f, d, g = Forward("Иван", 9), Defender("Павел", 5), Goalkeeper("Олег", 1)
+    a.add_player(f)
+    a.add_player(d)
+    b.add_player(g)
+    m = Match(a, b, datetime(2024, 5, 1, 18, 0))
+    m.record_goal(f, 10)
+    m.record_goal(f, 80)
+    m.finalize_match()
+    a.add_match(m)
+    b.add_match(m)
+    return {"спартак": a, "зенит": b}
+
+
+def test_round_trip_keeps_players_and_match_stats():
+    teams = make_league()
+    write_snapshot(teams, "teams.snap")
+    loaded = load_snapshot("teams.snap")
+    assert set(loaded) == {"спартак", "зенит"}
+    spartak = loaded["спартак"]
+    assert [type(p) for p in spartak.players] == [Forward, Defender]
+    assert spartak[0].goals == 2 and spartak[0].games == teams["спартак"][0].games
+    assert spartak.match_stats() == teams["спартак"].match_stats()
+    assert loaded["зенит"].match_stats()["Поражения"] == 1
+    assert spartak.matches == teams["спартак"].matches
+
+
+def test_views_read_lazily_from_mmap():
+    write_snapshot(make_league(), "teams.snap")
+    with LeagueSnapshot("teams.snap") as snap:
+        assert len(snap) == 2
+        view = snap["спартак"]
+        assert view.name == "Спартак"
+        assert len(view) == 2
+        assert view[0].name == "Иван" and view[0].goals == 2
+        assert view.total_goals() == 2
+        assert view.match_stats()["Победы"] == 1
+        assert "динамо" not in snap
+
+
+def test_convert_pickle():
+    with open("teams.pkl", "wb") as f:
+        pickle.dump(make_league(), f)
+    assert convert_pickle("teams.pkl", "teams.snap") == 2
+    assert load_snapshot("teams.snap")["зенит"][0].name == "Олег"
+
+
+def test_rejects_foreign_file():
+    with open("bad.snap", "wb") as f:
+        f.write(b"\x80\x04not a snapshot at all........................................................")
+    with pytest.raises(ValueError):
+        LeagueSnapshot("bad.snap")
+    data = bytearray(dump_snapshot({}))
+    data[8] = 99  # версия
+    with open("future.snap", "wb") as f:
+        f.write(data)
+    with pytest.raises(ValueError):
+        LeagueSnapshot("future.snap")
+
+
+
+def open_and_read(data):
+    with open("crafted.snap", "wb") as f:
+        f.write(data)
+    with LeagueSnapshot("crafted.snap") as snap:
+        return snap.to_teams()
+
+
+def test_truncated_and_crafted_files_raise_value_error():
+    from sports_team.snapshot import HEADER
+    data = dump_snapshot(make_league())
+    for size in range(len(data)):
+        with pytest.raises(ValueError):
+            open_and_read(data[:size])
+
+    header = list(HEADER.unpack_from(data))
+    off_players = header[7]
+    # Смещение секции игроков за концом файла
+    header[7] = 1 << 40
+    with pytest.raises(ValueError):
+        open_and_read(HEADER.pack(*header) + data[HEADER.size:])
+
+    # Неизвестный тип первого игрока
+    crafted = bytearray(data)
+    crafted[off_players + 20] = 7
+    with pytest.raises(ValueError):
+        open_and_read(bytes(crafted))
+
+    # Имя первого игрока ссылается за пределы таблицы строк
+    crafted = bytearray(data)
+    crafted[off_players:off_players + 4] = (1 << 30).to_bytes(4, "little")
+    with pytest.raises(ValueError):
+        open_and_read(bytes(crafted))
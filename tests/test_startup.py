@@ -0,0 +1,51 @@
+﻿import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from sports_team import db
+from sports_team.db import init_db, save_match, close_match_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.print", lambda *_, **__: None)
+    yield
+    close_match_cache()
+
+
+def test_importing_run_does_not_import_docx(tmp_path):
+    code = "import sys, run; print(sorted(m for m in ('docx', 'lxml', 'numpy') if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_init_db_stamps_schema_version():
+    init_db()
+    conn = sqlite3.connect(db.DB_NAME)
+    assert conn.execute("PRAGMA user_version;").fetchone()[0] == db.SCHEMA_VERSION
+    conn.close()
+
+
+def test_schema_checked_once_per_database(monkeypatch):
+    from sports_team.team import Team
+    from sports_team.match import Match
+    from sports_team.player import Forward
+
+    calls = []
+    real = db._create_schema
+    monkeypatch.setattr(db, "_create_schema", lambda cur: calls.append(1) or real(cur))
+    a, b = Team("A"), Team("B")
+    a.add_player(Forward("Игрок", 9))
+    b.add_player(Forward("Игрок", 9))
+    for _ in range(3):
+        save_match(Match(a, b))  # без init_db: схема создаётся при первом сохранении
+    init_db()  # актуальная БД — DDL не выполняется
+    assert calls == [1]
@@ -0,0 +1,68 @@
+﻿import tracemalloc
+import types
+from datetime import datetime
+
+import pytest
+
+from sports_team import db
+from sports_team.ledger import MatchRecord
+from sports_team.db import (init_db, get_connection, iter_team_matches, iter_all_matches,
+                            iter_head_to_head, load_team_matches, get_team_match_stats,
+                            MatchRow, as_match_record, close_match_cache)
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    yield
+    close_match_cache()
+
+
+def insert_matches(rows):
+    conn = get_connection()
+    conn.executemany("""
+        INSERT INTO matches (team_a, team_b, score_a, score_b, date, pair_key)
+        VALUES (?, ?, ?, ?, ?, ?);
+    """, [(a, b, sa, sb, d, db._pair_key(a, b)) for a, b, sa, sb, d in rows])
+    conn.commit()
+    conn.close()
+
+
+def test_iter_team_matches_streams_in_chunks():
+    insert_matches([("A", "B", 1, 0, "2024-01-01 00:00:00"),
+                    ("C", "A", 2, 2, "2024-01-02 00:00:00"),
+                    ("B", "C", 0, 3, "2024-01-03 00:00:00")])
+    rows = iter_team_matches("A", chunk_size=1)
+    assert isinstance(rows, types.GeneratorType)
+    assert list(rows) == load_team_matches("A") == [
+        ("A", "B", 1, 0, "2024-01-01 00:00:00"), ("C", "A", 2, 2, "2024-01-02 00:00:00")]
+    assert [r.team_b for r in iter_all_matches(chunk_size=2, row_factory=MatchRow._make)] == ["B", "A", "C"]
+    with pytest.raises(ValueError):
+        iter_team_matches("A", chunk_size=0)
+
+
+def test_match_record_factory():
+    insert_matches([("A", "B", 1, 0, "2024-01-01 18:30:00"), ("B", "A", 3, 1, "2024-01-05 00:00:00")])
+    records = list(iter_team_matches("A", row_factory=as_match_record("A")))
+    assert records == [MatchRecord("B", 1, 0, True, datetime(2024, 1, 1, 18, 30)),
+                       MatchRecord("B", 1, 3, False, datetime(2024, 1, 5))]
+    assert [r.result for r in records] == ["В", "П"]
+    assert [r.result for r in iter_head_to_head("B", "A", row_factory=as_match_record("B"))] == ["П", "В"]
+
+
+def test_stats_memory_does_not_grow_with_history():
+    def peak_for(n):
+        insert_matches([("A", f"T{i}", i % 3, 1, f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}")
+                        for i in range(n)])
+        close_match_cache()
+        tracemalloc.start()
+        stats = get_team_match_stats("A")
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return stats["Матчи"], peak
+
+    small_total, small_peak = peak_for(1000)
+    big_total, big_peak = peak_for(20000)
+    assert (small_total, big_total) == (1000, 21000)
+    assert big_peak < small_peak * 3  # при fetchall рост был бы ~20-кратным